@@ -1,4 +1,5 @@
 from datetime import timedelta
+from importlib.util import find_spec
 from pathlib import Path
 import os
 from django.utils.translation import gettext_lazy as _
@@ -19,6 +20,7 @@ DJANGO_APPS = [
 
 # TODO: Add your apps here. (PROJECT_NAME)_APPS = ['your_app_name']
 PROJECT_NAME_APPS = [
+    "core",
     "blog",
     "product",
     "user",
@@ -43,6 +45,7 @@ INSTALLED_APPS = DJANGO_APPS + PROJECT_NAME_APPS + THIRD_PARTY_APPS
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "corsheaders.middleware.CorsMiddleware",
+    "core.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -85,7 +88,25 @@ DATABASES = {
 }
 
 
+# core/middleware.py, smaller responses are sent as they are
+API_COMPRESSION_MIN_SIZE = int(os.environ.get("API_COMPRESSION_MIN_SIZE", 512))
+API_COMPRESSION_BROTLI_QUALITY = 5
+
+# orjson renderer and parser (core/renderers.py), set API_FAST_JSON=0 for the stdlib json ones.
+# Off by default when orjson is not installed.
+API_FAST_JSON = os.environ.get("API_FAST_JSON", "1" if find_spec("orjson") else "0")
+API_FAST_JSON = API_FAST_JSON.strip().lower() in {"1", "true", "yes", "on"}
+
 REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.renderers.ORJSONRenderer" if API_FAST_JSON else "rest_framework.renderers.JSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "core.renderers.ORJSONParser" if API_FAST_JSON else "rest_framework.parsers.JSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
@@ -97,6 +118,45 @@ REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# Public catalog responses are cached until a catalog change bumps their version
+CATALOG_CACHE_TIMEOUT = int(os.environ.get("CATALOG_CACHE_TIMEOUT", 60 * 60))
+# Seconds a worker keeps its category menu before reading it again, even with an unchanged version
+CATALOG_MENU_TIMEOUT = int(os.environ.get("CATALOG_MENU_TIMEOUT", 300))
+
+# Catalog list counts are cached per filter/search and invalidated on catalog changes
+CATALOG_COUNT_CACHE_TIMEOUT = int(os.environ.get("CATALOG_COUNT_CACHE_TIMEOUT", 300))
+# Above this many rows (planner estimate) the count is estimated instead of COUNT(*). 0 disables it.
+CATALOG_COUNT_ESTIMATE_THRESHOLD = int(os.environ.get("CATALOG_COUNT_ESTIMATE_THRESHOLD", 10000))
+# Product facet (brand/color/price) counts, cached per filter signature
+CATALOG_FACET_CACHE_TIMEOUT = int(os.environ.get("CATALOG_FACET_CACHE_TIMEOUT", 300))
+# Lower bounds (Toman) of the price histogram buckets, the last one is open ended
+CATALOG_FACET_PRICE_BUCKETS = [0, 500_000, 1_000_000, 2_000_000, 5_000_000, 10_000_000]
+# Popularity points of a product view and of a sold unit, see product/service/popularity.py
+CATALOG_POPULARITY_VIEW_WEIGHT = 1.0
+CATALOG_POPULARITY_SALE_WEIGHT = 20.0
+# Each update_popularity run multiplies every score by this, e.g. 0.9 daily halves a score in a week
+CATALOG_POPULARITY_DECAY = float(os.environ.get("CATALOG_POPULARITY_DECAY", 0.9))
+# Lifetime of the view counters buffered in the cache between two update_popularity runs
+CATALOG_VIEW_BUFFER_TIMEOUT = 2 * 24 * 60 * 60
+# Related products kept per product, and the weight of popular products of the same
+# category next to the co-purchase similarity (0..1), see product/service/related.py
+RELATED_PRODUCTS_COUNT = 12
+RELATED_PRODUCTS_CATEGORY_WEIGHT = 0.2
+# Search box suggestions: default and largest count, and typed texts kept per process
+CATALOG_SUGGEST_LIMIT = 8
+CATALOG_SUGGEST_MAX_LIMIT = 20
+CATALOG_SUGGEST_CACHE_SIZE = int(os.environ.get("CATALOG_SUGGEST_CACHE_SIZE", 4096))
+
+# Widths of the resized copies of uploaded images, see core/renditions.py
+IMAGE_RENDITION_WIDTHS = [160, 320, 640, 1024]
+IMAGE_RENDITION_QUALITY = 80
+
 REST_AUTH = {
     "USE_JWT": True,
     # "JWT_AUTH_RETURN_EXPIRATION": True,
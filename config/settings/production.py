@@ -27,6 +27,13 @@ STATIC_ROOT = os.path.join(base.BASE_DIR, 'static/')
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(base.BASE_DIR, 'media/') 
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ.get("REDIS_URL", "redis://redis:6379/1"),
+    }
+}
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=15),   
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),     
@@ -0,0 +1,675 @@
+"""
+    Seed data, route specs and measurement helpers of the `benchmark_api` command.
+
+    Every API route of config/urls.py needs a RouteSpec below. A spec sends one
+    request per iteration; `prepare` runs before each request (outside the measured
+    window) and returns extra values for the path and the body.
+"""
+import random
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from order.models import Cart, CartItem, Delivery, DiscountCode
+from product.models import (
+    Brand,
+    Category,
+    CategoryChildren,
+    Color,
+    Gallery,
+    Product,
+    ProductColor,
+    ProductComment,
+    ProductImage,
+)
+from product.service.listing import refresh_product_listings
+from product.service.pricing import sync_product_prices
+from product.service.related import update_related_products
+from product.service.stock import sync_product_stock
+from product.service.search import update_search_vector
+from product.utils import assign_slugs
+from user.models import OTPCodeModel, RegistrationSession, User
+
+PASSWORD = "bench-pass-1234"
+
+# Routes that are not part of the API
+SKIPPED_ROUTE_PREFIXES = ("admin/", "media/", "static/", "schema/", "swagger/", "redoc/")
+FORMAT_SUFFIX_MARKERS = ("(?P<format>", "<drf_format_suffix:format>")
+
+
+# ---------------------------------------------------------------------
+# Seed data
+# ---------------------------------------------------------------------
+
+
+@dataclass
+class SeedSizes:
+    products: int = 2000
+    categories: int = 5
+    children_per_category: int = 4
+    brands: int = 40
+    colors: int = 16
+    max_colors_per_product: int = 4
+    images_per_color: int = 2
+    comments_per_product: int = 6
+    users: int = 50
+    gallery: int = 12
+
+
+def seed(sizes, seed_value=0):
+    """
+        Bulk insert a catalog of the given sizes and derive the stored prices,
+        search vectors and listing rows the signals would have maintained.
+        Returns the values the route specs build their requests from.
+    """
+    rng = random.Random(seed_value)
+    password_hash = make_password(PASSWORD)
+
+    users = User.objects.bulk_create(
+        User(
+            username=f"0910{index:07d}",
+            phone_number=f"0910{index:07d}",
+            receiver_phone_number=f"0910{index:07d}",
+            password=password_hash,
+            verify_phone_number=True,
+            first_name=f"کاربر {index}",
+            last_name="آزمایشی",
+        )
+        for index in range(sizes.users)
+    )
+
+    categories = Category.objects.bulk_create(
+        Category(name=f"دسته {index}", order=index) for index in range(sizes.categories)
+    )
+    children = CategoryChildren.objects.bulk_create(
+        CategoryChildren(
+            category=category,
+            name=f"زیر دسته {category.order}-{index}",
+            order=index,
+            show_in_menu=index % 2 == 0,
+        )
+        for category in categories
+        for index in range(sizes.children_per_category)
+    )
+    brands = Brand.objects.bulk_create(Brand(name=f"برند {index}") for index in range(sizes.brands))
+    colors = Color.objects.bulk_create(
+        Color(name=f"رنگ {index}", code=f"#{rng.randrange(0x1000000):06x}") for index in range(sizes.colors)
+    )
+
+    words = ["کیف", "کوله", "چرمی", "ضد آب", "مسافرتی", "اداری", "مدرسه", "لپ تاپ", "دستی", "کمری"]
+    products = [
+        Product(
+            category=rng.choice(children),
+            brand=rng.choice(brands) if index % 10 else None,
+            name=" ".join(rng.sample(words, 3)) + f" {index}",
+            specifications="، ".join(rng.sample(words, 4)),
+            description=" ".join(rng.choices(words, k=40)),
+            fixed_price=rng.randrange(100, 20000) * 1000,
+            discount_percentage=rng.choice([0, 0, 0, 5, 10, 25]),
+            is_published=index % 50 != 0,
+        )
+        for index in range(sizes.products)
+    ]
+    products = Product.objects.bulk_create(assign_slugs(products), batch_size=1000)
+
+    variants = ProductColor.objects.bulk_create(
+        (
+            ProductColor(
+                product=product,
+                color=color,
+                base_price=rng.choice([0, 0, rng.randrange(100, 20000) * 1000]),
+                base_discount=rng.choice([0, 0, 0, 15]),
+                stock=rng.choice([0, 1, 5, 20, 100]),
+            )
+            for product in products
+            for color in rng.sample(colors, rng.randint(1, sizes.max_colors_per_product))
+        ),
+        batch_size=1000,
+    )
+    ProductImage.objects.bulk_create(
+        (
+            ProductImage(
+                product_color=variant,
+                image=f"products/image/product-color/bench-{variant.pk}-{index}.jpg",
+                order=index,
+                is_cover=index == 0,
+            )
+            for variant in variants
+            for index in range(sizes.images_per_color)
+        ),
+        batch_size=1000,
+    )
+
+    roots = ProductComment.objects.bulk_create(
+        (
+            ProductComment(product=product, text="نظر " * 20, created_by=rng.choice(users))
+            for product in products
+            for _ in range(rng.randint(0, sizes.comments_per_product))
+        ),
+        batch_size=1000,
+    )
+    ProductComment.objects.bulk_create(
+        (
+            ProductComment(product_id=root.product_id, reply=root, text="پاسخ", created_by=rng.choice(users))
+            for root in roots[::2]
+        ),
+        batch_size=1000,
+    )
+
+    Gallery.objects.bulk_create(
+        Gallery(image=f"home/gallery/bench-{index}.jpg", order=index) for index in range(sizes.gallery)
+    )
+    Delivery.objects.bulk_create(
+        Delivery(name=name, cost=cost) for name, cost in [("پست", 50000), ("تیپاکس", 90000), ("پیک", 120000)]
+    )
+    DiscountCode.objects.create(name="benchmark", code="BENCHCART", amount=10)
+
+    # The cart fixture, query counts of the cart routes depend on the shape of its variants
+    cart_variants = []
+    for variant in variants:
+        if variant.product.is_published and variant.product_id not in {v.product_id for v in cart_variants}:
+            cart_variants.append(variant)
+        if len(cart_variants) == 5:
+            break
+    ProductColor.objects.filter(pk__in=[variant.pk for variant in cart_variants]).update(
+        base_price=0, base_discount=0, stock=100
+    )
+    ProductColor.objects.filter(pk=cart_variants[0].pk).update(stock=1_000_000)
+
+    product_ids = [product.pk for product in products]
+    sync_product_prices(product_ids)
+    sync_product_stock(product_ids)
+    update_search_vector(Product.objects.all())
+    refresh_product_listings(product_ids)
+    update_related_products(recompute_all=True)
+
+    # A published product with the most comments, so the detail covers threads
+    detail = (
+        Product.objects.filter(is_published=True)
+        .annotate(comment_count=Count("comments"))
+        .order_by("-comment_count", "pk")
+        .first()
+    )
+
+    return {
+        "user": users[0],
+        "users": users,
+        "category_id": children[0].pk,
+        "slug": detail.slug,
+        "color_id": colors[0].pk,
+        "other_color_id": colors[1].pk,
+        "variant_id": cart_variants[0].pk,
+        "variant_ids": [variant.pk for variant in cart_variants],
+    }
+
+
+# ---------------------------------------------------------------------
+# Per-request setup of the write routes
+# ---------------------------------------------------------------------
+
+
+def user_cart(context):
+    return Cart.objects.get_or_create(created_by=context["user"])[0]
+
+
+def fill_cart(context, iteration):
+    cart = user_cart(context)
+    for variant_id in context["variant_ids"]:
+        CartItem.objects.get_or_create(
+            cart=cart, product_color_id=variant_id, defaults={"created_by": context["user"]}
+        )
+    return {}
+
+
+def empty_cart(context, iteration):
+    cart = user_cart(context)
+    cart.items.all().delete()
+    Cart.objects.filter(pk=cart.pk).update(discount_code=None)
+    return {}
+
+
+def cart_item(context, iteration, count=2):
+    cart = user_cart(context)
+    cart.items.all().delete()
+    item = CartItem.objects.create(
+        cart=cart,
+        product_color_id=context["variant_id"],
+        created_by=context["user"],
+        count=count,
+    )
+    return {"pk": item.pk}
+
+
+def cart_with_discount(context, iteration):
+    fill_cart(context, iteration)
+    Cart.objects.filter(created_by=context["user"]).update(
+        discount_code=DiscountCode.objects.get(code="BENCHCART")
+    )
+    return {}
+
+
+def refresh_token(context, iteration):
+    return {"refresh": str(RefreshToken.for_user(context["user"]))}
+
+
+def unique_phone(iteration, prefix="0935"):
+    return f"{prefix}{iteration:07d}"
+
+
+def pending_registration(context, iteration):
+    phone_number = unique_phone(iteration, prefix="0936")
+    RegistrationSession.objects.create(phone_number=phone_number, password_hash=make_password(PASSWORD))
+    OTPCodeModel.objects.create(
+        phone_number=phone_number,
+        purpose="register",
+        code_hash="123456",
+        last_sent_at=timezone.now(),
+    )
+    return {"phone_number": phone_number}
+
+
+# ---------------------------------------------------------------------
+# Route specs
+# ---------------------------------------------------------------------
+
+
+@dataclass
+class RouteSpec:
+    route: str
+    path: str
+    method: str = "get"
+    # Max queries of a request with an empty cache
+    query_budget: int = 0
+    # Max queries of a read once the cache is warm, None skips the check
+    warm_query_budget: int | None = None
+    status: int = 200
+    auth: bool = False
+    data: dict | Callable | None = None
+    headers: dict | None = None
+    prepare: Callable | None = None
+    label: str = ""
+
+    @property
+    def name(self):
+        return self.label or f"{self.method.upper()} {self.path}"
+
+    @property
+    def is_read(self):
+        return self.method == "get"
+
+
+ROUTES = [
+    # Order
+    RouteSpec("api/order/", "/api/order/", auth=True),
+    RouteSpec("api/order/list-delivery/", "/api/order/list-delivery/", query_budget=1),
+    RouteSpec("api/order/cart/view/", "/api/order/cart/view/", auth=True, prepare=fill_cart, query_budget=7),
+    RouteSpec(
+        "api/order/cart/view/",
+        "/api/order/cart/view/?fields=id,total_price,items.count&expand=delivery_type",
+        auth=True,
+        prepare=fill_cart,
+        query_budget=6,
+        label="GET /api/order/cart/view/ (fields)",
+    ),
+    RouteSpec(
+        "api/order/cart/items/add/",
+        "/api/order/cart/items/add/",
+        method="post",
+        auth=True,
+        prepare=empty_cart,
+        data=lambda values: {"id": values["variant_id"]},
+        query_budget=7,
+    ),
+    RouteSpec(
+        "api/order/cart/(?P<pk>[^/.]+)/items/remove/",
+        "/api/order/cart/{pk}/items/remove/",
+        method="patch",
+        auth=True,
+        prepare=cart_item,
+        query_budget=3,
+    ),
+    RouteSpec(
+        "api/order/cart/(?P<pk>[^/.]+)/items/delete/",
+        "/api/order/cart/{pk}/items/delete/",
+        method="delete",
+        auth=True,
+        prepare=cart_item,
+        status=204,
+        query_budget=3,
+    ),
+    RouteSpec(
+        "api/order/cart/discount/apply/",
+        "/api/order/cart/discount/apply/",
+        method="patch",
+        auth=True,
+        prepare=fill_cart,
+        data={"code": "BENCHCART"},
+        query_budget=3,
+    ),
+    RouteSpec(
+        "api/order/cart/discount/unapply/",
+        "/api/order/cart/discount/unapply/",
+        method="patch",
+        auth=True,
+        prepare=cart_with_discount,
+        query_budget=3,
+    ),
+    # Product
+    RouteSpec("api/product/brands-list/", "/api/product/brands-list/", query_budget=2),
+    RouteSpec("api/product/colors-list/", "/api/product/colors-list/", query_budget=2),
+    # The menu is cached in each process, see product.service.menu
+    RouteSpec(
+        "api/product/categories-list/",
+        "/api/product/categories-list/",
+        query_budget=3,
+        warm_query_budget=0,
+    ),
+    RouteSpec("api/product/gallery/", "/api/product/gallery/", query_budget=2),
+    # categories-list/, brands-list/, colors-list/, gallery/ and list/ in one response
+    RouteSpec("api/product/home/", "/api/product/home/", query_budget=10, warm_query_budget=0),
+    RouteSpec("api/product/list/", "/api/product/list/", query_budget=5),
+    RouteSpec("api/product/list/", "/api/product/list/?page=2", query_budget=7, label="GET /api/product/list/ (legacy)"),
+    # Warm reads serve the gzip body kept next to the cached response, after the Last-Modified query
+    RouteSpec(
+        "api/product/list/",
+        "/api/product/list/",
+        headers={"Accept-Encoding": "gzip, br;q=0"},
+        query_budget=5,
+        warm_query_budget=1,
+        label="GET /api/product/list/ (gzip)",
+    ),
+    RouteSpec(
+        "api/product/list/",
+        "/api/product/list/?search=%DA%A9%DB%8C%D9%81&ordering=min_discounted_price",
+        query_budget=5,
+        label="GET /api/product/list/ (search)",
+    ),
+    RouteSpec(
+        "api/product/list/",
+        "/api/product/list/?color={color_id}&color={other_color_id}&min_price=1000000",
+        query_budget=5,
+        label="GET /api/product/list/ (filtered)",
+    ),
+    RouteSpec(
+        "api/product/list/",
+        "/api/product/list/?color={color_id},{other_color_id}&color_match=all",
+        query_budget=5,
+        label="GET /api/product/list/ (all colors)",
+    ),
+    RouteSpec(
+        "api/product/list/",
+        "/api/product/list/?in_stock=true",
+        query_budget=5,
+        label="GET /api/product/list/ (in stock)",
+    ),
+    RouteSpec(
+        "api/product/list/",
+        "/api/product/list/?ordering=-is_available,-created_at",
+        query_budget=5,
+        label="GET /api/product/list/ (availability first)",
+    ),
+    RouteSpec(
+        "api/product/list/",
+        "/api/product/list/?ordering=popularity",
+        query_budget=5,
+        label="GET /api/product/list/ (popularity)",
+    ),
+    # No colors requested, no color, image or variant queries
+    RouteSpec(
+        "api/product/list/",
+        "/api/product/list/?fields=id,name,slug,brand&expand=brand",
+        query_budget=2,
+        label="GET /api/product/list/ (fields)",
+    ),
+    RouteSpec("api/product/list/facets/", "/api/product/list/facets/", query_budget=3),
+    RouteSpec("api/product/list/compact/", "/api/product/list/compact/", query_budget=2),
+    RouteSpec(
+        "api/product/categories/<int:id>/products/",
+        "/api/product/categories/{category_id}/products/",
+        query_budget=5,
+    ),
+    RouteSpec(
+        "api/product/categories/<int:id>/products/compact/",
+        "/api/product/categories/{category_id}/products/compact/",
+        query_budget=2,
+    ),
+    RouteSpec(
+        "api/product/categories/<int:id>/products/facets/",
+        "/api/product/categories/{category_id}/products/facets/",
+        query_budget=3,
+    ),
+    # One streamed query however large the catalog, plus Last-Modified
+    RouteSpec("api/product/feed/<str:feed_format>/", "/api/product/feed/csv/", query_budget=2),
+    RouteSpec("api/product/feed/<str:feed_format>/", "/api/product/feed/jsonl/", query_budget=2),
+    RouteSpec(
+        "api/product/feed/<str:feed_format>/",
+        "/api/product/feed/xml/",
+        headers={"Accept-Encoding": "gzip"},
+        query_budget=2,
+        label="GET /api/product/feed/xml/ (gzip)",
+    ),
+    # The per process LRU answers repeated texts without queries
+    RouteSpec(
+        "api/product/suggest/",
+        "/api/product/suggest/?q=%DA%A9%DB%8C%D9%81",
+        query_budget=2,
+        warm_query_budget=0,
+    ),
+    RouteSpec(
+        "api/product/suggest/",
+        "/api/product/suggest/?q=%D8%A8%D8%B1%D9%86%D8%AF%201&limit=20",
+        query_budget=2,
+        warm_query_budget=0,
+        label="GET /api/product/suggest/ (brand)",
+    ),
+    RouteSpec("api/product/detail/(?P<slug>[^/]+)/", "/api/product/detail/{slug}/", query_budget=8),
+    RouteSpec(
+        "api/product/detail/(?P<slug>[^/]+)/",
+        "/api/product/detail/{slug}/?fields=id,name,colors.price,colors.stock",
+        query_budget=3,
+        label="GET /api/product/detail/{slug}/ (fields)",
+    ),
+    RouteSpec("api/product/detail/(?P<slug>[^/]+)/related/", "/api/product/detail/{slug}/related/", query_budget=1),
+    RouteSpec(
+        "api/product/detail/(?P<slug>[^/]+)/comments/",
+        "/api/product/detail/{slug}/comments/",
+        query_budget=3,
+    ),
+    # User, most of these queries are the session and token blacklist tables of dj-rest-auth/simplejwt
+    RouteSpec("api/user/", "/api/user/", auth=True),
+    RouteSpec(
+        "api/user/login/",
+        "/api/user/login/",
+        method="post",
+        data=lambda values: {"phone_number": values["user"].phone_number, "password": PASSWORD},
+        query_budget=11,
+    ),
+    RouteSpec(
+        "api/user/logout/",
+        "/api/user/logout/",
+        method="post",
+        auth=True,
+        prepare=refresh_token,
+        data=lambda values: {"refresh": values["refresh"]},
+        query_budget=8,
+    ),
+    RouteSpec(
+        "api/user/token/refresh/?",
+        "/api/user/token/refresh/",
+        method="post",
+        prepare=refresh_token,
+        data=lambda values: {"refresh": values["refresh"]},
+        query_budget=13,
+    ),
+    RouteSpec(
+        "api/user/contact-us/",
+        "/api/user/contact-us/",
+        method="post",
+        status=201,
+        data=lambda values: {
+            "first_name": "کاربر",
+            "last_name": "آزمایشی",
+            "phone_number": unique_phone(values["iteration"], prefix="0937"),
+            "email": f"bench-{values['iteration']}@example.com",
+            "description": "پیام آزمایشی",
+        },
+        query_budget=3,
+    ),
+    RouteSpec(
+        "api/user/register/",
+        "/api/user/register/",
+        method="post",
+        data=lambda values: {
+            "phone_number": unique_phone(values["iteration"], prefix="0938"),
+            "password": PASSWORD,
+        },
+        query_budget=13,
+    ),
+    RouteSpec(
+        "api/user/register/verify/",
+        "/api/user/register/verify/",
+        method="post",
+        prepare=pending_registration,
+        data=lambda values: {"phone_number": values["phone_number"], "otp_code": "123456"},
+        query_budget=6,
+    ),
+]
+
+
+# ---------------------------------------------------------------------
+# Route discovery and measurement
+# ---------------------------------------------------------------------
+
+
+def _pattern(pattern):
+    # Routers and re_path add ^ and $ anchors, drop them so routes read like paths
+    text = str(pattern)
+    return text.removeprefix("^").removesuffix("$")
+
+
+def _walk(patterns, prefix=""):
+    for pattern in patterns:
+        route = prefix + _pattern(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            yield from _walk(pattern.url_patterns, route)
+        else:
+            yield route
+
+
+def api_routes(urlconf=None):
+    """
+        Routes of the project that need a RouteSpec
+    """
+    routes = []
+    for route in _walk(get_resolver(urlconf).url_patterns):
+        if route.startswith(SKIPPED_ROUTE_PREFIXES):
+            continue
+        if any(marker in route for marker in FORMAT_SUFFIX_MARKERS):
+            continue
+        if route not in routes:
+            routes.append(route)
+    return routes
+
+
+def percentile(values, percent):
+    """
+        Nearest-rank percentile
+    """
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def _latency_summary(timings):
+    return {
+        "p50": round(percentile(timings, 50), 3),
+        "p95": round(percentile(timings, 95), 3),
+        "mean": round(statistics.fmean(timings), 3),
+    }
+
+
+def _request(client, spec, context, iteration):
+    values = {**context, "iteration": iteration}
+    if spec.prepare is not None:
+        values.update(spec.prepare(context, iteration))
+
+    data = spec.data(values) if callable(spec.data) else spec.data
+    path = spec.path.format(**values)
+
+    client.force_authenticate(user=context["user"] if spec.auth else None)
+    kwargs = {"format": "json"} if data is not None else {}
+    headers = spec.headers or {}
+
+    def send():
+        response = getattr(client, spec.method)(path, data, headers=headers, **kwargs)
+        # Streamed responses query while they are consumed
+        response.payload = b"".join(response.streaming_content) if response.streaming else response.content
+        return response
+
+    return send
+
+
+def measure(spec, context, iterations):
+    """
+        Send the request of spec `iterations` times with an empty cache.
+        Read routes are sent once more per iteration on the warm cache.
+    """
+    client = APIClient()
+    cold, warm = [], []
+    queries = warm_queries = 0
+    statuses = set()
+    payload_bytes = 0
+
+    for iteration in range(iterations):
+        send = _request(client, spec, context, iteration)
+        cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = send()
+            cold.append((time.perf_counter() - start) * 1000)
+        queries = max(queries, len(captured))
+        statuses.add(response.status_code)
+        payload_bytes = len(response.payload)
+
+        if spec.is_read:
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                send()
+                warm.append((time.perf_counter() - start) * 1000)
+            warm_queries = max(warm_queries, len(captured))
+
+    result = {
+        "name": spec.name,
+        "route": spec.route,
+        "method": spec.method.upper(),
+        "status": sorted(statuses),
+        "expected_status": spec.status,
+        "queries": queries,
+        "query_budget": spec.query_budget,
+        "latency_ms": _latency_summary(cold),
+        "payload_bytes": payload_bytes,
+    }
+    if warm:
+        result["warm_queries"] = warm_queries
+        result["warm_latency_ms"] = _latency_summary(warm)
+
+    result["failures"] = []
+    if queries > spec.query_budget:
+        result["failures"].append(f"{queries} queries, budget is {spec.query_budget}")
+    if warm and spec.warm_query_budget is not None and warm_queries > spec.warm_query_budget:
+        result["failures"].append(f"{warm_queries} queries on a warm cache, budget is {spec.warm_query_budget}")
+    if statuses != {spec.status}:
+        result["failures"].append(f"status {sorted(statuses)}, expected {spec.status}")
+    return result
+
@@ -0,0 +1,162 @@
+import json
+from dataclasses import asdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from core.benchmark import ROUTES, SeedSizes, api_routes, measure, seed
+
+BENCHMARK_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "benchmark",
+    }
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database and request every API route, checking the query "
+        "budget of each one. Writes p50/p95 latency and payload sizes to a JSON report "
+        "and exits with an error when a budget, a status or a route spec is off."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=SeedSizes.products)
+        parser.add_argument("--users", type=int, default=SeedSizes.users)
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--output", default="benchmark-report.json")
+        parser.add_argument(
+            "--route",
+            action="append",
+            default=[],
+            help="Only run specs whose name contains this text, can be repeated",
+        )
+        parser.add_argument(
+            "--baseline",
+            help="A previous report, query counts and p95 latency are compared against it",
+        )
+        parser.add_argument(
+            "--max-latency-regression",
+            type=float,
+            default=0.25,
+            help="Allowed p95 growth over the baseline, as a fraction",
+        )
+        parser.add_argument(
+            "--min-latency-regression-ms",
+            type=float,
+            default=5.0,
+            help="p95 growth below this many milliseconds is never reported",
+        )
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1:
+            raise CommandError("--iterations must be at least 1")
+        baseline = self.load_baseline(options["baseline"])
+        sizes = SeedSizes(products=options["products"], users=options["users"])
+
+        # Never clear a shared cache, and never touch the configured database
+        with override_settings(CACHES=BENCHMARK_CACHES):
+            setup_test_environment()
+            old_name = connection.settings_dict["NAME"]
+            connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                report = self.run(sizes, options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                teardown_test_environment()
+
+        if baseline is not None:
+            report["regressions"] = self.compare(report, baseline, options)
+
+        report["passed"] = not (
+            report["uncovered_routes"]
+            or report["stale_specs"]
+            or report.get("regressions")
+            or any(result["failures"] for result in report["routes"])
+        )
+        with open(options["output"], "w", encoding="utf-8") as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+
+        self.print_summary(report)
+        self.stdout.write(f"Report written to {options['output']}")
+        if not report["passed"]:
+            raise CommandError("API benchmark failed")
+
+    def run(self, sizes, options):
+        self.stdout.write(f"Seeding {sizes.products} products...")
+        context = seed(sizes)
+
+        routes = api_routes()
+        specified = {spec.route for spec in ROUTES}
+        specs = [
+            spec
+            for spec in ROUTES
+            if not options["route"] or any(text in spec.name for text in options["route"])
+        ]
+
+        results = []
+        for spec in specs:
+            self.stdout.write(f"  {spec.name}")
+            results.append(measure(spec, context, options["iterations"]))
+
+        return {
+            "generated_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "iterations": options["iterations"],
+            "seed": asdict(sizes),
+            "routes": results,
+            "uncovered_routes": [route for route in routes if route not in specified],
+            "stale_specs": sorted(specified - set(routes)),
+        }
+
+    def load_baseline(self, path):
+        if not path:
+            return None
+        try:
+            with open(path, encoding="utf-8") as baseline:
+                return {result["name"]: result for result in json.load(baseline)["routes"]}
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f"Can not read the baseline report: {error}")
+
+    def compare(self, report, baseline, options):
+        regressions = []
+        for result in report["routes"]:
+            previous = baseline.get(result["name"])
+            if previous is None:
+                continue
+
+            if result["queries"] > previous["queries"]:
+                regressions.append(
+                    f"{result['name']}: {previous['queries']} -> {result['queries']} queries"
+                )
+
+            before, after = previous["latency_ms"]["p95"], result["latency_ms"]["p95"]
+            growth = after - before
+            if growth > options["min_latency_regression_ms"] and growth > before * options["max_latency_regression"]:
+                regressions.append(f"{result['name']}: p95 {before}ms -> {after}ms")
+        return regressions
+
+    def print_summary(self, report):
+        for result in report["routes"]:
+            line = (
+                f"{result['name']:<70} {result['queries']:>3}/{result['query_budget']:<3} queries"
+                f"  p50 {result['latency_ms']['p50']:>8.2f}ms  p95 {result['latency_ms']['p95']:>8.2f}ms"
+                f"  {result['payload_bytes']:>8} bytes"
+            )
+            if result["failures"]:
+                self.stdout.write(self.style.ERROR(f"{line}  {'; '.join(result['failures'])}"))
+            else:
+                self.stdout.write(line)
+
+        for route in report["uncovered_routes"]:
+            self.stdout.write(self.style.ERROR(f"No benchmark spec for route {route}"))
+        for route in report["stale_specs"]:
+            self.stdout.write(self.style.ERROR(f"Benchmark spec for a missing route {route}"))
+        for regression in report.get("regressions", []):
+            self.stdout.write(self.style.ERROR(f"Regression: {regression}"))
+
+        if report["passed"]:
+            self.stdout.write(self.style.SUCCESS("All API routes are within their budgets."))
@@ -0,0 +1,97 @@
+import json
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework.renderers import JSONRenderer
+
+from core.renderers import ORJSONRenderer
+
+
+def sample_page(size):
+    """
+        A product list page of size items, with the types the serializers emit: Decimals
+        (cart totals of ExpressionWrapper), aware datetimes, lazy translations and nesting
+    """
+    now = timezone.now()
+    return {
+        "next": "http://localhost/api/product/list/?cursor=cD0yMDI2LTEwLTE4",
+        "previous": None,
+        "results": [
+            {
+                "id": index,
+                "name": f"گوشی موبایل سامسونگ مدل Galaxy A{index}",
+                "slug": f"samsung-galaxy-a{index}",
+                "brand": {"id": index % 40, "name": "سامسونگ", "slug": "samsung"},
+                "category": _("Product"),
+                "price": 12_500_000 + index,
+                "final_price": Decimal("11875000.00") + index,
+                "discount_percentage": 5,
+                "rating": Decimal("4.35"),
+                "is_available": bool(index % 3),
+                "cover_image": f"http://localhost/media/products/{index}/cover.jpg",
+                "created_at": now,
+                "colors": [
+                    {
+                        "id": index * 3 + color,
+                        "color": {"name": "مشکی", "code": "#000000"},
+                        "price": Decimal("11875000.00"),
+                        "stock": 10 + color,
+                    }
+                    for color in range(3)
+                ],
+            }
+            for index in range(size)
+        ],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Time DRF's JSONRenderer against ORJSONRenderer on synthetic product list pages "
+        "of several sizes, and check both produce the same JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="9,50,200,1000",
+            help="Comma separated numbers of items per page",
+        )
+        parser.add_argument("--iterations", type=int, default=200)
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options["sizes"].split(",") if size.strip()]
+        except ValueError:
+            raise CommandError("--sizes must be comma separated integers")
+        if not sizes or min(sizes) < 1 or options["iterations"] < 1:
+            raise CommandError("--sizes and --iterations must be at least 1")
+
+        renderers = {"json": JSONRenderer(), "orjson": ORJSONRenderer()}
+        self.stdout.write(f"{'items':>6} {'bytes':>9} {'json ms':>9} {'orjson ms':>10} {'speedup':>8}")
+        for size in sizes:
+            page = sample_page(size)
+            outputs = {name: renderer.render(page) for name, renderer in renderers.items()}
+            if json.loads(outputs["json"]) != json.loads(outputs["orjson"]):
+                raise CommandError(f"Renderers disagree on a page of {size} items")
+
+            timings = {name: self.time(renderer, page, options["iterations"]) for name, renderer in renderers.items()}
+            self.stdout.write(
+                f"{size:>6} {len(outputs['orjson']):>9} {timings['json']:>9.3f} {timings['orjson']:>10.3f} "
+                f"{timings['json'] / timings['orjson']:>7.1f}x"
+            )
+
+    def time(self, renderer, page, iterations):
+        """
+            Median milliseconds of one render
+        """
+        samples = []
+        for _iteration in range(iterations):
+            started = time.perf_counter()
+            renderer.render(page)
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples)
@@ -0,0 +1,109 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from core.renditions import RenditionsField, generate_renditions, renditions_updated
+
+
+def _setup_worker():
+    # Spawned workers (macOS, Windows) start without Django
+    if not apps.ready:
+        django.setup()
+
+
+def _render(label, field_name, pk, name):
+    field = apps.get_model(label)._meta.get_field(field_name)
+    storage = field.model._meta.get_field(field.source).storage
+    return pk, name, generate_renditions(storage, name)
+
+
+def _rendition_names(renditions):
+    return {name for widths in renditions.get("sources", {}).values() for name in widths.values()}
+
+
+def rendition_fields(labels=()):
+    for model in apps.get_models():
+        if labels and model._meta.label_lower not in labels:
+            continue
+        for field in model._meta.get_fields():
+            if isinstance(field, RenditionsField) and field.source:
+                yield model, field
+
+
+class Command(BaseCommand):
+    help = "Backfill the renditions of uploaded images, in parallel across a process pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            action="append",
+            default=[],
+            help="Only this model, as app_label.ModelName, can be repeated",
+        )
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenerate existing renditions too, e.g. after IMAGE_RENDITION_WIDTHS changed",
+        )
+
+    def handle(self, *args, **options):
+        labels = {label.lower() for label in options["model"]}
+        fields = list(rendition_fields(labels))
+        if labels and not fields:
+            raise CommandError(f"No model with renditions in {', '.join(options['model'])}")
+
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=options["workers"], initializer=_setup_worker) as pool:
+            for model, field in fields:
+                self.backfill(pool, model, field, options)
+
+    def backfill(self, pool, model, field, options):
+        source = field.source
+        queryset = model._base_manager.exclude(**{f"{source}__isnull": True}).exclude(**{source: ""})
+        if not options["force"]:
+            queryset = queryset.filter(**{field.attname: {}})
+        rows = queryset.order_by("pk").values_list("pk", source, field.attname)
+
+        label = model._meta.label_lower
+        has_updated_at = any(model_field.name == "updated_at" for model_field in model._meta.concrete_fields)
+        storage = model._meta.get_field(source).storage
+
+        last_pk = 0
+        done = 0
+        while True:
+            batch = list(rows.filter(pk__gt=last_pk)[: options["batch_size"]])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            previous = {pk: renditions for pk, _, renditions in batch}
+
+            futures = [pool.submit(_render, label, field.name, pk, name) for pk, name, _ in batch]
+            updated = []
+            for future in as_completed(futures):
+                pk, name, renditions = future.result()
+                values = {field.attname: renditions}
+                if has_updated_at:
+                    values["updated_at"] = timezone.now()
+                # Skip rows whose file changed meanwhile, their own save made new renditions
+                if model._base_manager.filter(pk=pk, **{source: name}).update(**values):
+                    updated.append(pk)
+                    self.delete_replaced(storage, previous[pk], renditions)
+
+            if updated:
+                renditions_updated.send(sender=model, pks=updated)
+            done += len(updated)
+            self.stdout.write(f"{model._meta.label}: {done} images...")
+
+        self.stdout.write(self.style.SUCCESS(f"{model._meta.label}.{field.name}: renditions of {done} images written."))
+
+    def delete_replaced(self, storage, previous, current):
+        for name in _rendition_names(previous) - _rendition_names(current):
+            storage.delete(name)
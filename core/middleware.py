@@ -0,0 +1,114 @@
+"""
+    Response compression, gzip or brotli as negotiated from Accept-Encoding.
+
+    Responses of the catalog cache (CatalogCacheMixin sets response.catalog_cache_key)
+    are public and keep their compressed bodies in the cache next to the plain one, under
+    the same versioned key, so a hot page is compressed once per catalog version and
+    encoding. Every other response may hold a secret (CSRF token, JWT, cart) next to
+    reflected input: it is gzipped with the random padding of Django's GZipMiddleware
+    against BREACH, and never brotli compressed, which has no such padding.
+    brotli is optional, without the package only gzip is offered.
+"""
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Random bytes added to the gzip header of uncached responses, as GZipMiddleware does
+MAX_RANDOM_BYTES = 100
+
+COMPRESSIBLE_TYPES = re.compile(r"^(text/|application/(.*\+)?(json|xml|javascript))")
+
+
+def accepted_encodings(header):
+    """
+        Content codings of an Accept-Encoding header that are not refused with q=0
+    """
+    encodings = set()
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            encodings.add(coding.strip().lower())
+    return encodings
+
+
+def compress(content, encoding, max_random_bytes=0):
+    if encoding == "br":
+        return brotli.compress(content, quality=settings.API_COMPRESSION_BROTLI_QUALITY)
+    return compress_string(content, max_random_bytes=max_random_bytes)
+
+
+class CompressionMiddleware:
+    """
+        Compresses non streaming text and JSON responses of at least
+        API_COMPRESSION_MIN_SIZE bytes. Must come before any middleware that reads
+        or changes the body, the same place as Django's GZipMiddleware.
+        Streaming responses (the product feed) compress themselves.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.public_encodings = ("br", "gzip") if brotli is not None else ("gzip",)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self.is_compressible(response):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        accepted = accepted_encodings(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        encodings = self.public_encodings if self.is_public(response) else ("gzip",)
+        encoding = next((encoding for encoding in encodings if encoding in accepted), None)
+        if encoding is None:
+            return response
+
+        content = self.compressed_content(response, encoding)
+        if len(content) >= len(response.content):
+            return response
+
+        response.content = content
+        response["Content-Length"] = str(len(content))
+        response["Content-Encoding"] = encoding
+        # The compressed body is a different representation, as Django's GZipMiddleware does
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
+
+    def is_compressible(self, response):
+        return (
+            not response.streaming
+            and not response.has_header("Content-Encoding")
+            and "no-transform" not in response.get("Cache-Control", "")
+            and bool(COMPRESSIBLE_TYPES.match(response.get("Content-Type", "")))
+            and len(response.content) >= settings.API_COMPRESSION_MIN_SIZE
+        )
+
+    def is_public(self, response):
+        return getattr(response, "catalog_cache_key", None) is not None
+
+    def compressed_content(self, response, encoding):
+        if not self.is_public(response):
+            return compress(response.content, encoding, max_random_bytes=MAX_RANDOM_BYTES)
+
+        cache_key = f"{response.catalog_cache_key}:{encoding}"
+        content = cache.get(cache_key)
+        if content is None:
+            content = compress(response.content, encoding)
+            cache.set(cache_key, content, settings.CATALOG_CACHE_TIMEOUT)
+        return content
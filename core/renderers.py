@@ -0,0 +1,55 @@
+"""
+    JSON renderer and parser backed by orjson, enabled by settings.API_FAST_JSON.
+
+    Output matches rest_framework's JSONRenderer: compact, UTF-8, \u2028/\u2029 escaped,
+    datetimes in ISO 8601 with "Z" for UTC, Decimals (the cart totals of ExpressionWrapper)
+    as numbers and lazy translation strings as text. Anything else orjson does not know
+    (querysets, UUIDs in keys...) goes through DRF's JSONEncoder. Pretty printed responses
+    (indent, e.g. the browsable API) are left to the stdlib renderer.
+"""
+from decimal import Decimal
+
+import orjson
+from django.utils.functional import Promise
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+_encoder = JSONEncoder()
+
+
+def _default(obj):
+    # The common types first, JSONEncoder.default walks a long isinstance chain
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, Promise):
+        return str(obj)
+    return _encoder.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        rendered = orjson.dumps(data, default=_default, option=OPTIONS)
+        # Keep the output a strict javascript subset, like JSONRenderer
+        if b"\xe2\x80\xa8" in rendered or b"\xe2\x80\xa9" in rendered:
+            rendered = rendered.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return rendered
+
+
+class ORJSONParser(JSONParser):
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            # orjson only reads UTF-8, which is what JSON bodies are (RFC 8259)
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as error:
+            raise ParseError(f"JSON parse error - {error}")
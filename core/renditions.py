@@ -0,0 +1,216 @@
+"""
+    Resized copies of uploaded images in modern formats.
+
+    A RenditionsField next to an ImageField regenerates the renditions whenever the
+    stored file changes. The field holds the original dimensions and the storage name of
+    every rendition, RenditionURLsField turns them into URLs for the API.
+"""
+import logging
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import models
+from django.db.models.signals import post_save
+from django.dispatch import Signal
+from drf_spectacular.utils import extend_schema_field
+from PIL import Image, ImageOps, UnidentifiedImageError
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS_DIR = "renditions"
+
+# Sent with sender=model and pks after renditions were written by a queryset update
+# (the generate_renditions command), regular saves send post_save instead
+renditions_updated = Signal()
+
+# Preferred format first, JPEG is the fallback every browser understands
+FORMATS = {
+    "avif": {"format": "AVIF", "quality": 60},
+    "webp": {"format": "WEBP", "method": 4},
+    "jpeg": {"format": "JPEG", "optimize": True, "progressive": True},
+}
+
+
+def available_formats():
+    Image.init()
+    return [name for name, options in FORMATS.items() if options["format"] in Image.SAVE]
+
+
+def rendition_widths(width):
+    """
+        Configured widths narrower than the original, or the original width
+        when it is narrower than all of them. Images are never upscaled.
+    """
+    widths = [size for size in settings.IMAGE_RENDITION_WIDTHS if size < width]
+    return widths or [width]
+
+
+def rendition_name(name, width, extension):
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(RENDITIONS_DIR, directory, f"{stem}-{width}w.{extension}")
+
+
+def _encode(image, options, icc_profile=None):
+    if options["format"] == "JPEG" and image.mode != "RGB":
+        # JPEG has no alpha channel, flatten transparent images on white
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+
+    buffer = BytesIO()
+    save_options = {"quality": settings.IMAGE_RENDITION_QUALITY, **options}
+    if icc_profile:
+        save_options["icc_profile"] = icc_profile
+    # EXIF is dropped by not passing it on
+    image.save(buffer, **save_options)
+    return buffer.getvalue()
+
+
+def generate_renditions(storage, name):
+    """
+        Write the renditions of the stored image `name` and return the value of its
+        RenditionsField. A missing file or a file that is not an image gets no
+        sources, so it is not retried until the file changes.
+    """
+    try:
+        with storage.open(name, "rb") as source:
+            image = Image.open(source)
+            image.load()
+    except (OSError, UnidentifiedImageError) as error:
+        logger.warning("Can not create renditions of %s: %s", name, error)
+        return {"source": name, "sources": {}}
+
+    icc_profile = image.info.get("icc_profile")
+    # Apply the EXIF orientation before EXIF is dropped
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA"):
+        has_alpha = "A" in image.getbands() or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+    width, height = image.size
+    sources = {}
+    for target_width in rendition_widths(width):
+        resized = image.resize(
+            (target_width, max(1, round(height * target_width / width))), Image.Resampling.LANCZOS
+        )
+        for extension in available_formats():
+            target = rendition_name(name, target_width, extension)
+            if storage.exists(target):
+                storage.delete(target)
+            content = _encode(resized, FORMATS[extension], icc_profile)
+            sources.setdefault(extension, {})[str(target_width)] = storage.save(target, ContentFile(content))
+
+    return {"source": name, "width": width, "height": height, "sources": sources}
+
+
+def delete_renditions(storage, renditions):
+    for names in renditions.get("sources", {}).values():
+        for name in names.values():
+            storage.delete(name)
+
+
+class RenditionsField(models.JSONField):
+    """
+        Renditions of the ImageField named `source` of the same model.
+        Regenerated after a save that changed the stored file.
+    """
+
+    def __init__(self, *args, source=None, **kwargs):
+        self.source = source
+        kwargs.setdefault("default", dict)
+        kwargs.setdefault("blank", True)
+        kwargs.setdefault("editable", False)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.source:
+            kwargs["source"] = self.source
+        for key, value in (("default", dict), ("blank", True), ("editable", False)):
+            if kwargs.get(key) is value:
+                del kwargs[key]
+        return name, path, args, kwargs
+
+    def contribute_to_class(self, cls, name, **kwargs):
+        super().contribute_to_class(cls, name, **kwargs)
+        # Without a source the field only holds renditions copied from elsewhere.
+        # Historical models of migrations are skipped.
+        if self.source and not cls._meta.abstract and cls.__module__ != "__fake__":
+            post_save.connect(self.update_renditions, sender=cls, weak=False)
+
+    def update_renditions(self, instance, raw=False, **kwargs):
+        if raw:
+            return
+
+        file = getattr(instance, self.source)
+        current = getattr(instance, self.attname) or {}
+        name = file.name if file else None
+        if current.get("source") == name or (not name and not current):
+            return
+
+        storage = file.storage
+        if current:
+            delete_renditions(storage, current)
+        renditions = generate_renditions(storage, name) if name else {}
+
+        # A queryset update, so saving the renditions does not fire the signals again
+        setattr(instance, self.attname, renditions)
+        type(instance)._base_manager.filter(pk=instance.pk).update(**{self.attname: renditions})
+
+
+@extend_schema_field(
+    {
+        "type": "object",
+        "nullable": True,
+        "properties": {
+            "width": {"type": "integer"},
+            "height": {"type": "integer"},
+            "sources": {
+                "type": "object",
+                "additionalProperties": {"type": "object", "additionalProperties": {"type": "string"}},
+            },
+            "srcset": {"type": "object", "additionalProperties": {"type": "string"}},
+        },
+    }
+)
+class RenditionURLsField(serializers.Field):
+    """
+        Read only {"width", "height", "sources": {format: {width: url}}, "srcset": {format: srcset}}
+        from a RenditionsField, formats in order of preference
+    """
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value or not value.get("sources"):
+            return None
+
+        request = self.context.get("request")
+        sources = {}
+        # jsonb does not keep the key order
+        for extension in FORMATS:
+            names = value["sources"].get(extension)
+            if not names:
+                continue
+            urls = {}
+            for width in sorted(names, key=int):
+                url = default_storage.url(names[width])
+                urls[width] = request.build_absolute_uri(url) if request is not None else url
+            sources[extension] = urls
+
+        return {
+            "width": value["width"],
+            "height": value["height"],
+            "sources": sources,
+            "srcset": {
+                extension: ", ".join(f"{url} {width}w" for width, url in urls.items())
+                for extension, urls in sources.items()
+            },
+        }
@@ -0,0 +1,183 @@
+"""
+    Sparse fieldsets and opt-in expansion for API responses.
+
+        ?fields=id,name,colors.price     only these fields, dotted names pick fields of nested serializers
+        ?expand=brand,colors.images      also the expandable_fields, which are left out by default
+
+    Serializers declare the relations behind their fields, and SparseFieldsetsFilter (or
+    prefetch_requested for single objects) loads only the relations the response needs.
+"""
+from django.db.models import prefetch_related_objects
+from django.utils.encoding import force_str
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+
+FIELDS_PARAM = "fields"
+EXPAND_PARAM = "expand"
+
+
+def parse_field_paths(value):
+    """
+        "id,colors.price,colors.images" as {"id": {}, "colors": {"price": {}, "images": {}}}
+    """
+    tree = {}
+    for path in value.split(","):
+        node = tree
+        for name in path.strip().split("."):
+            if name:
+                node = node.setdefault(name, {})
+    return tree
+
+
+def requested_shape(request):
+    """
+        (fields tree, or None for the default fields, expand tree) of the request
+    """
+    if request is None:
+        return None, {}
+    fields = request.query_params.get(FIELDS_PARAM, "").strip()
+    expand = request.query_params.get(EXPAND_PARAM, "")
+    return (parse_field_paths(fields) if fields else None), parse_field_paths(expand)
+
+
+def _serializer_of(field):
+    field = getattr(field, "child", field)
+    return field if isinstance(field, DynamicFieldsMixin) else None
+
+
+class DynamicFieldsMixin:
+    """
+        The outermost serializer reads ?fields= and ?expand= from the request in its
+        context and hands each nested DynamicFieldsMixin serializer its part of them.
+
+        expandable_fields: {name: (serializer class, kwargs)} added only when expanded.
+        select_related_fields / prefetch_related_fields: {name: lookup} of the relations
+        a field reads, see related_lookups().
+    """
+    expandable_fields = {}
+    select_related_fields = {}
+    prefetch_related_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        self._shape = kwargs.pop("shape", None)
+        super().__init__(*args, **kwargs)
+
+    def get_shape(self):
+        if self._shape is None:
+            parent = self.parent
+            if isinstance(parent, serializers.ListSerializer):
+                parent = parent.parent
+            # Nested under a serializer without the mixin: the default fields
+            self._shape = requested_shape(self.context.get("request")) if parent is None else (None, {})
+        return self._shape
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested, expand = self.get_shape()
+
+        for name, (serializer_class, kwargs) in self.expandable_fields.items():
+            if name in expand:
+                fields[name] = serializer_class(**kwargs)
+        if requested is not None:
+            fields = {name: field for name, field in fields.items() if name in requested}
+
+        for name, field in fields.items():
+            nested = _serializer_of(field)
+            if nested is not None:
+                nested._shape = ((requested or {}).get(name) or None, expand.get(name, {}))
+        return fields
+
+    @classmethod
+    def field_serializers(cls):
+        """
+            {name: nested DynamicFieldsMixin serializer class} of the declared and expandable fields
+        """
+        nested = {}
+        for name, field in cls._declared_fields.items():
+            serializer = _serializer_of(field)
+            if serializer is not None:
+                nested[name] = type(serializer)
+        for name, (serializer_class, _) in cls.expandable_fields.items():
+            if issubclass(serializer_class, DynamicFieldsMixin):
+                nested[name] = serializer_class
+        return nested
+
+    @classmethod
+    def related_lookups(cls, requested=None, expand=None):
+        """
+            (select_related, prefetch_related) lookups of the relations read by the
+            requested shape. Below a prefetched relation every lookup is a prefetch.
+        """
+        expand = expand or {}
+        names = set(requested) if requested is not None else set(cls.Meta.fields)
+        names |= set(expand) & set(cls.expandable_fields)
+        if requested is not None:
+            names &= set(requested)
+
+        select, prefetch = [], []
+        nested = cls.field_serializers()
+        for name in sorted(names):
+            for lookups, relation in (
+                (select, cls.select_related_fields.get(name)),
+                (prefetch, cls.prefetch_related_fields.get(name)),
+            ):
+                if relation is None:
+                    continue
+                lookups.append(relation)
+                if name not in nested:
+                    continue
+                child_select, child_prefetch = nested[name].related_lookups(
+                    (requested or {}).get(name) or None, expand.get(name)
+                )
+                lookups.extend(f"{relation}__{lookup}" for lookup in child_select)
+                prefetch.extend(f"{relation}__{lookup}" for lookup in child_prefetch)
+        return select, prefetch
+
+
+def _lookups(serializer_class, request):
+    if not issubclass(serializer_class, DynamicFieldsMixin):
+        return [], []
+    return serializer_class.related_lookups(*requested_shape(request))
+
+
+def prefetch_requested(instances, serializer_class, request):
+    """
+        Load the relations serializer_class needs for instances that are already fetched
+    """
+    select, prefetch = _lookups(serializer_class, request)
+    prefetch_related_objects(instances, *select, *prefetch)
+
+
+class SparseFieldsetsFilter(BaseFilterBackend):
+    """
+        Joins and prefetches the relations of the fields the request asks for, and only those
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        select, prefetch = _lookups(view.get_serializer_class(), request)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+    def get_schema_operation_parameters(self, view):
+        expandable = ", ".join(getattr(view.get_serializer_class(), "expandable_fields", {}))
+        return [
+            {
+                "name": FIELDS_PARAM,
+                "required": False,
+                "in": "query",
+                "description": force_str(
+                    "Comma separated fields to return, dotted for nested fields, e.g. id,name,colors.price"
+                ),
+                "schema": {"type": "string"},
+            },
+            {
+                "name": EXPAND_PARAM,
+                "required": False,
+                "in": "query",
+                "description": force_str(f"Comma separated extra relations to include: {expandable or '-'}"),
+                "schema": {"type": "string"},
+            },
+        ]
@@ -0,0 +1,38 @@
+from django.db.models import TextField, Value
+from django.test import TestCase
+
+from core.text import CHARACTER_MAP, REMOVED_CHARACTERS, normalize_persian, normalized_text
+from product.models import Brand
+
+
+class NormalizedTextTests(TestCase):
+    """
+        normalize_persian (queries) and normalized_text (stored columns) must agree,
+        or searches silently stop matching
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        Brand.objects.create(name="برند")
+
+    def normalized_in_sql(self, text):
+        return (
+            Brand.objects.annotate(text=Value(text, output_field=TextField()))
+            .annotate(normalized=normalized_text("text"))
+            .values_list("normalized", flat=True)
+            .get()
+        )
+
+    def test_every_character(self):
+        for character in [*CHARACTER_MAP, *REMOVED_CHARACTERS]:
+            with self.subTest(character=f"U+{ord(character):04X}"):
+                self.assertEqual(self.normalized_in_sql(character), normalize_persian(character))
+
+    def test_text(self):
+        text = "كيف چرمی\u200c مشكي ۱۲۳ Ab\u064e\u0640C " + "".join(CHARACTER_MAP) + REMOVED_CHARACTERS
+        self.assertEqual(self.normalized_in_sql(text), normalize_persian(text))
+
+    def test_stored_column(self):
+        brand = Brand.objects.create(name="سامسونگ\u200c كره")
+        brand.refresh_from_db()
+        self.assertEqual(brand.search_name, normalize_persian(brand.name))
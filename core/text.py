@@ -0,0 +1,52 @@
+"""
+    Canonical search form of Persian text.
+
+    Catalog data mixes the Arabic and Persian forms of the same letters (ي/ی, ك/ک),
+    Persian, Arabic-Indic and Latin digits, diacritics and zero-width non-joiners.
+    Stored search columns (normalized_text in SQL) and incoming queries
+    (normalize_persian in Python) go through the same mapping, so a single lookup
+    matches every spelling.
+"""
+from django.db.models import F, Func, TextField, Value
+from django.db.models.functions import Lower
+
+CHARACTER_MAP = {
+    "ي": "ی",
+    "ى": "ی",
+    "ك": "ک",
+    "ة": "ه",
+    "ۀ": "ه",
+    "أ": "ا",
+    "إ": "ا",
+    "ٱ": "ا",
+    # Persian and Arabic-Indic digits
+    **{chr(0x06F0 + digit): str(digit) for digit in range(10)},
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+    # Zero-width non-joiner, "می‌شود" and "می شود" are the same words
+    "\u200c": " ",
+}
+# Tatweel, diacritics (fathatan..sukun, superscript alef), zero-width joiner and direction marks
+REMOVED_CHARACTERS = "\u0640" + "".join(chr(code) for code in range(0x064B, 0x0653)) + "\u0670\u200d\u200e\u200f"
+
+_TRANSLATION = str.maketrans({**CHARACTER_MAP, **dict.fromkeys(REMOVED_CHARACTERS)})
+
+
+def normalize_persian(text):
+    return text.translate(_TRANSLATION).lower()
+
+
+def normalized_text(field):
+    """
+        SQL counterpart of normalize_persian for field, immutable so it can back
+        a GeneratedField or an index. TRANSLATE drops the characters it has no
+        replacement for.
+    """
+    return Lower(
+        Func(
+            F(field),
+            Value("".join(CHARACTER_MAP) + REMOVED_CHARACTERS),
+            Value("".join(CHARACTER_MAP.values())),
+            function="TRANSLATE",
+            output_field=TextField(),
+        )
+    )
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0011_alter_cart_created_by'),
+        ('product', '0039_popularity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_color',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order_items', to='product.productcolor', verbose_name='محصول'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0012_orderitem_product_color'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='co_purchases_counted',
+            field=models.BooleanField(default=False, editable=False, verbose_name='شمارش شده در محصولات مرتبط'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('co_purchases_counted', False)), fields=['id'], name='order_co_purchases_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations
+
+BATCH_SIZE = 2000
+
+
+def link_order_items(apps, schema_editor):
+    # Items ordered before 0012 only kept the product name and color code. They are linked
+    # when exactly one variant has both, ambiguous and unknown items stay unlinked.
+    OrderItem = apps.get_model('order', 'OrderItem')
+    ProductColor = apps.get_model('product', 'ProductColor')
+
+    variants = {}
+    for pk, name, code in ProductColor.objects.values_list('pk', 'product__name', 'color__code').iterator():
+        variants.setdefault((name, code.lower()), []).append(pk)
+
+    items = OrderItem.objects.filter(product_color__isnull=True).order_by('pk')
+    last_pk = 0
+    while batch := list(items.filter(pk__gt=last_pk).only('pk', 'product_name', 'color_code')[:BATCH_SIZE]):
+        last_pk = batch[-1].pk
+        linked = []
+        for item in batch:
+            matches = variants.get((item.product_name, (item.color_code or '').lower()), [])
+            if len(matches) == 1:
+                item.product_color_id = matches[0]
+                linked.append(item)
+        OrderItem.objects.bulk_update(linked, ['product_color'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0013_order_co_purchases_counted'),
+        ('product', '0044_rebuild_search_vectors'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_order_items, migrations.RunPython.noop),
+    ]
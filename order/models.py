@@ -180,6 +180,11 @@ class Order(AuditableModel, SoftDeleteModel):
         default=0, verbose_name="هزینه ارسال/حمل و نقل(تومان)"
     )
     final_price = models.PositiveBigIntegerField(default = 0,verbose_name="مبلغ نهایی(تومان)")
+    # Reset by order.signals on every change of the order or its items,
+    # set by product.service.related once the current items are counted
+    co_purchases_counted = models.BooleanField(
+        default=False, editable=False, verbose_name="شمارش شده در محصولات مرتبط"
+    )
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
@@ -193,12 +198,28 @@ class Order(AuditableModel, SoftDeleteModel):
     class Meta:
         verbose_name = "سفارش"
         verbose_name_plural = "سفارشات"
+        indexes = [
+            # The orders update_related_products still has to count
+            models.Index(
+                fields=["id"],
+                condition=models.Q(co_purchases_counted=False),
+                name="order_co_purchases_pending_idx",
+            ),
+        ]
 
 
 class OrderItem(AuditableModel, SoftDeleteModel):
     order = models.ForeignKey(
         Order, on_delete=models.CASCADE, related_name="items", verbose_name="سفارش"
     )
+    product_color = models.ForeignKey(
+        ProductColor,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="order_items",
+        verbose_name="محصول",
+    )
     product_name = models.CharField(max_length=100, verbose_name="نام محصول")
     color_code = ColorField(default = "#ffffff" ,verbose_name="کد رنگ (HEX)")
     product_price = models.PositiveBigIntegerField(default = 0,
@@ -1,10 +1,11 @@
 from rest_framework import serializers
 
+from core.serializers import DynamicFieldsMixin
 from order.models import Cart, CartItem, Delivery, DiscountCode
 from product.models import Color, Product, ProductColor
 
 
-class DiscountCodeOrderSerializer(serializers.ModelSerializer):
+class DiscountCodeOrderSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     
     class Meta:
         model = DiscountCode
@@ -23,41 +24,56 @@ class AddToCartSerializer(serializers.Serializer):
 #     )
 #     deleted = serializers.BooleanField(required = False,help_text="Force remove item from cart instead of decreasing quantity")
 
-class DeliverySerializer(serializers.ModelSerializer):
+class DeliverySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     
     class Meta:
         model = Delivery
         fields = ['id','name','cost','is_active']
 
-class ColorOrderSerializer(serializers.ModelSerializer):
+class ColorOrderSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     
     class Meta:
         model = Color
         fields = ['name','code']
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     
     class Meta:
         model = Product
         fields = ['name']
 
-class ProductColorCartSerializer(serializers.ModelSerializer):
+class ProductColorCartSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     product = ProductSerializer() 
     color = ColorOrderSerializer()
+    # price falls back to the product's fixed price
+    select_related_fields = {"product": "product", "color": "color", "price": "product", "discounted_price": "product"}
     class Meta:
         model = ProductColor
         fields = ['id','product','color','price','discounted_price']
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     product_color = ProductColorCartSerializer()
+    select_related_fields = {
+        "product_color": "product_color",
+        "total_price": "product_color__product",
+        "discounted_price": "product_color__product",
+    }
     class Meta:
         model = CartItem
         fields = ['id','product_color','count','total_price','discounted_price']
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     items = CartItemSerializer(many = True)
     discount_code = DiscountCodeOrderSerializer()
     item_count = serializers.SerializerMethodField()
+    expandable_fields = {"delivery_type": (DeliverySerializer, {})}
+    select_related_fields = {"discount_code": "discount_code", "delivery_type": "delivery_type"}
+    prefetch_related_fields = {
+        "items": "items",
+        "item_count": "items",
+        "total_price": "items__product_color__product",
+        "discounted_price": "items__product_color__product",
+    }
     class Meta:
         model = Cart
         fields = ['id','status','discount_code','delivery_type','total_price','discounted_price','item_count','items']
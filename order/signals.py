@@ -0,0 +1,102 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from order.models import Order, OrderItem
+from product.models import ProductColor
+from product.service.popularity import record_sales
+
+CANCELED = "canceled"
+
+
+def counts_as_sold(order):
+    return order.status != CANCELED and not order.is_deleted
+
+
+def sold_units(item, order):
+    """
+        (product_id, units) the item counts towards the product's sales
+    """
+    if not item.product_color_id or item.is_deleted or not counts_as_sold(order):
+        return None, 0
+    product_id = ProductColor.all_objects.filter(pk=item.product_color_id).values_list("product_id", flat=True).first()
+    return product_id, item.product_count
+
+
+def _add(units, product_id, count):
+    if product_id:
+        units[product_id] = units.get(product_id, 0) + count
+
+
+# <------------ Sales ---------------->
+
+
+@receiver(pre_save, sender=OrderItem)
+def remember_previous_sale(sender, instance, raw=False, **kwargs):
+    previous = OrderItem.all_objects.select_related("order").filter(pk=instance.pk).first() if instance.pk else None
+    instance._previous_sale = sold_units(previous, previous.order) if previous else (None, 0)
+
+
+@receiver(post_save, sender=OrderItem)
+def record_order_item_sale(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    units = {}
+    _add(units, *sold_units(instance, instance.order))
+    product_id, count = getattr(instance, "_previous_sale", (None, 0))
+    _add(units, product_id, -count)
+    record_sales(units)
+
+
+@receiver(post_delete, sender=OrderItem)
+def remove_order_item_sale(sender, instance, **kwargs):
+    # Also sent for the items of a deleted order, before the order row goes
+    order = Order.all_objects.filter(pk=instance.order_id).first()
+    if order is not None:
+        product_id, count = sold_units(instance, order)
+        record_sales({product_id: -count})
+
+
+@receiver(pre_save, sender=Order)
+def remember_previous_status(sender, instance, **kwargs):
+    previous = Order.all_objects.filter(pk=instance.pk).first() if instance.pk else None
+    instance._was_counted = previous is not None and counts_as_sold(previous)
+
+
+@receiver(post_save, sender=Order)
+def record_order_status_sales(sender, instance, created=False, raw=False, **kwargs):
+    if raw or created:
+        return
+    counted = counts_as_sold(instance)
+    if counted == getattr(instance, "_was_counted", counted):
+        return
+
+    # Cancelled (or deleted) orders give their sales back, reopened orders take them again
+    sign = 1 if counted else -1
+    units = {}
+    items = OrderItem.objects.filter(order=instance, product_color__isnull=False).values_list(
+        "product_color__product_id", "product_count"
+    )
+    for product_id, count in items:
+        _add(units, product_id, sign * count)
+    record_sales(units)
+
+
+# <------------ Co-purchases ---------------->
+
+
+def recount_co_purchases(order_id):
+    # A queryset update, it sends no signal and does not touch updated_at
+    Order.all_objects.filter(pk=order_id, co_purchases_counted=True).update(co_purchases_counted=False)
+
+
+@receiver(post_save, sender=Order)
+def order_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        recount_co_purchases(instance.pk)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def order_item_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        recount_co_purchases(instance.order_id)
@@ -11,6 +11,7 @@ from order.serializers import (
     DeliverySerializer,
 )
 
+from core.serializers import prefetch_requested
 from product.models import ProductColor
 from order.serializers import AddToCartSerializer
 
@@ -44,7 +45,14 @@ class CartViewSet(viewsets.ViewSet):
 
             If the cart does not exist, it will be created automatically.
             Used to display cart details and start checkout flow.
+
+            `fields=id,total_price,items.count` limits the cart_detail fields and
+            `expand=delivery_type` returns the delivery method instead of its id.
         """,
+        parameters=[
+            OpenApiParameter(name="fields", type=OpenApiTypes.STR),
+            OpenApiParameter(name="expand", type=OpenApiTypes.STR),
+        ],
         responses={200: CartSerializer},
         tags=["Order"],
     )
@@ -101,7 +109,8 @@ class CartViewSet(viewsets.ViewSet):
                 cart.discount_code = None
                 cart.save()
 
-        context["cart_detail"] = CartSerializer(instance=cart).data
+        prefetch_requested([cart], CartSerializer, request)
+        context["cart_detail"] = CartSerializer(instance=cart, context={"request": request}).data
 
         return Response(
             context,
@@ -55,7 +55,7 @@ class ProductAdmin(admin.ModelAdmin):
     list_filter = ('category', 'brand', 'is_published', 'is_favorite')
     search_fields = ('name', 'category__name', 'brand__name')
     ordering = ('category', 'name')
-    readonly_fields = ('created_at', 'updated_at', 'deleted_at', 'created_by', 'updated_by')
+    readonly_fields = ('created_at', 'updated_at', 'deleted_at', 'created_by', 'updated_by', 'total_stock', 'sales_count', 'view_count', 'rating', 'rating_count', 'popularity')
     # inlines = [ProductColorInline]
 
 
@@ -92,7 +92,7 @@ class ProductImageAdmin(admin.ModelAdmin):
 # ------------------- ProductComment -------------------
 @admin.register(ProductComment)
 class ProductCommentAdmin(admin.ModelAdmin):
-    list_display = ('id', 'created_by', 'product', 'text', 'is_approved', 'created_at', 'updated_at','is_deleted')
+    list_display = ('id', 'created_by', 'product', 'text', 'rating', 'is_approved', 'created_at', 'updated_at','is_deleted')
     list_editable = ('is_approved','is_deleted')
     list_filter = ('product', 'created_by', 'is_approved')
     search_fields = ('user__username', 'product__name', 'text')
@@ -1,20 +1,137 @@
 import django_filters
 from django_filters import rest_framework as filters
-from product.models import Product
+from django.db.models import Exists, OuterRef
+from django.utils.encoding import force_str
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+from product.models import Product, ProductColor, ProductListing
+from product.service.search import search_products
 
 class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
     pass
 
-class ProductFilter(django_filters.FilterSet):
-    min_price = django_filters.NumberFilter(field_name="fixed_price", lookup_expr="gte")
+COLOR_MATCH_CHOICES = [("any", "any"), ("all", "all")]
 
-    max_price = django_filters.NumberFilter(field_name="fixed_price", lookup_expr="lte")
 
-    brand = NumberInFilter(field_name="brand__id",lookup_expr='in')
+class ColorMatchMixin:
+    """
+        `color` keeps products with any of the colors, or all of them with color_match=all
+    """
 
-    color = NumberInFilter(field_name="colors__color__id",lookup_expr = 'in')
+    def match_all_colors(self):
+        return self.form.cleaned_data.get("color_match") == "all"
+
+    def filter_color_match(self, queryset, name, value):
+        # Read by filter_color
+        return queryset
+
+
+class ProductFilter(ColorMatchMixin, django_filters.FilterSet):
+    # Selling price of the cheapest variant, after discounts
+    min_price = django_filters.NumberFilter(field_name="min_discounted_price", lookup_expr="gte")
+
+    max_price = django_filters.NumberFilter(field_name="min_discounted_price", lookup_expr="lte")
+
+    brand = NumberInFilter(field_name="brand_id",lookup_expr='in')
+
+    color = NumberInFilter(method="filter_color")
+
+    color_match = django_filters.ChoiceFilter(choices=COLOR_MATCH_CHOICES, method="filter_color_match")
+
+    in_stock = django_filters.BooleanFilter(field_name="is_available")
 
     class Meta:
         model = Product
-        fields = ["min_price", "max_price", "brand", "color"]
+        fields = ["min_price", "max_price", "brand", "color", "color_match", "in_stock"]
+
+    def filter_color(self, queryset, name, value):
+        # Correlated EXISTS instead of a join, a product with several matching
+        # variants is still one row and the list needs no DISTINCT
+        color_ids = {int(color_id) for color_id in value}
+        variants = ProductColor.objects.filter(product=OuterRef("pk"))
+        if self.match_all_colors():
+            for color_id in color_ids:
+                queryset = queryset.filter(Exists(variants.filter(color_id=color_id)))
+            return queryset
+        return queryset.filter(Exists(variants.filter(color_id__in=color_ids)))
+
+
+class ProductListingFilter(ColorMatchMixin, django_filters.FilterSet):
+    min_price = django_filters.NumberFilter(field_name="min_discounted_price", lookup_expr="gte")
+
+    max_price = django_filters.NumberFilter(field_name="min_discounted_price", lookup_expr="lte")
+
+    brand = NumberInFilter(field_name="brand_id", lookup_expr="in")
+
+    color = NumberInFilter(method="filter_color")
+
+    color_match = django_filters.ChoiceFilter(choices=COLOR_MATCH_CHOICES, method="filter_color_match")
+
+    in_stock = django_filters.BooleanFilter(field_name="is_available")
+
+    class Meta:
+        model = ProductListing
+        fields = ["min_price", "max_price", "brand", "color", "color_match", "in_stock"]
+
+    def filter_color(self, queryset, name, value):
+        color_ids = [int(color_id) for color_id in value]
+        if self.match_all_colors():
+            return queryset.filter(color_ids__contains=color_ids)
+        return queryset.filter(color_ids__overlap=color_ids)
+
+
+class CatalogOrderingFilter(OrderingFilter):
+    """
+        OrderingFilter with the named orderings of the view's ordering_aliases,
+        e.g. ordering=best_selling expands to -sales_count and -best_selling to sales_count.
+        The expanded fields must be in ordering_fields.
+    """
+
+    def expand_aliases(self, terms, view):
+        aliases = getattr(view, "ordering_aliases", {})
+        expanded = []
+        for term in terms:
+            fields = aliases.get(term.lstrip("-"))
+            if fields is None:
+                expanded.append(term)
+            elif term.startswith("-"):
+                expanded.extend(field[1:] if field.startswith("-") else f"-{field}" for field in fields)
+            else:
+                expanded.extend(fields)
+        return expanded
+
+    def get_ordering(self, request, queryset, view):
+        params = request.query_params.get(self.ordering_param)
+        if params:
+            terms = self.expand_aliases([param.strip() for param in params.split(",")], view)
+            ordering = self.remove_invalid_fields(queryset, terms, view, request)
+            if ordering:
+                return ordering
+        return self.get_default_ordering(view)
+
+
+class ProductSearchFilter(BaseFilterBackend):
+    """
+        Full-text search over the stored, weighted Product.search_vector.
+        Results are ordered by rank unless an explicit ordering is requested,
+        so this backend must come before OrderingFilter in filter_backends.
+    """
+    search_param = "search"
+    search_description = "Search in name, specifications and description."
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, "").strip()
+        if not text:
+            return queryset
+        vector_field = getattr(view, "search_vector_field", "search_vector")
+        return search_products(queryset, text, vector_field=vector_field)
 
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.search_param,
+                "required": False,
+                "in": "query",
+                "description": force_str(self.search_description),
+                "schema": {"type": "string"},
+            },
+        ]
@@ -0,0 +1,48 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from product.service.feed import FEED_FORMATS, render_feed
+
+
+class Command(BaseCommand):
+    help = "Write the product feed for marketplaces to a file, streamed from the listing table"
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help='Output file, "-" writes to stdout. A .gz name is gzip compressed')
+        parser.add_argument("--format", choices=list(FEED_FORMATS), help="Default: from the file name")
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument(
+            "--base-url",
+            default="",
+            help="Prefix of the image URLs, e.g. https://example.com, when MEDIA_URL is relative",
+        )
+
+    def handle(self, *args, **options):
+        output = options["output"]
+        name = output.removesuffix(".gz")
+        feed_format = options["format"] or name.rpartition(".")[2].lower()
+        if feed_format not in FEED_FORMATS:
+            raise CommandError("Can not tell the format from the file name, pass --format")
+        gzip = options["gzip"] or output.endswith(".gz")
+
+        base_url = options["base_url"].rstrip("/")
+        absolute_url = (lambda url: url if "://" in url else base_url + url) if base_url else None
+        chunks = render_feed(feed_format, absolute_url, gzip=gzip)
+
+        started = time.monotonic()
+        written = 0
+        stream = sys.stdout.buffer if output == "-" else open(output, "wb")
+        try:
+            for chunk in chunks:
+                stream.write(chunk)
+                written += len(chunk)
+        finally:
+            if stream is not sys.stdout.buffer:
+                stream.close()
+
+        if output != "-":
+            self.stdout.write(
+                self.style.SUCCESS(f"Wrote {written} bytes to {output} in {time.monotonic() - started:.1f}s.")
+            )
@@ -0,0 +1,65 @@
+import io
+import sys
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from product.service.catalog_import import CatalogImporter, read_rows
+
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+
+class Command(BaseCommand):
+    help = "Import products, variants and images from a CSV or JSONL file, upserted in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help='CSV or JSONL file, "-" reads stdin')
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="Default: from the file extension")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--create-brands", action="store_true", help="Create brands that do not exist yet")
+        parser.add_argument("--max-errors", type=int, default=100, help="Stop after this many invalid rows")
+        parser.add_argument("--dry-run", action="store_true", help="Validate and import, then roll back")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or FORMATS.get(Path(path).suffix.lower())
+        if file_format is None:
+            raise CommandError("Can not tell the format from the file name, pass --format")
+
+        importer = CatalogImporter(create_brands=options["create_brands"], dry_run=options["dry_run"])
+        if path == "-":
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig", newline="")
+        else:
+            try:
+                stream = open(path, encoding="utf-8-sig", newline="")
+            except OSError as error:
+                raise CommandError(error)
+
+        started = time.monotonic()
+        with stream:
+            for stats in importer.import_rows(read_rows(stream, file_format), options["batch_size"]):
+                elapsed = max(time.monotonic() - started, 1e-6)
+                self.stdout.write(f"{stats['rows']} rows, {stats['rows'] / elapsed:.0f} rows/sec...")
+                if stats["errors"] > options["max_errors"]:
+                    self.report_errors(importer)
+                    raise CommandError(f"Stopped after {stats['errors']} invalid rows")
+
+        self.report_errors(importer)
+        elapsed = max(time.monotonic() - started, 1e-6)
+        stats = importer.stats
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{'Checked' if options['dry_run'] else 'Imported'} {stats['rows']} rows in {elapsed:.1f}s "
+                f"({stats['rows'] / elapsed:.0f} rows/sec): {stats['products_created']} products created, "
+                f"{stats['products_updated']} updated, {stats['variants']} variants, "
+                f"{stats['images']} new images, {stats['errors']} invalid rows."
+            )
+        )
+        if stats["images"] and not options["dry_run"]:
+            self.stdout.write("Run generate_renditions --model product.ProductImage for the new images.")
+
+    def report_errors(self, importer):
+        for line, error in importer.errors:
+            self.stderr.write(f"Row {line}: {error}")
+        importer.errors.clear()
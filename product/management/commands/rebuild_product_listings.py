@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from product.models import Product
+from product.service.listing import refresh_product_listings
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized ProductListing rows from the catalog tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        ids = Product.all_objects.order_by("pk").values_list("pk", flat=True)
+
+        last_pk = 0
+        refreshed = 0
+        while True:
+            batch = list(ids.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            refreshed += refresh_product_listings(batch, batch_size=batch_size)
+            last_pk = batch[-1]
+            self.stdout.write(f"Refreshed {refreshed} listings...")
+
+        self.stdout.write(self.style.SUCCESS(f"Product listings rebuilt for {refreshed} products."))
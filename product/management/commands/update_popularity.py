@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from product.models import Product
+from product.service.popularity import decay_popularity, flush_product_views, rebuild_sales, sync_product_ratings
+
+
+class Command(BaseCommand):
+    help = "Write the buffered product views and decay the popularity scores, run it periodically (e.g. daily)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--decay", type=float, help="Decay factor, default CATALOG_POPULARITY_DECAY")
+        parser.add_argument("--no-decay", action="store_true", help="Only write the buffered views")
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Also recompute every sales count and rating from the orders and comments",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        factor = options["decay"]
+        if factor is not None and not 0 < factor <= 1:
+            raise CommandError("--decay must be in (0, 1]")
+
+        views = flush_product_views(batch_size=options["batch_size"])
+        self.stdout.write(f"Wrote {views} buffered views.")
+
+        if not options["no_decay"]:
+            decayed = decay_popularity(factor)
+            self.stdout.write(f"Decayed the popularity of {decayed} products.")
+
+        if options["rebuild"]:
+            self.stdout.write(f"Recomputed the sales count of {rebuild_sales()} products.")
+            ids = Product.all_objects.order_by("pk").values_list("pk", flat=True)
+            last_pk = 0
+            rated = 0
+            while batch := list(ids.filter(pk__gt=last_pk)[: options["batch_size"]]):
+                rated += sync_product_ratings(batch)
+                last_pk = batch[-1]
+            self.stdout.write(f"Recomputed the rating of {rated} products.")
+
+        self.stdout.write(self.style.SUCCESS("Popularity updated."))
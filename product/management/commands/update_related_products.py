@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from product.service.related import update_related_products
+
+
+class Command(BaseCommand):
+    help = "Count the new and changed orders into the co-purchase matrix and recompute the related products they affect"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Recompute the related products of every product, e.g. weekly as popularity changes",
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Count every order again from scratch and recompute every product",
+        )
+
+    def handle(self, *args, **options):
+        orders, products = update_related_products(
+            recompute_all=options["all"],
+            rebuild=options["rebuild"],
+            progress=lambda done, total: self.stdout.write(f"{done}/{total} products..."),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Counted {orders} new or changed orders, related products of {products} products updated.")
+        )
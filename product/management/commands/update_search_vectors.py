@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from product.models import Product
+from product.service.search import update_search_vector
+
+
+class Command(BaseCommand):
+    help = "Backfill the stored full-text search vector of products in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--only-missing",
+            action="store_true",
+            help="Only update products that do not have a search vector yet",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        queryset = Product.all_objects.all()
+        if options["only_missing"]:
+            queryset = queryset.filter(search_vector__isnull=True)
+
+        ids = queryset.order_by("pk").values_list("pk", flat=True)
+        last_pk = 0
+        updated = 0
+        while True:
+            batch = list(ids.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            updated += update_search_vector(Product.all_objects.filter(pk__in=batch))
+            last_pk = batch[-1]
+            self.stdout.write(f"Updated {updated} products...")
+
+        self.stdout.write(self.style.SUCCESS(f"Search vectors updated for {updated} products."))
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:05
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0032_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductListing',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='listing', serialize=False, to='product.product', verbose_name='محصول')),
+                ('is_category_active', models.BooleanField(default=True, verbose_name='دسته بندی فعال')),
+                ('brand_name', models.CharField(blank=True, max_length=50, verbose_name='نام برند')),
+                ('name', models.CharField(max_length=100, verbose_name='نام محصول')),
+                ('slug', models.SlugField(allow_unicode=True, max_length=255, verbose_name='اسلاگ محصول')),
+                ('fixed_price', models.PositiveBigIntegerField(default=0, verbose_name='قیمت ثابت(تومان)')),
+                ('discount_percentage', models.PositiveIntegerField(default=0, verbose_name='درصد تخفیف ویژه این محصول')),
+                ('min_price', models.PositiveBigIntegerField(default=0, verbose_name='کمترین قیمت(تومان)')),
+                ('max_price', models.PositiveBigIntegerField(default=0, verbose_name='بیشترین قیمت(تومان)')),
+                ('min_discounted_price', models.PositiveBigIntegerField(default=0, verbose_name='کمترین قیمت با تخفیف(تومان)')),
+                ('max_discounted_price', models.PositiveBigIntegerField(default=0, verbose_name='بیشترین قیمت با تخفیف(تومان)')),
+                ('cover_image', models.ImageField(blank=True, editable=False, max_length=255, upload_to='', verbose_name='عکس کاور')),
+                ('color_ids', django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), blank=True, default=list, size=None, verbose_name='شناسه رنگ ها')),
+                ('color_codes', django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=25), blank=True, default=list, size=None, verbose_name='کد رنگ ها')),
+                ('total_stock', models.PositiveIntegerField(default=0, verbose_name='موجودی کل')),
+                ('created_at', models.DateTimeField(verbose_name='تاریخ ایجاد محصول')),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+                ('brand', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='product.brand', verbose_name='برند محصول')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='product.categorychildren', verbose_name='دسته بندی محصول')),
+            ],
+            options={
+                'verbose_name': 'لیست محصول',
+                'verbose_name_plural': 'لیست محصولات',
+                'indexes': [models.Index(fields=['-created_at'], name='listing_created_idx'), models.Index(fields=['category', 'is_category_active', '-created_at'], name='listing_category_idx'), models.Index(fields=['min_discounted_price'], name='listing_price_idx'), django.contrib.postgres.indexes.GinIndex(fields=['color_ids'], name='listing_color_ids_gin')],
+            },
+        ),
+    ]
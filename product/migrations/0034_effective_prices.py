@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:08
+
+from django.db import migrations, models
+
+
+def discounted(price, percentage):
+    return price - (price * percentage // 100)
+
+
+def fill_effective_prices(apps, schema_editor):
+    Product = apps.get_model('product', 'Product')
+    ProductColor = apps.get_model('product', 'ProductColor')
+    for product in Product.objects.all().iterator():
+        prices = []
+        for color in ProductColor.objects.filter(product=product):
+            color.effective_price = color.base_price or product.fixed_price
+            color.effective_discounted_price = discounted(
+                color.effective_price, color.base_discount or product.discount_percentage
+            )
+            color.save(update_fields=['effective_price', 'effective_discounted_price'])
+            if not color.is_deleted:
+                prices.append(color.effective_discounted_price)
+
+        if not prices:
+            prices.append(discounted(product.fixed_price, product.discount_percentage))
+        product.min_discounted_price = min(prices)
+        product.save(update_fields=['min_discounted_price'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0033_productlisting'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='min_discounted_price',
+            field=models.PositiveBigIntegerField(db_index=True, default=0, editable=False, help_text='کمترین قیمت با تخفیف بین رنگ های محصول، به صورت خودکار محاسبه میشود', verbose_name='کمترین قیمت فروش(تومان)'),
+        ),
+        migrations.AddField(
+            model_name='productcolor',
+            name='effective_discounted_price',
+            field=models.PositiveBigIntegerField(db_index=True, default=0, editable=False, verbose_name='قیمت نهایی با تخفیف(تومان)'),
+        ),
+        migrations.AddField(
+            model_name='productcolor',
+            name='effective_price',
+            field=models.PositiveBigIntegerField(db_index=True, default=0, editable=False, verbose_name='قیمت نهایی(تومان)'),
+        ),
+        migrations.RunPython(fill_effective_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0034_effective_prices'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['updated_at'], name='product_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productcolor',
+            index=models.Index(fields=['updated_at'], name='productcolor_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productimage',
+            index=models.Index(fields=['updated_at'], name='productimage_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productlisting',
+            index=models.Index(fields=['refreshed_at'], name='listing_refreshed_idx'),
+        ),
+    ]
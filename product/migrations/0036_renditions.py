@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:21
+
+import core.renditions
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0035_updated_at_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categorychildren',
+            name='icon_renditions',
+            field=core.renditions.RenditionsField(source='icon', verbose_name='نسخه های کاور'),
+        ),
+        migrations.AddField(
+            model_name='gallery',
+            name='renditions',
+            field=core.renditions.RenditionsField(source='image', verbose_name='نسخه های عکس'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='renditions',
+            field=core.renditions.RenditionsField(source='image', verbose_name='نسخه های عکس'),
+        ),
+        migrations.AddField(
+            model_name='productlisting',
+            name='cover_renditions',
+            field=core.renditions.RenditionsField(verbose_name='نسخه های عکس کاور'),
+        ),
+    ]
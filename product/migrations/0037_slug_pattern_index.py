@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0036_renditions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['slug'], name='product_slug_pattern_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
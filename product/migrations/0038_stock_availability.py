@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:39
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_stock(apps, schema_editor):
+    Product = apps.get_model('product', 'Product')
+    ProductColor = apps.get_model('product', 'ProductColor')
+    ProductListing = apps.get_model('product', 'ProductListing')
+
+    totals = (
+        ProductColor.objects.filter(product=OuterRef('pk'), is_deleted=False)
+        .order_by()
+        .values('product')
+        .annotate(total=Sum('stock'))
+        .values('total')
+    )
+    Product.objects.update(total_stock=Coalesce(Subquery(totals), Value(0)))
+    ProductListing.objects.filter(total_stock__gt=0).update(is_available=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0037_slug_pattern_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='total_stock',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='مجموع موجودی رنگ های محصول، به صورت خودکار محاسبه میشود', verbose_name='موجودی کل'),
+        ),
+        migrations.AddField(
+            model_name='productlisting',
+            name='is_available',
+            field=models.BooleanField(default=False, verbose_name='موجود'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='is_available',
+            field=models.GeneratedField(db_persist=True, expression=models.Q(('total_stock__gt', 0)), output_field=models.BooleanField(), verbose_name='موجود'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_available', True), ('is_deleted', False), ('is_published', True)), fields=['-created_at'], name='product_in_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_available', True), ('is_deleted', False), ('is_published', True)), fields=['category', '-created_at'], name='product_in_stock_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_deleted', False), ('is_published', True)), fields=['-is_available', '-created_at', '-id'], name='product_availability_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productlisting',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['-created_at'], name='listing_in_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productlisting',
+            index=models.Index(fields=['-is_available', '-created_at', '-product'], name='listing_availability_idx'),
+        ),
+        # Last, PostgreSQL refuses DDL on a table with pending trigger events from the update
+        migrations.RunPython(backfill_stock, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:41
+
+import django.core.validators
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0038_stock_availability'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='popularity',
+            field=models.FloatField(default=0, editable=False, help_text='امتیاز بازدید ها و فروش ها که به مرور زمان کم میشود', verbose_name='محبوبیت'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating',
+            field=models.FloatField(default=0, editable=False, verbose_name='میانگین امتیاز'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='تعداد امتیاز ها'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='sales_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='تعداد فروش'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='view_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='تعداد بازدید'),
+        ),
+        migrations.AddField(
+            model_name='productcomment',
+            name='rating',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='از 1 تا 5، فقط برای نظر های اصلی (نه پاسخ ها)', null=True, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)], verbose_name='امتیاز'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_deleted', False), ('is_published', True)), fields=['-popularity', '-id'], name='product_popularity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_deleted', False), ('is_published', True)), fields=['-rating', '-rating_count', '-id'], name='product_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_deleted', False), ('is_published', True)), fields=['-sales_count', '-id'], name='product_best_selling_idx'),
+        ),
+    ]
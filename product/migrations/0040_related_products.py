@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0039_popularity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedProductsRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_order_id', models.PositiveBigIntegerField(default=0, verbose_name='شناسه آخرین سفارش شمارش شده')),
+                ('orders', models.PositiveIntegerField(default=0, verbose_name='سفارش های جدید')),
+                ('products', models.PositiveIntegerField(default=0, verbose_name='محصولات به روز شده')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='زمان اجرا')),
+            ],
+            options={
+                'verbose_name': 'محاسبه محصولات مرتبط',
+                'verbose_name_plural': 'محاسبه های محصولات مرتبط',
+                'ordering': ('-created_at',),
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductCoPurchase',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orders', models.PositiveIntegerField(default=0, verbose_name='تعداد سفارش ها')),
+                ('other', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='product.product', verbose_name='محصول دیگر')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='product.product', verbose_name='محصول')),
+            ],
+            options={
+                'verbose_name': 'خرید همزمان',
+                'verbose_name_plural': 'خرید های همزمان',
+                'unique_together': {('product', 'other')},
+            },
+        ),
+        migrations.CreateModel(
+            name='RelatedProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='رتبه')),
+                ('score', models.FloatField(verbose_name='امتیاز')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_products', to='product.product', verbose_name='محصول')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommended_in', to='product.product', verbose_name='محصول مرتبط')),
+            ],
+            options={
+                'verbose_name': 'محصول مرتبط',
+                'verbose_name_plural': 'محصولات مرتبط',
+                'unique_together': {('product', 'rank')},
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:12
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0041_suggest_trigram_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='brand',
+            name='brand_name_trgm',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_name_trgm',
+        ),
+        migrations.AddField(
+            model_name='brand',
+            name='search_name',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Lower(models.Func(models.F('name'), models.Value('يىكةۀأإٱ۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩\u200cـًٌٍَُِّْٰ\u200d\u200e\u200f'), models.Value('ییکههااا01234567890123456789 '), function='TRANSLATE', output_field=models.TextField())), output_field=models.CharField(max_length=50), verbose_name='نام برند برای جستجو'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='search_name',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Lower(models.Func(models.F('name'), models.Value('يىكةۀأإٱ۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩\u200cـًٌٍَُِّْٰ\u200d\u200e\u200f'), models.Value('ییکههااا01234567890123456789 '), function='TRANSLATE', output_field=models.TextField())), output_field=models.CharField(max_length=100), verbose_name='نام محصول برای جستجو'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='search_specifications',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Lower(models.Func(models.F('specifications'), models.Value('يىكةۀأإٱ۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩\u200cـًٌٍَُِّْٰ\u200d\u200e\u200f'), models.Value('ییکههااا01234567890123456789 '), function='TRANSLATE', output_field=models.TextField())), output_field=models.TextField(null=True), verbose_name='مشخصات محصول برای جستجو'),
+        ),
+        migrations.AddIndex(
+            model_name='brand',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_name'], name='brand_search_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_name'], name='product_search_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:31
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+def reset_co_purchases(apps, schema_editor):
+    # Counted before baskets were kept, they can not be taken back. Every order is
+    # uncounted (order 0013), the next update_related_products counts them all again.
+    apps.get_model('product', 'ProductCoPurchase').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0042_normalized_search_columns'),
+        ('order', '0013_order_co_purchases_counted'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCoPurchaseBasket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.PositiveBigIntegerField(unique=True, verbose_name='شناسه سفارش')),
+                ('products', django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), default=list, size=None, verbose_name='محصولات شمارش شده')),
+            ],
+            options={
+                'verbose_name': 'سبد شمارش شده',
+                'verbose_name_plural': 'سبد های شمارش شده',
+            },
+        ),
+        migrations.RemoveField(
+            model_name='relatedproductsrun',
+            name='last_order_id',
+        ),
+        migrations.AlterField(
+            model_name='relatedproductsrun',
+            name='orders',
+            field=models.PositiveIntegerField(default=0, verbose_name='سفارش های شمارش شده'),
+        ),
+        migrations.RunPython(reset_co_purchases, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import F, Func, TextField, Value
+from django.db.models.functions import Lower
+
+# core.text as of 0042, so this migration does not change with it
+TRANSLATE_FROM = '\u064a\u0649\u0643\u0629\u06c0\u0623\u0625\u0671\u06f0\u06f1\u06f2\u06f3\u06f4\u06f5\u06f6\u06f7\u06f8\u06f9\u0660\u0661\u0662\u0663\u0664\u0665\u0666\u0667\u0668\u0669\u200c\u0640\u064b\u064c\u064d\u064e\u064f\u0650\u0651\u0652\u0670\u200d\u200e\u200f'
+TRANSLATE_TO = '\u06cc\u06cc\u06a9\u0647\u0647\u0627\u0627\u062701234567890123456789 '
+
+
+def rebuild_search_vectors(apps, schema_editor):
+    # The vectors built before 0042 hold the raw spellings, normalized queries miss them
+    Product = apps.get_model('product', 'Product')
+    description = Lower(
+        Func(
+            F('description'),
+            Value(TRANSLATE_FROM),
+            Value(TRANSLATE_TO),
+            function='TRANSLATE',
+            output_field=TextField(),
+        )
+    )
+    Product.objects.update(
+        search_vector=SearchVector('search_name', weight='A', config='simple')
+        + SearchVector('search_specifications', weight='B', config='simple')
+        + SearchVector(description, weight='C', config='simple')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0043_co_purchase_baskets'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_search_vectors, migrations.RunPython.noop),
+    ]
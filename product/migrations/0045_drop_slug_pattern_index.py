@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:53
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0044_rebuild_search_vectors'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_slug_pattern_idx',
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:54
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0045_drop_slug_pattern_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='categorychildren',
+            name='category_child_name_trgm',
+        ),
+        migrations.AddField(
+            model_name='categorychildren',
+            name='search_name',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Lower(models.Func(models.F('name'), models.Value('يىكةۀأإٱ۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩\u200cـًٌٍَُِّْٰ\u200d\u200e\u200f'), models.Value('ییکههااا01234567890123456789 '), function='TRANSLATE', output_field=models.TextField())), output_field=models.CharField(max_length=50), verbose_name='نام دسته بندی برای جستجو'),
+        ),
+        migrations.AddIndex(
+            model_name='categorychildren',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_name'], name='category_search_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
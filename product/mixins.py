@@ -0,0 +1,109 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from product.service.cache import get_versions, normalized_query_key
+from product.service.conditional import tables_last_modified
+
+
+class CatalogCacheMixin:
+    """
+        Caches rendered JSON GET responses under the absolute path, the normalized
+        query params and the current versions of cache_entities.
+        Signals bump the versions, so stale entries are never read again and expire on their own.
+    """
+    cache_entities = ()
+    cacheable_formats = ("json",)
+
+    def get_cache_entities(self):
+        return self.cache_entities
+
+    def get_catalog_cache_key(self, request):
+        versions = get_versions(*self.get_cache_entities())
+        parts = [
+            request.accepted_renderer.format,
+            request.build_absolute_uri(request.path),
+            normalized_query_key(request.query_params),
+            *(f"{name}={versions[name]}" for name in sorted(versions)),
+        ]
+        return "catalog:response:" + hashlib.md5("|".join(parts).encode()).hexdigest()
+
+    def get(self, request, *args, **kwargs):
+        self.catalog_cache_key = None
+        if request.accepted_renderer.format in self.cacheable_formats:
+            self.catalog_cache_key = self.get_catalog_cache_key(request)
+            cached = cache.get(self.catalog_cache_key)
+            if cached is not None:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+                response.catalog_cache_key = self.catalog_cache_key
+                return response
+        return super().get(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        cache_key = getattr(self, "catalog_cache_key", None)
+        if cache_key and isinstance(response, Response) and response.status_code == 200:
+            response.render()
+            cache.set(
+                cache_key,
+                (response.rendered_content, response["Content-Type"]),
+                settings.CATALOG_CACHE_TIMEOUT,
+            )
+            response.catalog_cache_key = cache_key
+        return response
+
+
+class ConditionalGetMixin:
+    """
+        ETag/Last-Modified support driven by get_last_modified(), which must be a cheap query,
+        and the catalog versions of get_etag_entities(). It runs before the queryset, the
+        cache or any serializer, and unchanged resources are answered with 304 Not Modified.
+        A hard delete changes the ETag only, If-Modified-Since alone still gets 304.
+    """
+    last_modified_models = ()
+
+    def get_last_modified(self):
+        if not self.last_modified_models:
+            return None
+        return tables_last_modified(*self.last_modified_models)
+
+    def get_etag_entities(self):
+        """
+            Catalog versions that are part of the ETag, those of the response cache by default.
+            A hard delete (the admin's delete action, a CASCADE) leaves no updated_at behind,
+            but its post_delete signals bump the versions.
+        """
+        get_cache_entities = getattr(self, "get_cache_entities", None)
+        return get_cache_entities() if get_cache_entities is not None else ()
+
+    def get_etag(self, request, last_modified):
+        versions = get_versions(*self.get_etag_entities())
+        parts = [
+            request.get_full_path(),
+            request.accepted_renderer.format,
+            last_modified.isoformat(),
+            *(f"{name}={versions[name]}" for name in sorted(versions)),
+        ]
+        return quote_etag(hashlib.md5("|".join(parts).encode()).hexdigest())
+
+    def get(self, request, *args, **kwargs):
+        last_modified = self.get_last_modified()
+        if last_modified is None:
+            return super().get(request, *args, **kwargs)
+
+        etag = self.get_etag(request, last_modified)
+        timestamp = int(last_modified.timestamp())
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+
+        if response.status_code in (200, 304):
+            response.headers.setdefault("ETag", etag)
+            response.headers.setdefault("Last-Modified", http_date(timestamp))
+        return response
@@ -1,8 +1,14 @@
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
-from django.utils.text import slugify
 from core.models.auditable import AuditableModel
 from core.models.soft_delete import SoftDeleteModel
+from core.renditions import RenditionsField
+from core.text import normalized_text
 from colorfield.fields import ColorField
+from product.utils import allocate_slugs
 # Create your models here.
 
 
@@ -27,6 +33,13 @@ class CategoryChildren(AuditableModel, SoftDeleteModel):
         verbose_name="دسته بندی والد",
     )
     name = models.CharField(max_length=50,unique = True,verbose_name="نام دسته بندی فرزند")
+    # Canonical spelling of name for lookups, see core/text.py
+    search_name = models.GeneratedField(
+        expression=normalized_text("name"),
+        output_field=models.CharField(max_length=50),
+        db_persist=True,
+        verbose_name="نام دسته بندی برای جستجو",
+    )
     order = models.PositiveIntegerField(default=0, verbose_name="ترتیب نمایش دسته بندی",db_index=True)
     icon = models.ImageField(
         upload_to="products/image/category-children/icon/",
@@ -34,6 +47,7 @@ class CategoryChildren(AuditableModel, SoftDeleteModel):
         null=True,
         verbose_name="کاور دسته بندی فرزند",
     )
+    icon_renditions = RenditionsField(source="icon", verbose_name="نسخه های کاور")
     show_in_menu = models.BooleanField(default = False,verbose_name = "نمایش در منو",help_text = ".با فعال کردن این گزینه دسته بندی در منوی دسته بندی صفحه اصلی سایت نمایش داده میشود")
     is_active = models.BooleanField(default=True, verbose_name="فعال/غیرفعال",db_index=True)
 
@@ -45,11 +59,19 @@ class CategoryChildren(AuditableModel, SoftDeleteModel):
         verbose_name_plural = "دسته بندی های فرزند"
         indexes = [
             models.Index(fields=["category", "is_active", "is_deleted"]),
+            GinIndex(fields=["search_name"], name="category_search_name_trgm", opclasses=["gin_trgm_ops"]),
         ]
 
 
 class Brand(AuditableModel, SoftDeleteModel):
     name = models.CharField(max_length=50,unique = True,verbose_name="نام برند")
+    # Canonical spelling of name for lookups, see core/text.py
+    search_name = models.GeneratedField(
+        expression=normalized_text("name"),
+        output_field=models.CharField(max_length=50),
+        db_persist=True,
+        verbose_name="نام برند برای جستجو",
+    )
 
     def __str__(self):
         return f"برند {self.id} - {self.name}"
@@ -57,6 +79,9 @@ class Brand(AuditableModel, SoftDeleteModel):
     class Meta:
         verbose_name = "برند"
         verbose_name_plural = "برندها "
+        indexes = [
+            GinIndex(fields=["search_name"], name="brand_search_name_trgm", opclasses=["gin_trgm_ops"]),
+        ]
 
 class Product(AuditableModel, SoftDeleteModel):
     category = models.ForeignKey(
@@ -92,21 +117,58 @@ class Product(AuditableModel, SoftDeleteModel):
     )
     is_published = models.BooleanField(default=True, verbose_name="وضعیت انتشار محصول",db_index=True)
     is_favorite = models.BooleanField(default=False, verbose_name="وضعیت محبوبیت")
+    min_discounted_price = models.PositiveBigIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="کمترین قیمت فروش(تومان)",
+        help_text="کمترین قیمت با تخفیف بین رنگ های محصول، به صورت خودکار محاسبه میشود",
+        db_index=True,
+    )
+    total_stock = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="موجودی کل",
+        help_text="مجموع موجودی رنگ های محصول، به صورت خودکار محاسبه میشود",
+    )
+    is_available = models.GeneratedField(
+        expression=models.Q(total_stock__gt=0),
+        output_field=models.BooleanField(),
+        db_persist=True,
+        verbose_name="موجود",
+    )
+    # Rolled up by product.service.popularity, never edited by hand
+    sales_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="تعداد فروش")
+    view_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="تعداد بازدید")
+    rating = models.FloatField(default=0, editable=False, verbose_name="میانگین امتیاز")
+    rating_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="تعداد امتیاز ها")
+    popularity = models.FloatField(
+        default=0,
+        editable=False,
+        verbose_name="محبوبیت",
+        help_text="امتیاز بازدید ها و فروش ها که به مرور زمان کم میشود",
+    )
+    # Canonical spellings of name and specifications for lookups, see core/text.py
+    search_name = models.GeneratedField(
+        expression=normalized_text("name"),
+        output_field=models.CharField(max_length=100),
+        db_persist=True,
+        verbose_name="نام محصول برای جستجو",
+    )
+    search_specifications = models.GeneratedField(
+        expression=normalized_text("specifications"),
+        output_field=models.TextField(null=True),
+        db_persist=True,
+        verbose_name="مشخصات محصول برای جستجو",
+    )
+    search_vector = SearchVectorField(null=True, editable=False)
 
     def __str__(self):
         return f"{self.name}"
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            base_slug = slugify(self.name, allow_unicode=True)
-            slug = base_slug
-
-            counter = 1
-            while Product.objects.filter(slug=slug).exclude(pk=self.pk).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-
-            self.slug = slug
+            # bulk_create skips save(), use product.utils.assign_slugs there
+            self.slug = allocate_slugs(Product.all_objects.exclude(pk=self.pk), [self.name])[0]
 
         super().save(*args, **kwargs)
 
@@ -118,6 +180,43 @@ class Product(AuditableModel, SoftDeleteModel):
         indexes = [
             models.Index(fields=["category", "is_published", "is_deleted"]),
             models.Index(fields=["fixed_price"]),
+            GinIndex(fields=["search_vector"], name="product_search_vector_gin"),
+            # Typeahead suggestions, see product/service/suggest.py
+            GinIndex(fields=["search_name"], name="product_search_name_trgm", opclasses=["gin_trgm_ops"]),
+            models.Index(fields=["updated_at"], name="product_updated_idx"),
+            # in_stock=true lists, newest first
+            models.Index(
+                fields=["-created_at"],
+                name="product_in_stock_idx",
+                condition=models.Q(is_available=True, is_published=True, is_deleted=False),
+            ),
+            models.Index(
+                fields=["category", "-created_at"],
+                name="product_in_stock_category_idx",
+                condition=models.Q(is_available=True, is_published=True, is_deleted=False),
+            ),
+            # ordering=-is_available,-created_at
+            models.Index(
+                fields=["-is_available", "-created_at", "-id"],
+                name="product_availability_idx",
+                condition=models.Q(is_published=True, is_deleted=False),
+            ),
+            # ordering=popularity, rating and best_selling
+            models.Index(
+                fields=["-popularity", "-id"],
+                name="product_popularity_idx",
+                condition=models.Q(is_published=True, is_deleted=False),
+            ),
+            models.Index(
+                fields=["-rating", "-rating_count", "-id"],
+                name="product_rating_idx",
+                condition=models.Q(is_published=True, is_deleted=False),
+            ),
+            models.Index(
+                fields=["-sales_count", "-id"],
+                name="product_best_selling_idx",
+                condition=models.Q(is_published=True, is_deleted=False),
+            ),
         ]
 
 class Color(AuditableModel,SoftDeleteModel):
@@ -143,6 +242,11 @@ class ProductColor(AuditableModel, SoftDeleteModel):
     base_price = models.PositiveBigIntegerField(default = 0, verbose_name="(تومان)قیمت این رنگ از محصول",help_text = ".اگر قیمتی برای این رنگ در نظر گرفته نشود، پیش فرض قیمت پایه محصول روی این رنگ اعمال می شود")
     base_discount  = models.PositiveIntegerField(default = 0, verbose_name="درصد تخفیف ویژه این رنگ از محصول",help_text = ".اگر تخفیف ویژه برای این رنگ از محصول در نظر گرفته نشود، پیش فرض تخفیف ویژه پایه محصول روی این رنگ اعمال می شود")
     stock = models.PositiveIntegerField(default=0, verbose_name="موجودی این رنگ از محصول")
+    # Persisted copies of price/discounted_price for filtering and ordering in the database
+    effective_price = models.PositiveBigIntegerField(default=0, editable=False, verbose_name="قیمت نهایی(تومان)", db_index=True)
+    effective_discounted_price = models.PositiveBigIntegerField(
+        default=0, editable=False, verbose_name="قیمت نهایی با تخفیف(تومان)", db_index=True
+    )
 
 
     @property
@@ -156,6 +260,11 @@ class ProductColor(AuditableModel, SoftDeleteModel):
     @property
     def discounted_price(self):
         return self.price - (self.price * self.discount_percentage // 100)
+
+    def save(self, *args, **kwargs):
+        self.effective_price = self.price
+        self.effective_discounted_price = self.discounted_price
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.product} - {self.color}"
@@ -165,6 +274,9 @@ class ProductColor(AuditableModel, SoftDeleteModel):
         verbose_name = "رنگ محصول"
         verbose_name_plural = "رنگ بندی محصولات"
         unique_together = ('product','color')
+        indexes = [
+            models.Index(fields=["updated_at"], name="productcolor_updated_idx"),
+        ]
 
 class ProductImage(AuditableModel, SoftDeleteModel):
     product_color = models.ForeignKey(
@@ -174,6 +286,7 @@ class ProductImage(AuditableModel, SoftDeleteModel):
         verbose_name="عکس مختص رنگ محصول",db_index=True
     )
     image = models.ImageField(upload_to="products/image/product-color/")  # def upload
+    renditions = RenditionsField(source="image", verbose_name="نسخه های عکس")
     order = models.PositiveIntegerField(default=0, verbose_name="ترتیب نمایش عکس",db_index=True)
     is_cover = models.BooleanField(
         default=False,
@@ -187,6 +300,71 @@ class ProductImage(AuditableModel, SoftDeleteModel):
     class Meta:
         verbose_name = "عکس محصول"
         verbose_name_plural = "عکس های محصولات"
+        indexes = [
+            models.Index(fields=["updated_at"], name="productimage_updated_idx"),
+        ]
+
+
+class ProductListing(models.Model):
+    """
+        Denormalized read model of a published product for the catalog list endpoints.
+        Kept up to date by product/signals.py, never edit it by hand.
+    """
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="listing",
+        verbose_name="محصول",
+    )
+    category = models.ForeignKey(
+        CategoryChildren,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="دسته بندی محصول",
+    )
+    is_category_active = models.BooleanField(default=True, verbose_name="دسته بندی فعال")
+    brand = models.ForeignKey(
+        Brand,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="+",
+        verbose_name="برند محصول",
+    )
+    brand_name = models.CharField(max_length=50, blank=True, verbose_name="نام برند")
+    name = models.CharField(max_length=100, verbose_name="نام محصول")
+    slug = models.SlugField(max_length=255, allow_unicode=True, verbose_name="اسلاگ محصول")
+    fixed_price = models.PositiveBigIntegerField(default=0, verbose_name="قیمت ثابت(تومان)")
+    discount_percentage = models.PositiveIntegerField(default=0, verbose_name="درصد تخفیف ویژه این محصول")
+    min_price = models.PositiveBigIntegerField(default=0, verbose_name="کمترین قیمت(تومان)")
+    max_price = models.PositiveBigIntegerField(default=0, verbose_name="بیشترین قیمت(تومان)")
+    min_discounted_price = models.PositiveBigIntegerField(default=0, verbose_name="کمترین قیمت با تخفیف(تومان)")
+    max_discounted_price = models.PositiveBigIntegerField(default=0, verbose_name="بیشترین قیمت با تخفیف(تومان)")
+    cover_image = models.ImageField(max_length=255, blank=True, editable=False, verbose_name="عکس کاور")
+    cover_renditions = RenditionsField(verbose_name="نسخه های عکس کاور")
+    color_ids = ArrayField(models.BigIntegerField(), default=list, blank=True, verbose_name="شناسه رنگ ها")
+    color_codes = ArrayField(models.CharField(max_length=25), default=list, blank=True, verbose_name="کد رنگ ها")
+    total_stock = models.PositiveIntegerField(default=0, verbose_name="موجودی کل")
+    is_available = models.BooleanField(default=False, verbose_name="موجود")
+    created_at = models.DateTimeField(verbose_name="تاریخ ایجاد محصول")
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"لیست محصول {self.name}"
+
+    class Meta:
+        verbose_name = "لیست محصول"
+        verbose_name_plural = "لیست محصولات"
+        indexes = [
+            models.Index(fields=["-created_at"], name="listing_created_idx"),
+            models.Index(fields=["category", "is_category_active", "-created_at"], name="listing_category_idx"),
+            models.Index(fields=["min_discounted_price"], name="listing_price_idx"),
+            GinIndex(fields=["color_ids"], name="listing_color_ids_gin"),
+            models.Index(fields=["refreshed_at"], name="listing_refreshed_idx"),
+            models.Index(fields=["-created_at"], name="listing_in_stock_idx", condition=models.Q(is_available=True)),
+            models.Index(fields=["-is_available", "-created_at", "-product"], name="listing_availability_idx"),
+        ]
 
 
 class ProductComment(AuditableModel, SoftDeleteModel):
@@ -204,6 +382,13 @@ class ProductComment(AuditableModel, SoftDeleteModel):
         verbose_name="در جواب نظر",
     )
     is_approved = models.BooleanField(default=True, verbose_name="وضعیت تایید نظر",db_index=True)
+    rating = models.PositiveSmallIntegerField(
+        blank=True,
+        null=True,
+        validators=[MinValueValidator(1), MaxValueValidator(5)],
+        verbose_name="امتیاز",
+        help_text="از 1 تا 5، فقط برای نظر های اصلی (نه پاسخ ها)",
+    )
 
     def __str__(self):
         return f"نظر محصول {self.created_by.username} - {self.product.name}"
@@ -214,6 +399,7 @@ class ProductComment(AuditableModel, SoftDeleteModel):
 
 class Gallery(AuditableModel,SoftDeleteModel):
     image = models.ImageField(upload_to = "home/gallery/",verbose_name = "عکس")
+    renditions = RenditionsField(source="image", verbose_name="نسخه های عکس")
     order = models.PositiveIntegerField(default = 0,verbose_name = "ترتیب نمایش عکس")
     is_published = models.BooleanField(default=True, verbose_name="وضعیت انتشار عکس",db_index=True)
     
@@ -224,4 +410,70 @@ class Gallery(AuditableModel,SoftDeleteModel):
         verbose_name = "عکس گالری"
         verbose_name_plural = "گالری / عکس های گالری"
         ordering = ("order","-created_at")
-        
\ No newline at end of file
+        
+
+class ProductCoPurchase(models.Model):
+    """
+        Number of orders that contain both products, stored in both directions.
+        The row of a product with itself counts the orders that contain it.
+        Maintained by the update_related_products command.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+", verbose_name="محصول")
+    other = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+", verbose_name="محصول دیگر")
+    orders = models.PositiveIntegerField(default=0, verbose_name="تعداد سفارش ها")
+
+    class Meta:
+        verbose_name = "خرید همزمان"
+        verbose_name_plural = "خرید های همزمان"
+        unique_together = ("product", "other")
+
+
+class ProductCoPurchaseBasket(models.Model):
+    """
+        Products of an order as they were counted into ProductCoPurchase, so a later
+        change of the order (items added or removed, cancelled, deleted) can be taken back.
+        order_id is not a foreign key, the basket outlives a deleted order until it is subtracted.
+    """
+    order_id = models.PositiveBigIntegerField(unique=True, verbose_name="شناسه سفارش")
+    products = ArrayField(models.BigIntegerField(), default=list, verbose_name="محصولات شمارش شده")
+
+    class Meta:
+        verbose_name = "سبد شمارش شده"
+        verbose_name_plural = "سبد های شمارش شده"
+
+
+class RelatedProduct(models.Model):
+    """
+        Top related products of a product, built from ProductCoPurchase and the category.
+        Maintained by the update_related_products command, never edit it by hand.
+    """
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="related_products", verbose_name="محصول"
+    )
+    related = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="recommended_in", verbose_name="محصول مرتبط"
+    )
+    rank = models.PositiveSmallIntegerField(verbose_name="رتبه")
+    score = models.FloatField(verbose_name="امتیاز")
+
+    class Meta:
+        verbose_name = "محصول مرتبط"
+        verbose_name_plural = "محصولات مرتبط"
+        unique_together = ("product", "rank")
+
+
+class RelatedProductsRun(models.Model):
+    """
+        A run of update_related_products
+    """
+    orders = models.PositiveIntegerField(default=0, verbose_name="سفارش های شمارش شده")
+    products = models.PositiveIntegerField(default=0, verbose_name="محصولات به روز شده")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="زمان اجرا")
+
+    def __str__(self):
+        return f"محاسبه محصولات مرتبط {self.created_at}"
+
+    class Meta:
+        verbose_name = "محاسبه محصولات مرتبط"
+        verbose_name_plural = "محاسبه های محصولات مرتبط"
+        ordering = ("-created_at",)
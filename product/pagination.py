@@ -1,10 +1,84 @@
-from rest_framework import pagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import GeneratedField, Q
+from django.utils.functional import cached_property
+from django.utils.dateparse import parse_datetime
+from rest_framework import filters, pagination
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from product.service.cache import PRODUCT_LIST, get_version, normalized_query_key
+
+
+def planner_row_estimate(queryset):
+    """
+        PostgreSQL's row estimate for queryset, without running it
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class CachedCountPaginator(Paginator):
+    """
+        Caches the count under cache_key. When the planner expects more rows than
+        CATALOG_COUNT_ESTIMATE_THRESHOLD the estimate is used instead of COUNT(*).
+    """
+
+    def __init__(self, *args, cache_key=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_key = cache_key
+        self.count_is_estimated = False
+
+    @cached_property
+    def count(self):
+        if self.cache_key is None:
+            return super().count
+
+        cached = cache.get(self.cache_key)
+        if cached is not None:
+            count, self.count_is_estimated = cached
+            return count
+
+        threshold = settings.CATALOG_COUNT_ESTIMATE_THRESHOLD
+        estimate = planner_row_estimate(self.object_list) if threshold else None
+        if estimate is not None and estimate >= threshold:
+            count, self.count_is_estimated = estimate, True
+        else:
+            count = super().count
+
+        cache.set(self.cache_key, (count, self.count_is_estimated), settings.CATALOG_COUNT_CACHE_TIMEOUT)
+        return count
+
 
 class SearchPagination(pagination.PageNumberPagination):
     page_size = 9
     page_size_query_param = "page_size"
     max_page_size = 10000
+    # These params change the page, not the number of results
+    count_key_exclude = ("page", "page_size", "ordering", "cursor", "legacy", "fields", "expand")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.django_paginator_class = partial(
+            CachedCountPaginator, cache_key=self.get_count_cache_key(request)
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count_cache_key(self, request):
+        query_key = normalized_query_key(request.query_params, exclude=self.count_key_exclude)
+        return f"catalog:count:{get_version(PRODUCT_LIST)}:{request.path}:{query_key}"
 
     def get_paginated_response(self, data):
         return Response(
@@ -14,6 +88,7 @@ class SearchPagination(pagination.PageNumberPagination):
                     "previous": self.get_previous_link(),
                 },
                 "count": self.page.paginator.count,
+                "count_is_estimated": self.page.paginator.count_is_estimated,
                 "total_pages": self.page.paginator.num_pages,
                 "results": data,
             }
@@ -31,7 +106,260 @@ class SearchPagination(pagination.PageNumberPagination):
                     },
                 },
                 "count": {"type": "integer"},
+                "count_is_estimated": {"type": "boolean"},
                 "total_pages": {"type": "integer"},
                 "results": schema,
             },
         }
+
+
+class KeysetPagination(pagination.BasePagination):
+    """
+        Keyset (cursor) pagination on the requested ordering fields with a pk tiebreaker.
+
+        The ordering comes from the view's OrderingFilter, then from the queryset
+        (e.g. search rank), then default_ordering. The ordering fields must not be nullable.
+        Never runs COUNT(*) and never uses OFFSET.
+    """
+    page_size = 9
+    page_size_query_param = "page_size"
+    max_page_size = 10000
+    cursor_query_param = "cursor"
+    default_ordering = "-created_at"
+    invalid_cursor_message = "Invalid cursor"
+    # Absolute URL the links point to, the request's URL when None
+    base_url = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        return self.paginate(queryset, self.get_ordering(request, queryset, view), self.decode_cursor(request))
+
+    def paginate(self, queryset, ordering, cursor=None):
+        """
+            The page after cursor, the first one without, of queryset in ordering (order_by
+            terms). Needs self.request and self.page_size, the links are built from them.
+        """
+        self.ordering = [(term.lstrip("-"), term.startswith("-")) for term in ordering]
+
+        if cursor:
+            if len(cursor["values"]) != len(self.ordering):
+                raise NotFound(self.invalid_cursor_message)
+            cursor["values"] = self.clean_cursor_values(queryset, cursor["values"])
+        reverse = bool(cursor and cursor["reverse"])
+        directions = [(field, descending != reverse) for field, descending in self.ordering]
+        # The pk tiebreaker runs in the direction of the last field
+        directions.append(("pk", directions[-1][1]))
+
+        queryset = queryset.order_by(*(f"-{field}" if descending else field for field, descending in directions))
+        if cursor:
+            queryset = queryset.filter(self.get_position_filter(cursor, directions))
+
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if reverse:
+            results.reverse()
+
+        if reverse:
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, cursor is not None
+
+        self.next_position = self.get_position(results[-1]) if has_next and results else None
+        self.previous_position = self.get_position(results[0]) if has_previous and results else None
+        return results
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return pagination._positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size,
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_ordering(self, request, queryset, view):
+        for backend in getattr(view, "filter_backends", []):
+            if issubclass(backend, filters.OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+                if ordering:
+                    return list(ordering)
+
+        if queryset.query.order_by and isinstance(queryset.query.order_by[0], str):
+            return [queryset.query.order_by[0]]
+        return [self.default_ordering]
+
+    def get_ordering_field(self, queryset, name):
+        annotation = queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        model = queryset.model
+        for part in name.split("__"):
+            field = model._meta.get_field(part)
+            model = field.related_model
+        # A GeneratedField converts nothing itself, its output_field does
+        if isinstance(field, GeneratedField):
+            return field.output_field
+        return field
+
+    def clean_cursor_values(self, queryset, values):
+        """
+            The cursor values as the types of the ordering fields, a hand made cursor
+            is a 404 like any other invalid cursor rather than an error of the query
+        """
+        cleaned = []
+        for (name, _), value in zip(self.ordering, values):
+            try:
+                value = self.get_ordering_field(queryset, name).to_python(value)
+            except (FieldDoesNotExist, ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+            # Ordering fields are not nullable
+            if value is None:
+                raise NotFound(self.invalid_cursor_message)
+            cleaned.append(value)
+        return cleaned
+
+    def get_position_filter(self, cursor, directions):
+        """
+            Rows after the cursor: (a, b, pk) > (x, y, p) written out as
+            a > x OR (a = x AND b > y) OR (a = x AND b = y AND pk > p)
+        """
+        values = [*cursor["values"], cursor["pk"]]
+        position, equal = Q(pk__in=[]), Q()
+        for (field, descending), value in zip(directions, values):
+            lookup = "lt" if descending else "gt"
+            position |= equal & Q(**{f"{field}__{lookup}": value})
+            equal &= Q(**{field: value})
+        return position
+
+    def get_position(self, instance):
+        return {"values": [getattr(instance, field) for field, _ in self.ordering], "pk": instance.pk}
+
+    def encode_cursor(self, position, reverse):
+        values = [
+            {"d": value.isoformat()} if isinstance(value, datetime) else value for value in position["values"]
+        ]
+        token = {"p": position["pk"], "r": int(reverse), "v": values}
+        encoded = urlsafe_b64encode(json.dumps(token, separators=(",", ":")).encode()).decode()
+        url = remove_query_param(self.base_url or self.request.build_absolute_uri(), "page")
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            token = json.loads(urlsafe_b64decode(encoded.encode()))
+            values = []
+            for value in token["v"]:
+                if isinstance(value, dict):
+                    value = parse_datetime(value["d"])
+                    if value is None:
+                        raise ValueError
+                values.append(value)
+            return {"values": values, "pk": int(token["p"]), "reverse": bool(token["r"])}
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "links": {
+                    "next": self.get_next_link(),
+                    "previous": self.get_previous_link(),
+                },
+                "results": data,
+            }
+        )
+
+    #For Swagger
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "links": {
+                    "type": "object",
+                    "properties": {
+                        "next": {"type": "string", "nullable": True},
+                        "previous": {"type": "string", "nullable": True},
+                    },
+                },
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The pagination cursor value.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results to return per page.",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+
+class CatalogPagination(KeysetPagination):
+    """
+        Keyset pagination for the catalog lists.
+        Legacy clients get the page-number response (links/count/total_pages)
+        with ?legacy=true or by sending a `page` parameter.
+    """
+    legacy_query_param = "legacy"
+    legacy_pagination_class = SearchPagination
+
+    def is_legacy(self, request):
+        flag = request.query_params.get(self.legacy_query_param, "").strip().lower()
+        return flag in {"1", "true", "yes", "on"} or "page" in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.legacy = self.legacy_pagination_class() if self.is_legacy(request) else None
+        if self.legacy is not None:
+            return self.legacy.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.legacy is not None:
+            return self.legacy.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                "name": self.legacy_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Use page-number pagination with count and total_pages (legacy clients).",
+                "schema": {"type": "boolean"},
+            },
+            {
+                "name": "page",
+                "required": False,
+                "in": "query",
+                "description": "Page number, implies legacy pagination.",
+                "schema": {"type": "integer"},
+            },
+        ]
@@ -9,19 +9,24 @@ from product.models import (
     ProductColor,
     ProductComment,
     ProductImage,
+    ProductListing,
 )
+from product.service.comments import attach_comment_threads, root_comments
+from core.renditions import RenditionURLsField
+from core.serializers import DynamicFieldsMixin
 from user.serializers import UserCommentsSerializer
+from drf_spectacular.utils import extend_schema_field
 
 # <------------ Brand and Color List ---------------->
 
 
-class BrandSerializer(serializers.ModelSerializer):
+class BrandSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Brand
         fields = ["id", "name"]
 
 
-class ColorSerializer(serializers.ModelSerializer):
+class ColorSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Color
         fields = ["id", "name", "code"]
@@ -30,9 +35,11 @@ class ColorSerializer(serializers.ModelSerializer):
 
 
 class CategoryChildrenListSerializer(serializers.ModelSerializer):
+    icon_renditions = RenditionURLsField()
+
     class Meta:
         model = CategoryChildren
-        fields = ["id", "name", "order"]
+        fields = ["id", "name", "order", "icon", "icon_renditions"]
 
 
 class CategoryListSerializer(serializers.ModelSerializer):
@@ -53,11 +60,15 @@ class CommentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ProductComment
-        fields = ["id", "created_by", "text", "is_approved", "replies"]
+        fields = ["id", "created_by", "text", "rating", "is_approved", "replies"]
 
     def get_replies(self, obj):
-        if obj.replies.exists():
-            return CommentSerializer(obj.replies.all(), many=True).data
+        # tree_replies is assembled by product.service.comments.attach_comment_threads
+        replies = getattr(obj, "tree_replies", None)
+        if replies is None:
+            replies = list(obj.replies.all())
+        if replies:
+            return CommentSerializer(replies, many=True, context=self.context).data
         return None
 
 
@@ -75,33 +86,86 @@ class CommentSerializer(serializers.ModelSerializer):
 #         fields = ['id','user','text','is_approved','replies']
 
 
-class ImageProductSerializer(serializers.ModelSerializer):
+class ImageProductSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    renditions = RenditionURLsField()
+
     class Meta:
         model = ProductImage
-        fields = ["id", "image", "order", "is_cover"]
+        fields = ["id", "image", "renditions", "order", "is_cover"]
 
 
 # <------------ ProductColors ---------------->
-class ProductColorSerializer(serializers.ModelSerializer):
+class ProductColorSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     images = ImageProductSerializer(many=True)
     color = ColorSerializer()
+    select_related_fields = {"color": "color"}
+    prefetch_related_fields = {"images": "images"}
     class Meta:
         model = ProductColor
         fields = ["id", "color", "price","discounted_price", "stock", "images"]
 
 # <------------ Product List ---------------->
 
-class ProductListSerializer(serializers.ModelSerializer):
+class ProductListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     colors = ProductColorSerializer(many = True)
+    expandable_fields = {"brand": (BrandSerializer, {})}
+    select_related_fields = {"brand": "brand"}
+    prefetch_related_fields = {"colors": "colors"}
     class Meta:
         model = Product
-        fields = ["id", "name","slug","fixed_price","discount_percentage","colors"]
+        fields = ["id", "name","slug","fixed_price","discount_percentage","is_available","rating","rating_count","colors"]
+
+class ProductListingSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    id = serializers.IntegerField(source="product_id")
+    cover_renditions = RenditionURLsField()
+
+    class Meta:
+        model = ProductListing
+        fields = [
+            "id",
+            "name",
+            "slug",
+            "brand_name",
+            "fixed_price",
+            "discount_percentage",
+            "min_price",
+            "max_price",
+            "min_discounted_price",
+            "max_discounted_price",
+            "cover_image",
+            "cover_renditions",
+            "color_ids",
+            "color_codes",
+            "total_stock",
+            "is_available",
+        ]
+
+class ProductSuggestionSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    slug = serializers.CharField()
+    thumbnail = serializers.SerializerMethodField()
+
+    @extend_schema_field(serializers.URLField(allow_null=True))
+    def get_thumbnail(self, obj):
+        request = self.context.get("request")
+        if obj["thumbnail"] and request is not None:
+            return request.build_absolute_uri(obj["thumbnail"])
+        return obj["thumbnail"]
 
 # <------------ Product Detail ---------------->
-class ProductDetailSerializer(serializers.ModelSerializer):
+class ProductDetailSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     brand = BrandSerializer()
     colors = ProductColorSerializer(many=True)
-    comments = CommentSerializer(many=True)
+    comments = serializers.SerializerMethodField()
+    comments_count = serializers.SerializerMethodField()
+    expandable_fields = {"category": (CategoryChildrenListSerializer, {})}
+    select_related_fields = {"brand": "brand", "category": "category"}
+    prefetch_related_fields = {"colors": "colors"}
+
+    # Only the latest threads are embedded, the rest come from the comments endpoint
+    comments_limit = 10
+
     class Meta:
         model = Product
         fields = [
@@ -113,12 +177,23 @@ class ProductDetailSerializer(serializers.ModelSerializer):
             "discount_percentage",
             "is_published",
             "is_favorite",
+            "rating",
+            "rating_count",
             "specifications",
             "description",
             "colors",
+            "comments_count",
             "comments",
         ]
 
+    @extend_schema_field(CommentSerializer(many=True))
+    def get_comments(self, obj):
+        threads = attach_comment_threads(root_comments(obj)[: self.comments_limit])
+        return CommentSerializer(threads, many=True, context=self.context).data
+
+    def get_comments_count(self, obj) -> int:
+        return root_comments(obj).count()
+
 
 # <------------ Category Detail ---------------->
 
@@ -141,7 +216,8 @@ class CategoryDetailSerializer(serializers.ModelSerializer):
 # <------------ Gallery ---------------->
 
 class GallerySerializer(serializers.ModelSerializer):
-    
+    renditions = RenditionURLsField()
+
     class Meta:
         model = Gallery
-        fields = ['id','order','image']
\ No newline at end of file
+        fields = ['id','order','image','renditions']
\ No newline at end of file
@@ -0,0 +1,79 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = "catalog:version:{}"
+
+# Catalog entities with their own version counter
+CATEGORY = "category"
+BRAND = "brand"
+COLOR = "color"
+GALLERY = "gallery"
+PRODUCT_LIST = "product_list"
+# The products themselves: fields, prices, stock, colors and images. PRODUCT_LIST also
+# moves with the brands and categories that lists show or filter on, this does not.
+PRODUCT_ROWS = "product_rows"
+RELATED = "related"
+
+
+def product_version_name(slug):
+    """
+        Version of a single product's detail, bumped only by changes to that product
+    """
+    return f"product:{hashlib.md5(slug.encode()).hexdigest()}"
+
+
+def _initial_version():
+    # Never restart from 1, so entries cached under an evicted counter can not be served again
+    return int(time.time() * 1000)
+
+
+def get_versions(*names):
+    keys = {VERSION_KEY.format(name): name for name in names}
+    found = cache.get_many(keys)
+    versions = {}
+    for key, name in keys.items():
+        version = found.get(key)
+        if version is None:
+            cache.add(key, _initial_version(), None)
+            version = cache.get(key)
+        versions[name] = version
+    return versions
+
+
+def get_version(name):
+    return get_versions(name)[name]
+
+
+def _bump_versions(names):
+    for name in names:
+        key = VERSION_KEY.format(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_version(), None)
+
+
+def bump_version(*names):
+    """
+        Bumped once the current transaction commits, right away outside of one. Bumped
+        earlier, a request between the bump and the commit would cache the old rows
+        under the new version until CATALOG_CACHE_TIMEOUT.
+    """
+    names = set(names)
+    if names:
+        transaction.on_commit(lambda: _bump_versions(names))
+
+
+def normalized_query_key(query_params, exclude=()):
+    """
+        Stable digest of the query params, independent of their order
+    """
+    items = sorted(
+        (key, sorted(query_params.getlist(key)))
+        for key in query_params.keys()
+        if key not in exclude
+    )
+    return hashlib.md5(repr(items).encode()).hexdigest()
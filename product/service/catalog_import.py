@@ -0,0 +1,340 @@
+"""
+    Streaming catalog import, one row per product variant (SKU):
+
+        category, name, brand, fixed_price, discount_percentage, specifications,
+        description, is_published, color, base_price, base_discount, stock, images
+
+    Products are matched on (name, category) and variants on (product, color), both are
+    upserted with bulk_create(update_conflicts=True). `color` is a color name or code and
+    may be empty for products without variants. `images` are storage names of files
+    already uploaded, a JSON list or "|" separated in CSV; when given they replace the
+    images of the variant.
+"""
+import csv
+import json
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from product.models import Brand, CategoryChildren, Color, Product, ProductColor, ProductImage
+from product.service.cache import PRODUCT_LIST, PRODUCT_ROWS, bump_version, product_version_name
+from product.service.listing import schedule_listing_refresh
+from product.service.pricing import sync_product_prices
+from product.service.search import update_search_vector
+from product.service.stock import sync_product_stock
+from product.utils import allocate_slugs
+
+PRODUCT_UPDATE_FIELDS = [
+    "brand",
+    "specifications",
+    "description",
+    "fixed_price",
+    "discount_percentage",
+    "is_published",
+    "is_deleted",
+    "deleted_at",
+    "updated_at",
+]
+VARIANT_UPDATE_FIELDS = ["base_price", "base_discount", "stock", "is_deleted", "deleted_at", "updated_at"]
+TRUE_VALUES = {"1", "true", "yes", "on"}
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_rows(stream, file_format):
+    """
+        Rows of a CSV or JSONL text stream as dicts, one at a time
+    """
+    if file_format == "csv":
+        yield from csv.DictReader(stream)
+        return
+
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as error:
+            yield RowError(f"Invalid JSON: {error}")
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def _text(row, key):
+    value = row.get(key)
+    return str(value).strip() if value is not None else ""
+
+
+def _number(row, key, default=0):
+    value = _text(row, key)
+    if not value:
+        return default
+    try:
+        number = int(float(value.replace(",", "")))
+    except ValueError:
+        raise RowError(f"{key} is not a number: {value!r}")
+    if number < 0:
+        raise RowError(f"{key} can not be negative")
+    return number
+
+
+def _images(row):
+    value = row.get("images")
+    if value in (None, ""):
+        return None
+    if isinstance(value, str):
+        value = [name.strip() for name in value.split("|")]
+    return [name for name in value if name]
+
+
+class CatalogImporter:
+    """
+        Upserts rows in batches. Brand, Color and CategoryChildren are resolved through
+        lookup maps loaded once, so memory does not grow with the size of the file.
+    """
+
+    def __init__(self, create_brands=False, dry_run=False):
+        self.create_brands = create_brands
+        self.dry_run = dry_run
+        self.categories = {
+            name.casefold(): pk for pk, name in CategoryChildren.all_objects.values_list("pk", "name")
+        }
+        self.brands = {name.casefold(): pk for pk, name in Brand.all_objects.values_list("pk", "name")}
+        self.colors = {}
+        for pk, name, code in Color.all_objects.values_list("pk", "name", "code"):
+            self.colors[name.casefold()] = pk
+            self.colors[code.lower()] = pk
+        self.stats = {"rows": 0, "products_created": 0, "products_updated": 0, "variants": 0, "images": 0, "errors": 0}
+        self.errors = []
+        self.created_brands = []
+
+    # <------------ Parsing ---------------->
+
+    def brand_id(self, name):
+        if not name:
+            return None
+        pk = self.brands.get(name.casefold())
+        if pk is None:
+            if not self.create_brands:
+                raise RowError(f"Unknown brand {name!r}")
+            if len(name) > Brand._meta.get_field("name").max_length:
+                raise RowError("brand is too long")
+            pk = Brand.objects.create(name=name).pk
+            self.brands[name.casefold()] = pk
+            self.created_brands.append(name.casefold())
+        return pk
+
+    def parse(self, row):
+        if isinstance(row, RowError):
+            raise row
+
+        name = _text(row, "name")
+        if not name:
+            raise RowError("name is required")
+        if len(name) > Product._meta.get_field("name").max_length:
+            raise RowError("name is too long")
+        category = _text(row, "category")
+        category_id = self.categories.get(category.casefold())
+        if category_id is None:
+            raise RowError(f"Unknown category {category!r}")
+
+        color = _text(row, "color")
+        color_id = None
+        if color:
+            color_id = self.colors.get(color.casefold()) or self.colors.get(color.lower())
+            if color_id is None:
+                raise RowError(f"Unknown color {color!r}")
+
+        published = _text(row, "is_published")
+        product = {
+            "name": name,
+            "category_id": category_id,
+            "brand_id": self.brand_id(_text(row, "brand")),
+            "specifications": _text(row, "specifications") or None,
+            "description": _text(row, "description") or None,
+            "fixed_price": _number(row, "fixed_price"),
+            "discount_percentage": _number(row, "discount_percentage"),
+            "is_published": published.lower() in TRUE_VALUES if published else True,
+        }
+        if product["discount_percentage"] > 100:
+            raise RowError("discount_percentage can not be over 100")
+
+        variant = None
+        if color_id is not None:
+            variant = {
+                "color_id": color_id,
+                "base_price": _number(row, "base_price"),
+                "base_discount": _number(row, "base_discount"),
+                "stock": _number(row, "stock"),
+                "images": _images(row),
+            }
+        return product, variant
+
+    # <------------ Batches ---------------->
+
+    def import_rows(self, rows, batch_size=1000):
+        """
+            Yields the running stats after each batch
+        """
+        line = 0
+        for batch in batches(rows, batch_size):
+            with transaction.atomic():
+                parsed = []
+                for row in batch:
+                    line += 1
+                    try:
+                        parsed.append(self.parse(row))
+                    except RowError as error:
+                        self.stats["errors"] += 1
+                        self.errors.append((line, str(error)))
+
+                self.import_batch(parsed)
+                if self.dry_run:
+                    transaction.set_rollback(True)
+
+            if self.dry_run:
+                # Rolled back, later batches must not refer to them
+                for name in self.created_brands:
+                    del self.brands[name]
+            self.created_brands = []
+
+            self.stats["rows"] += len(batch)
+            yield self.stats
+
+    def import_batch(self, parsed):
+        now = timezone.now()
+
+        # Several variant rows describe the same product, the last one wins
+        products = {}
+        for product, _ in parsed:
+            products[(product["name"], product["category_id"])] = product
+        if not products:
+            return
+
+        existing = self.existing_products(products)
+        new_keys = [key for key in products if key not in existing]
+        slugs = dict(zip(new_keys, allocate_slugs(Product.all_objects.all(), [name for name, _ in new_keys])))
+
+        instances = [
+            Product(
+                **values,
+                slug=existing.get(key) or slugs[key],
+                is_deleted=False,
+                deleted_at=None,
+                created_at=now,
+                updated_at=now,
+            )
+            for key, values in products.items()
+        ]
+        Product.all_objects.bulk_create(
+            instances,
+            update_conflicts=True,
+            unique_fields=["name", "category"],
+            update_fields=PRODUCT_UPDATE_FIELDS,
+        )
+        product_ids = {(instance.name, instance.category_id): instance.pk for instance in instances}
+        self.stats["products_created"] += len(new_keys)
+        self.stats["products_updated"] += len(products) - len(new_keys)
+
+        variants = {}
+        for product, variant in parsed:
+            if variant is not None:
+                variants[(product_ids[(product["name"], product["category_id"])], variant["color_id"])] = variant
+        self.import_variants(variants, now)
+
+        ids = list(product_ids.values())
+        sync_product_prices(ids)
+        sync_product_stock(ids)
+        update_search_vector(Product.all_objects.filter(pk__in=ids))
+        # Both wait for the commit of the batch, a dry run rolls back and drops them
+        schedule_listing_refresh(ids)
+        bump_version(PRODUCT_LIST, PRODUCT_ROWS, *(product_version_name(instance.slug) for instance in instances))
+
+    def existing_products(self, products):
+        """
+            {(name, category_id): slug} of the products of the batch that already exist
+        """
+        names = {name for name, _ in products}
+        category_ids = {category_id for _, category_id in products}
+        rows = Product.all_objects.filter(name__in=names, category_id__in=category_ids).values_list(
+            "name", "category_id", "slug"
+        )
+        return {(name, category_id): slug for name, category_id, slug in rows if (name, category_id) in products}
+
+    def import_variants(self, variants, now):
+        if not variants:
+            return
+
+        instances = [
+            ProductColor(
+                product_id=product_id,
+                color_id=color_id,
+                base_price=values["base_price"],
+                base_discount=values["base_discount"],
+                stock=values["stock"],
+                is_deleted=False,
+                deleted_at=None,
+                created_at=now,
+                updated_at=now,
+            )
+            for (product_id, color_id), values in variants.items()
+        ]
+        ProductColor.all_objects.bulk_create(
+            instances,
+            update_conflicts=True,
+            unique_fields=["product", "color"],
+            update_fields=VARIANT_UPDATE_FIELDS,
+        )
+        self.stats["variants"] += len(instances)
+
+        images = {
+            instance.pk: variants[(instance.product_id, instance.color_id)]["images"]
+            for instance in instances
+            if variants[(instance.product_id, instance.color_id)]["images"] is not None
+        }
+        self.import_images(images, now)
+
+    def import_images(self, images, now):
+        """
+            Make the images of each variant exactly the given list, in order
+        """
+        if not images:
+            return
+
+        current = list(ProductImage.objects.filter(product_color_id__in=images))
+        existing = {(image.product_color_id, image.image.name): image for image in current}
+
+        new, changed, kept = [], [], set()
+        for variant_id, names in images.items():
+            for order, name in enumerate(names):
+                image = existing.get((variant_id, name))
+                if image is None:
+                    new.append(
+                        ProductImage(
+                            product_color_id=variant_id,
+                            image=name,
+                            order=order,
+                            is_cover=order == 0,
+                            created_at=now,
+                            updated_at=now,
+                        )
+                    )
+                    continue
+                kept.add(image.pk)
+                if (image.order, image.is_cover) != (order, order == 0):
+                    image.order, image.is_cover, image.updated_at = order, order == 0, now
+                    changed.append(image)
+
+        ProductImage.objects.bulk_create(new)
+        ProductImage.objects.bulk_update(changed, ["order", "is_cover", "updated_at"])
+        removed = [image.pk for image in current if image.pk not in kept]
+        ProductImage.objects.filter(pk__in=removed).update(is_deleted=True, deleted_at=now, updated_at=now)
+        self.stats["images"] += len(new)
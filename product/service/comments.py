@@ -0,0 +1,52 @@
+from django.db.models.expressions import RawSQL
+
+from product.models import ProductComment
+
+# Ids of the given comments and all of their (not deleted) replies, at any depth
+DESCENDANTS_SQL = """
+    WITH RECURSIVE thread(id) AS (
+        SELECT id FROM {table} WHERE id = ANY(%s)
+        UNION ALL
+        SELECT comment.id FROM {table} comment
+        INNER JOIN thread ON comment.reply_id = thread.id
+        WHERE NOT comment.is_deleted
+    )
+    SELECT id FROM thread
+"""
+
+
+def root_comments(product):
+    return (
+        ProductComment.objects.filter(product=product, reply__isnull=True)
+        .select_related("created_by")
+        .order_by("-created_at", "-id")
+    )
+
+
+def attach_comment_threads(roots):
+    """
+        Loads the replies of every root comment with a single recursive query
+        and assembles the tree in memory as `tree_replies`, oldest reply first.
+    """
+    roots = list(roots)
+    if not roots:
+        return roots
+
+    sql = DESCENDANTS_SQL.format(table=ProductComment._meta.db_table)
+    replies = (
+        ProductComment.objects.filter(pk__in=RawSQL(sql, ([root.pk for root in roots],)))
+        .exclude(reply__isnull=True)
+        .select_related("created_by")
+        .order_by("created_at", "id")
+    )
+
+    comments = {root.pk: root for root in roots}
+    for comment in roots:
+        comment.tree_replies = []
+    for reply in replies:
+        reply.tree_replies = []
+        comments[reply.pk] = reply
+    for reply in comments.values():
+        if reply.reply_id in comments:
+            comments[reply.reply_id].tree_replies.append(reply)
+    return roots
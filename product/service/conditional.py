@@ -0,0 +1,60 @@
+from django.db.models import F, Max, OuterRef, Subquery
+from django.db.models.functions import Greatest
+
+from product.models import Product, ProductColor, ProductComment, ProductImage, ProductListing
+
+
+def _latest(queryset, field="updated_at"):
+    # Through a nullable relation (a comment without author) NULL would sort first
+    return Subquery(queryset.order_by(F(field).desc(nulls_last=True)).values(field)[:1])
+
+
+def tables_last_modified(*models):
+    """
+        Latest updated_at over the whole tables of models, in a single query.
+        Soft deleted rows are included, a soft delete updates the row. Hard deletes
+        (QuerySet.delete(), CASCADE) do not move it, see ConditionalGetMixin.get_etag_entities.
+    """
+    first, *others = models
+    return first.all_objects.aggregate(
+        last_modified=Greatest(Max("updated_at"), *(_latest(model.all_objects) for model in others))
+        if others
+        else Max("updated_at")
+    )["last_modified"]
+
+
+def product_last_modified(queryset):
+    """
+        Latest updated_at of a product together with its brand, category, colors, images, comments
+        and their authors (names and profile images are shown), in a single query. queryset must match at most one product.
+    """
+    colors = ProductColor.all_objects.filter(product=OuterRef("pk"))
+    images = ProductImage.all_objects.filter(product_color__product=OuterRef("pk"))
+    comments = ProductComment.all_objects.filter(product=OuterRef("pk"))
+
+    return (
+        queryset.order_by()
+        .annotate(
+            last_modified=Greatest(
+                "updated_at",
+                "brand__updated_at",
+                "category__updated_at",
+                _latest(colors),
+                _latest(colors, "color__updated_at"),
+                _latest(images),
+                _latest(comments),
+                _latest(comments, "created_by__updated_at"),
+            )
+        )
+        .values_list("last_modified", flat=True)
+        .first()
+    )
+
+
+def listing_last_modified():
+    """
+        Unpublished products leave the listing table, so the products table is checked as well
+    """
+    return ProductListing.objects.aggregate(
+        last_modified=Greatest(Max("refreshed_at"), _latest(Product.all_objects))
+    )["last_modified"]
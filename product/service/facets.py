@@ -0,0 +1,54 @@
+from django.db.models import Count, Max, Min, Q
+
+from product.models import Product, ProductColor
+
+
+def brand_facet(queryset):
+    # Like brands-list/, soft deleted brands are not offered
+    products = Product.objects.filter(pk__in=queryset.order_by().values("pk"), brand__is_deleted=False)
+    rows = (
+        products.values("brand_id", "brand__name")
+        .annotate(count=Count("pk"))
+        .order_by("-count", "brand__name")
+    )
+    return [{"id": row["brand_id"], "name": row["brand__name"], "count": row["count"]} for row in rows]
+
+
+def color_facet(queryset):
+    rows = (
+        ProductColor.objects.filter(product__in=queryset.order_by().values("pk"), color__is_deleted=False)
+        .values("color_id", "color__name", "color__code")
+        .annotate(count=Count("product_id", distinct=True))
+        .order_by("-count", "color__name")
+    )
+    return [
+        {"id": row["color_id"], "name": row["color__name"], "code": row["color__code"], "count": row["count"]}
+        for row in rows
+    ]
+
+
+def price_facet(queryset, price_field, boundaries):
+    """
+        Histogram of price_field over the given bucket boundaries, counted in a single aggregate.
+        The last bucket is open ended.
+    """
+    boundaries = sorted(boundaries)
+    ranges = list(zip(boundaries, boundaries[1:] + [None]))
+
+    aggregates = {"min": Min(price_field), "max": Max(price_field)}
+    for index, (low, high) in enumerate(ranges):
+        condition = Q(**{f"{price_field}__gte": low})
+        if high is not None:
+            condition &= Q(**{f"{price_field}__lt": high})
+        aggregates[f"bucket_{index}"] = Count("pk", filter=condition)
+
+    products = Product.objects.filter(pk__in=queryset.order_by().values("pk"))
+    result = products.aggregate(**aggregates)
+    return {
+        "min": result["min"],
+        "max": result["max"],
+        "buckets": [
+            {"min": low, "max": high, "count": result[f"bucket_{index}"]}
+            for index, (low, high) in enumerate(ranges)
+        ],
+    }
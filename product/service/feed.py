@@ -0,0 +1,121 @@
+"""
+    Full catalog feed for marketplaces and price comparison sites.
+
+    Rows are read from ProductListing through a server-side cursor and written as
+    CSV, JSONL or XML in chunks, so memory does not depend on the size of the catalog.
+"""
+import csv
+import io
+import json
+import zlib
+from xml.sax.saxutils import escape
+
+from django.core.files.storage import default_storage
+
+from product.models import ProductListing
+
+FEED_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson; charset=utf-8",
+    "xml": "application/xml; charset=utf-8",
+}
+FEED_FIELDS = ["id", "name", "slug", "category", "brand", "price", "sale_price", "stock", "image"]
+# Rows fetched from the cursor per round trip
+FEED_CHUNK_SIZE = 2000
+# Bytes of output collected before a chunk is handed to the response or the file
+FEED_BUFFER_SIZE = 64 * 1024
+
+
+def feed_rows(absolute_url=None):
+    """
+        A dict per listed product, in FEED_FIELDS order
+    """
+    rows = (
+        ProductListing.objects.filter(is_category_active=True)
+        .order_by("pk")
+        .values_list(
+            "pk",
+            "name",
+            "slug",
+            "category__name",
+            "brand_name",
+            "min_price",
+            "min_discounted_price",
+            "total_stock",
+            "cover_image",
+        )
+        .iterator(chunk_size=FEED_CHUNK_SIZE)
+    )
+    for pk, name, slug, category, brand, price, sale_price, stock, image in rows:
+        if image:
+            image = default_storage.url(image)
+            if absolute_url is not None:
+                image = absolute_url(image)
+        yield {
+            "id": pk,
+            "name": name,
+            "slug": slug,
+            "category": category,
+            "brand": brand,
+            "price": price,
+            "sale_price": sale_price,
+            "stock": stock,
+            "image": image,
+        }
+
+
+def _csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FEED_FIELDS)
+    for row in rows:
+        writer.writerow(row.values())
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + "\n"
+
+
+def _xml_lines(rows):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n<products>\n'
+    for row in rows:
+        fields = "".join(f"<{key}>{escape(str(value))}</{key}>" for key, value in row.items())
+        yield f"<product>{fields}</product>\n"
+    yield "</products>\n"
+
+
+WRITERS = {"csv": _csv_lines, "jsonl": _jsonl_lines, "xml": _xml_lines}
+
+
+def _buffered(lines, size=FEED_BUFFER_SIZE):
+    chunk, length = [], 0
+    for line in lines:
+        chunk.append(line)
+        length += len(line)
+        if length >= size:
+            yield "".join(chunk).encode()
+            chunk, length = [], 0
+    if chunk:
+        yield "".join(chunk).encode()
+
+
+def gzip_stream(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def render_feed(feed_format, absolute_url=None, gzip=False):
+    """
+        The feed as an iterator of byte chunks, gzip compressed when asked
+    """
+    chunks = _buffered(WRITERS[feed_format](feed_rows(absolute_url)))
+    return gzip_stream(chunks) if gzip else chunks
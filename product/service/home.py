@@ -0,0 +1,98 @@
+"""
+    The storefront home page in one response: the category menu, brands, colors,
+    gallery and the first page of products, as categories-list/, brands-list/,
+    colors-list/, gallery/ and list/ return them.
+
+    Each fragment is cached on its own, under the version of the entity it shows, so
+    editing a brand rebuilds the brands and nothing else: the products fragment follows
+    PRODUCT_ROWS, which brand and category edits do not move. All fragments are read with
+    one get_many, the category menu comes from the per process menu of
+    product.service.menu.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+
+from product.models import Brand, Color, Gallery, Product
+from product.pagination import KeysetPagination
+from product.serializers import BrandSerializer, ColorSerializer, GallerySerializer, ProductListSerializer
+from product.service.cache import BRAND, COLOR, GALLERY, PRODUCT_ROWS, get_versions
+from product.service.menu import category_menu
+
+FRAGMENT_KEY = "catalog:home:{name}:{version}:{host}"
+
+# Serializers with DynamicFieldsMixin ignore the ?fields= of the home request
+DEFAULT_SHAPE = (None, {})
+
+
+def _brands(request):
+    queryset = Brand.objects.filter(is_deleted=False).only("id", "name")
+    return BrandSerializer(queryset, many=True, shape=DEFAULT_SHAPE).data
+
+
+def _colors(request):
+    queryset = Color.objects.filter(is_deleted=False).only("id", "name", "code")
+    return ColorSerializer(queryset, many=True, shape=DEFAULT_SHAPE).data
+
+
+def _gallery(request):
+    queryset = Gallery.objects.filter(is_published=True, is_deleted=False).only("id", "image", "renditions", "order")
+    return GallerySerializer(queryset, many=True, context={"request": request}).data
+
+
+def _products(request):
+    """
+        The first page of list/ without parameters, its next link continues on list/
+    """
+    paginator = KeysetPagination()
+    paginator.request = request
+    paginator.base_url = request.build_absolute_uri(reverse("products-list"))
+
+    select, prefetch = ProductListSerializer.related_lookups()
+    queryset = (
+        Product.objects.filter(is_published=True, is_deleted=False)
+        .select_related(*select)
+        .prefetch_related(*prefetch)
+    )
+    # Without a view there is no ?ordering=, the list's default ordering applies
+    products = paginator.paginate(queryset, paginator.get_ordering(request, queryset, view=None))
+    data = ProductListSerializer(products, many=True, shape=DEFAULT_SHAPE, context={"request": request}).data
+    return paginator.get_paginated_response(data).data
+
+
+# name: (version entity, builder)
+FRAGMENTS = {
+    "brands": (BRAND, _brands),
+    "colors": (COLOR, _colors),
+    "gallery": (GALLERY, _gallery),
+    # Not PRODUCT_LIST: the default list shape shows no brand or category
+    "products": (PRODUCT_ROWS, _products),
+}
+
+
+def home_page(request):
+    """
+        {"categories", "brands", "colors", "gallery", "products"}. Costs two cache
+        reads and no queries while nothing changed, only stale fragments are rebuilt.
+    """
+    versions = get_versions(*(entity for entity, _ in FRAGMENTS.values()))
+    # Image and link URLs are absolute
+    host = hashlib.md5(request.build_absolute_uri("/").encode()).hexdigest()
+    keys = {
+        name: FRAGMENT_KEY.format(name=name, version=versions[entity], host=host)
+        for name, (entity, _) in FRAGMENTS.items()
+    }
+    cached = cache.get_many(keys.values())
+
+    page = {"categories": category_menu(request)[0]}
+    stale = {}
+    for name, (_, build) in FRAGMENTS.items():
+        fragment = cached.get(keys[name])
+        if fragment is None:
+            fragment = stale[keys[name]] = build(request)
+        page[name] = fragment
+    if stale:
+        cache.set_many(stale, settings.CATALOG_CACHE_TIMEOUT)
+    return page
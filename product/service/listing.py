@@ -0,0 +1,120 @@
+from django.db import transaction
+from django.db.models import Prefetch
+
+from product.models import Product, ProductColor, ProductImage, ProductListing
+from product.service.cache import PRODUCT_LIST, bump_version
+
+LISTING_UPDATE_FIELDS = [
+    "category",
+    "is_category_active",
+    "brand",
+    "brand_name",
+    "name",
+    "slug",
+    "fixed_price",
+    "discount_percentage",
+    "min_price",
+    "max_price",
+    "min_discounted_price",
+    "max_discounted_price",
+    "cover_image",
+    "cover_renditions",
+    "color_ids",
+    "color_codes",
+    "total_stock",
+    "is_available",
+    "created_at",
+    "refreshed_at",
+]
+
+
+def listing_source_queryset():
+    images = ProductImage.objects.order_by("-is_cover", "order", "id")
+    colors = (
+        ProductColor.objects.select_related("color")
+        .prefetch_related(Prefetch("images", queryset=images))
+        .order_by("id")
+    )
+    return (
+        Product.objects.filter(is_published=True)
+        .select_related("brand", "category")
+        .prefetch_related(Prefetch("colors", queryset=colors))
+    )
+
+
+def build_listing(product):
+    colors = list(product.colors.all())
+
+    if colors:
+        prices = [color.effective_price for color in colors]
+        discounted_prices = [color.effective_discounted_price for color in colors]
+    else:
+        prices = [product.fixed_price]
+        discounted_prices = [product.min_discounted_price]
+
+    # Cover images come first in each color, the first color with a cover wins
+    images = [image for color in colors for image in color.images.all()]
+    cover = next((image for image in images if image.is_cover), images[0] if images else None)
+
+    category = product.category
+    return ProductListing(
+        product=product,
+        category=category,
+        is_category_active=category.is_active and not category.is_deleted,
+        brand=product.brand,
+        brand_name=product.brand.name if product.brand else "",
+        name=product.name,
+        slug=product.slug,
+        fixed_price=product.fixed_price,
+        discount_percentage=product.discount_percentage,
+        min_price=min(prices),
+        max_price=max(prices),
+        min_discounted_price=product.min_discounted_price,
+        max_discounted_price=max(discounted_prices),
+        cover_image=cover.image.name if cover else "",
+        cover_renditions=cover.renditions if cover else {},
+        color_ids=[color.color_id for color in colors],
+        color_codes=[color.color.code for color in colors],
+        total_stock=product.total_stock,
+        is_available=product.is_available,
+        created_at=product.created_at,
+    )
+
+
+def refresh_product_listings(product_ids, batch_size=500):
+    """
+        Rebuild the listing rows of the given products.
+        Rows of unpublished or deleted products are removed.
+    """
+    product_ids = set(product_ids)
+    if not product_ids:
+        return 0
+
+    listings = [build_listing(product) for product in listing_source_queryset().filter(pk__in=product_ids)]
+    stale_ids = product_ids - {listing.product_id for listing in listings}
+    if stale_ids:
+        ProductListing.objects.filter(product_id__in=stale_ids).delete()
+
+    ProductListing.objects.bulk_create(
+        listings,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["product"],
+        update_fields=LISTING_UPDATE_FIELDS,
+    )
+    return len(listings)
+
+
+def _refresh_listings_and_version(product_ids):
+    refresh_product_listings(product_ids)
+    # The compact lists read the listing, pages cached between the commit and the refresh are stale
+    bump_version(PRODUCT_LIST)
+
+
+def schedule_listing_refresh(product_ids):
+    """
+        Refresh the listing rows once the current transaction commits
+    """
+    product_ids = set(product_ids)
+    if product_ids:
+        transaction.on_commit(lambda: _refresh_listings_and_version(product_ids))
@@ -0,0 +1,53 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Prefetch
+
+from product.models import Category, CategoryChildren
+from product.serializers import CategoryListSerializer
+from product.service.cache import CATEGORY, get_version
+from product.service.conditional import tables_last_modified
+
+# (version, expires, categories, last_modified) of the menu loaded by this process. It is
+# reloaded when the shared CATEGORY version moves on, which the category signals bump on
+# every save or soft delete, so each worker notices a change on its next request, and
+# after CATALOG_MENU_TIMEOUT in any case. The categories are kept with their children
+# prefetched and serialized per request, their icon URLs are absolute.
+_menu = None
+_lock = threading.Lock()
+
+
+def menu_queryset():
+    children = CategoryChildren.objects.filter(
+        is_active=True, show_in_menu=True, is_deleted=False
+    ).order_by("order", "created_at")
+    return (
+        Category.objects.filter(is_active=True, is_deleted=False)
+        .prefetch_related(Prefetch("children", queryset=children))
+        .order_by("order", "created_at")
+    )
+
+
+def category_menu(request):
+    """
+        The serialized category menu and its last modified time.
+        Costs one shared cache read and no queries while the menu is unchanged.
+    """
+    global _menu
+
+    # Read the version before loading, a change during the load only causes another one
+    version = get_version(CATEGORY)
+    menu = _menu
+    if menu is None or menu[0] != version or menu[1] <= time.monotonic():
+        with _lock:
+            menu = _menu
+            if menu is None or menu[0] != version or menu[1] <= time.monotonic():
+                last_modified = tables_last_modified(Category, CategoryChildren)
+                categories = list(menu_queryset())
+                expires = time.monotonic() + settings.CATALOG_MENU_TIMEOUT
+                menu = _menu = (version, expires, categories, last_modified)
+
+    _, _, categories, last_modified = menu
+    data = CategoryListSerializer(categories, many=True, context={"request": request}).data
+    return data, last_modified
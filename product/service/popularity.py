@@ -0,0 +1,172 @@
+"""
+    Sales counts, view counts, ratings and the popularity score stored on Product.
+
+    Sales are rolled up from order events (order/signals.py), ratings from comment
+    events (product/signals.py). Views are counted in the cache on every detail request
+    and written to the database by the update_popularity command, which also decays
+    the popularity of every product so recent views and sales weigh more.
+"""
+import hashlib
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Case, Count, F, FloatField, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from product.models import Product, ProductComment
+from product.service.cache import PRODUCT_LIST, PRODUCT_ROWS, bump_version
+
+VIEW_KEY = "catalog:views:{}"
+
+
+def _view_key(slug):
+    return VIEW_KEY.format(hashlib.md5(slug.encode()).hexdigest())
+
+
+# <------------ Views ---------------->
+
+
+def record_product_view(slug):
+    """
+        One cache increment, no query. Buffered until flush_product_views().
+        Needs a cache shared by all workers (Redis in production) to count every view.
+    """
+    key = _view_key(slug)
+    cache.add(key, 0, settings.CATALOG_VIEW_BUFFER_TIMEOUT)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add and incr
+        cache.add(key, 1, settings.CATALOG_VIEW_BUFFER_TIMEOUT)
+
+
+def flush_product_views(batch_size=1000):
+    """
+        Move the buffered view counts to Product.view_count and popularity.
+        Returns the number of views written.
+    """
+    weight = settings.CATALOG_POPULARITY_VIEW_WEIGHT
+    products = Product.objects.order_by("pk").values_list("pk", "slug")
+
+    last_pk = 0
+    flushed = 0
+    while True:
+        batch = list(products.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+
+        keys = {_view_key(slug): pk for pk, slug in batch}
+        views = {}
+        for key, count in cache.get_many(list(keys)).items():
+            if not count:
+                continue
+            try:
+                # Views counted meanwhile stay in the buffer for the next run
+                cache.decr(key, count)
+            except ValueError:
+                pass
+            views[keys[key]] = count
+
+        if views:
+            whens = [When(pk=pk, then=Value(count)) for pk, count in views.items()]
+            added = Case(*whens, default=Value(0), output_field=IntegerField())
+            Product.all_objects.filter(pk__in=views).update(
+                view_count=F("view_count") + added,
+                popularity=F("popularity") + added * weight,
+                updated_at=timezone.now(),
+            )
+            flushed += sum(views.values())
+
+    if flushed:
+        bump_version(PRODUCT_LIST, PRODUCT_ROWS)
+    return flushed
+
+
+# <------------ Sales ---------------->
+
+
+def record_sales(units):
+    """
+        units: {product_id: units sold}, negative for cancelled or removed order items
+    """
+    weight = settings.CATALOG_POPULARITY_SALE_WEIGHT
+    units = {product_id: count for product_id, count in units.items() if product_id and count}
+    for product_id, count in units.items():
+        Product.all_objects.filter(pk=product_id).update(
+            sales_count=Greatest(F("sales_count") + count, 0),
+            popularity=Greatest(F("popularity") + count * weight, 0.0),
+            updated_at=timezone.now(),
+        )
+    if units:
+        bump_version(PRODUCT_LIST, PRODUCT_ROWS)
+
+
+def rebuild_sales():
+    """
+        Recompute every sales_count from the order items, e.g. after importing orders
+    """
+    OrderItem = apps.get_model("order", "OrderItem")
+    sold = (
+        OrderItem.objects.filter(product_color__product=OuterRef("pk"))
+        .exclude(order__status="canceled")
+        .exclude(order__is_deleted=True)
+        .order_by()
+        .values("product_color__product")
+        .annotate(units=Sum("product_count"))
+        .values("units")
+    )
+    total = Coalesce(Subquery(sold), Value(0))
+    updated = Product.all_objects.exclude(sales_count=total).update(sales_count=total, updated_at=timezone.now())
+    if updated:
+        bump_version(PRODUCT_LIST, PRODUCT_ROWS)
+    return updated
+
+
+# <------------ Ratings ---------------->
+
+
+def sync_product_ratings(product_ids):
+    """
+        Average and count of the approved root comment ratings, in one UPDATE
+    """
+    ratings = (
+        ProductComment.objects.filter(
+            product=OuterRef("pk"), is_approved=True, reply__isnull=True, rating__isnull=False
+        )
+        .order_by()
+        .values("product")
+    )
+    average = Coalesce(
+        Subquery(ratings.annotate(average=Avg("rating")).values("average"), output_field=FloatField()),
+        Value(0.0),
+    )
+    count = Coalesce(Subquery(ratings.annotate(count=Count("pk")).values("count")), Value(0))
+
+    products = Product.all_objects.filter(pk__in=set(product_ids)).exclude(Q(rating=average) & Q(rating_count=count))
+    updated = products.update(rating=average, rating_count=count, updated_at=timezone.now())
+    if updated:
+        bump_version(PRODUCT_LIST, PRODUCT_ROWS)
+    return updated
+
+
+# <------------ Decay ---------------->
+
+
+def decay_popularity(factor=None, floor=0.01):
+    """
+        Scale every popularity score by factor, scores that would fall under floor drop to 0.
+        ?ordering=popularity cursors hold absolute scores, so like any other popularity
+        change this moves updated_at and PRODUCT_LIST: cached pages and their cursors are
+        dropped, and cursors issued before the decay continue from a shifted position.
+    """
+    factor = settings.CATALOG_POPULARITY_DECAY if factor is None else factor
+    now = timezone.now()
+    Product.all_objects.filter(popularity__gt=0, popularity__lt=floor / factor).update(popularity=0, updated_at=now)
+    updated = Product.all_objects.filter(popularity__gt=0).update(
+        popularity=F("popularity") * factor, updated_at=now
+    )
+    bump_version(PRODUCT_LIST, PRODUCT_ROWS)
+    return updated
@@ -0,0 +1,38 @@
+from django.db.models import Prefetch
+
+from product.models import Product, ProductColor
+
+
+def discounted_price(price, percentage):
+    return price - (price * percentage // 100)
+
+
+def sync_product_prices(product_ids):
+    """
+        Recompute the stored effective prices of the variants of the given products
+        and each product's min_discounted_price. Writes only the rows that changed.
+    """
+    products = Product.all_objects.filter(pk__in=set(product_ids)).prefetch_related(
+        Prefetch("colors", queryset=ProductColor.objects.order_by())
+    )
+
+    changed_colors = []
+    for product in products:
+        colors = list(product.colors.all())
+        for color in colors:
+            prices = (color.price, color.discounted_price)
+            if prices != (color.effective_price, color.effective_discounted_price):
+                color.effective_price, color.effective_discounted_price = prices
+                changed_colors.append(color)
+
+        if colors:
+            min_price = min(color.effective_discounted_price for color in colors)
+        else:
+            min_price = discounted_price(product.fixed_price, product.discount_percentage)
+
+        if product.min_discounted_price != min_price:
+            Product.all_objects.filter(pk=product.pk).update(min_discounted_price=min_price)
+
+    ProductColor.all_objects.bulk_update(
+        changed_colors, ["effective_price", "effective_discounted_price"], batch_size=500
+    )
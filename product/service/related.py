@@ -0,0 +1,322 @@
+"""
+    Related products, computed offline by the update_related_products command.
+
+    Orders are counted into ProductCoPurchase, a sparse product x product matrix of
+    co-purchases. The products counted for each order are kept in ProductCoPurchaseBasket:
+    when an order changes afterwards (order.signals marks it), its old basket is taken
+    back and the new one counted, cancelled and deleted orders count as empty. The score of a pair is the cosine similarity of their order vectors,
+    orders(a, b) / sqrt(orders(a) * orders(b)), plus a share of RELATED_PRODUCTS_CATEGORY_WEIGHT
+    for the most popular products of the same category, so products without sales still
+    get neighbours. The best RELATED_PRODUCTS_COUNT of each product go to RelatedProduct.
+
+    numpy and scipy are only imported by the command, never by the web workers.
+"""
+import numpy as np
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from scipy import sparse
+
+from product.models import Product, ProductCoPurchase, ProductCoPurchaseBasket, RelatedProduct, RelatedProductsRun
+from product.service.cache import RELATED, bump_version
+
+ORDERS_CHUNK_SIZE = 10000
+PRODUCTS_CHUNK_SIZE = 1000
+
+
+class ProductIndex:
+    """
+        Maps product ids to matrix positions and back
+    """
+
+    def __init__(self):
+        self.ids = np.fromiter(Product.all_objects.order_by("pk").values_list("pk", flat=True), dtype=np.int64)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def positions(self, product_ids):
+        return np.searchsorted(self.ids, np.asarray(product_ids, dtype=np.int64))
+
+    def contains(self, product_ids):
+        # Products created after the index was loaded are left for the next run
+        return np.isin(np.asarray(product_ids, dtype=np.int64), self.ids)
+
+
+def _order_items():
+    OrderItem = apps.get_model("order", "OrderItem")
+    return (
+        OrderItem.objects.filter(product_color__isnull=False)
+        .exclude(order__status="canceled")
+        .exclude(order__is_deleted=True)
+    )
+
+
+# <------------ Co-purchases ---------------->
+
+
+def current_baskets(index, order_ids):
+    """
+        {order_id: product ids} of the items of the orders now. Cancelled and
+        deleted orders have none, products missing from the index are left out.
+    """
+    pairs = np.array(
+        list(
+            _order_items()
+            .filter(order_id__in=order_ids)
+            .values_list("order_id", "product_color__product_id")
+            .distinct()
+        ),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    pairs = pairs[index.contains(pairs[:, 1])]
+    baskets = {}
+    for order_id, product_id in pairs.tolist():
+        baskets.setdefault(order_id, []).append(product_id)
+    return baskets
+
+
+def co_purchase_counts(index, baskets):
+    """
+        Co-purchase counts of baskets, lists of product ids, as a sparse len(index) x len(index) matrix
+    """
+    size = len(index)
+    rows = [row for row, products in enumerate(baskets) for _ in products]
+    if not rows:
+        return sparse.csr_matrix((size, size), dtype=np.int64)
+    columns = index.positions([product_id for products in baskets for product_id in products])
+    # Orders x products incidence matrix, B.T @ B counts the orders of every pair
+    basket = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int64), (rows, columns)), shape=(len(baskets), size)
+    )
+    return (basket.T @ basket).tocsr()
+
+
+def recount_baskets(index, order_ids):
+    """
+        Replace the counted baskets of order_ids by their current items.
+        Returns the change of the co-purchase counts. Run it in the transaction
+        that stores the change.
+    """
+    new = current_baskets(index, order_ids)
+    old = [
+        [product_id for product_id, known in zip(products, index.contains(products)) if known]
+        for products in ProductCoPurchaseBasket.objects.filter(order_id__in=order_ids).values_list(
+            "products", flat=True
+        )
+    ]
+    ProductCoPurchaseBasket.objects.filter(order_id__in=order_ids).delete()
+    ProductCoPurchaseBasket.objects.bulk_create(
+        [ProductCoPurchaseBasket(order_id=order_id, products=products) for order_id, products in new.items()]
+    )
+    return co_purchase_counts(index, list(new.values())) - co_purchase_counts(index, old)
+
+
+def count_orders(index):
+    """
+        Count the orders that are new or changed since they were counted, and take back
+        the baskets of orders deleted for good. Order.co_purchases_counted and the
+        counted baskets change in the same transaction as ProductCoPurchase.
+        Returns (orders counted, positions of the products whose counts changed).
+    """
+    Order = apps.get_model("order", "Order")
+    touched = np.array([], dtype=np.int64)
+    orders = last_pk = 0
+
+    while True:
+        with transaction.atomic():
+            # Orders being changed right now are locked by their writers, their
+            # signals mark them again once committed and the next run counts them
+            order_ids = list(
+                Order.all_objects.select_for_update(skip_locked=True)
+                .filter(co_purchases_counted=False, pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:ORDERS_CHUNK_SIZE]
+            )
+            if not order_ids:
+                break
+            touched = np.union1d(touched, store_co_purchases(index, recount_baskets(index, order_ids)))
+            Order.all_objects.filter(pk__in=order_ids).update(co_purchases_counted=True)
+        last_pk = order_ids[-1]
+        orders += len(order_ids)
+
+    while True:
+        with transaction.atomic():
+            order_ids = list(
+                ProductCoPurchaseBasket.objects.exclude(order_id__in=Order.all_objects.values("pk"))
+                .select_for_update(skip_locked=True)
+                .values_list("order_id", flat=True)[:ORDERS_CHUNK_SIZE]
+            )
+            if not order_ids:
+                break
+            touched = np.union1d(touched, store_co_purchases(index, recount_baskets(index, order_ids)))
+        orders += len(order_ids)
+
+    return orders, touched
+
+
+def _load_pairs(index, positions):
+    """
+        ProductCoPurchase rows of the products at positions, as a len(positions) x len(index) matrix
+    """
+    rows = np.array(
+        list(
+            ProductCoPurchase.objects.filter(product_id__in=index.ids[positions].tolist()).values_list(
+                "product_id", "other_id", "orders"
+            )
+        ),
+        dtype=np.int64,
+    ).reshape(-1, 3)
+    rows = rows[index.contains(rows[:, 1])]
+    local = np.searchsorted(positions, index.positions(rows[:, 0]))
+    return sparse.csr_matrix(
+        (rows[:, 2], (local, index.positions(rows[:, 1]))), shape=(len(positions), len(index))
+    )
+
+
+def store_co_purchases(index, delta):
+    """
+        Add delta, which may be negative, to ProductCoPurchase. Returns the positions
+        of the products that changed. Run it in a transaction, the rows of the changed
+        products are written again.
+    """
+    delta.eliminate_zeros()
+    touched = np.unique(delta.nonzero()[0])
+    for start in range(0, len(touched), PRODUCTS_CHUNK_SIZE):
+        positions = touched[start : start + PRODUCTS_CHUNK_SIZE]
+        counts = (_load_pairs(index, positions) + delta[positions]).tocoo()
+        # Pairs that dropped to zero are no longer in counts, they are deleted with the rest
+        ProductCoPurchase.objects.filter(product_id__in=index.ids[positions].tolist()).delete()
+        ProductCoPurchase.objects.bulk_create(
+            [
+                ProductCoPurchase(product_id=index.ids[positions[row]], other_id=index.ids[column], orders=count)
+                for row, column, count in zip(counts.row.tolist(), counts.col.tolist(), counts.data.tolist())
+                if count > 0
+            ],
+            batch_size=5000,
+        )
+    return touched
+
+
+# <------------ Scores ---------------->
+
+
+def _category_matrix(index):
+    """
+        (products x categories one-hot matrix, categories x products matrix of the
+        category score of the most popular published products of each category)
+    """
+    rows = np.array(
+        list(Product.all_objects.values_list("pk", "category_id", "is_published", "is_deleted", "popularity")),
+        dtype=np.float64,
+    ).reshape(-1, 5)
+    positions = index.positions(rows[:, 0].astype(np.int64))
+    categories, category_of = np.unique(rows[:, 1].astype(np.int64), return_inverse=True)
+    size = len(index)
+
+    membership = sparse.csr_matrix(
+        (np.ones(len(rows)), (positions, category_of)), shape=(size, len(categories))
+    )
+
+    listed = (rows[:, 2] == 1) & (rows[:, 3] == 0)
+    # Rank of each product inside its category, most popular first
+    order = np.lexsort((-rows[:, 4], category_of))
+    starts = np.searchsorted(category_of[order], category_of[order])
+    rank = np.empty(len(rows), dtype=np.int64)
+    rank[order] = np.arange(len(rows)) - starts
+    count = settings.RELATED_PRODUCTS_COUNT
+    top = listed & (rank < count)
+    weights = settings.RELATED_PRODUCTS_CATEGORY_WEIGHT * (count - rank[top]) / count
+    popular = sparse.csr_matrix(
+        (weights, (category_of[top], positions[top])), shape=(len(categories), size)
+    )
+
+    published = np.zeros(size)
+    published[positions[listed]] = 1
+    return membership, popular, published
+
+
+def related_scores(index, positions, diagonal, membership, popular, published):
+    """
+        len(positions) x len(index) sparse score matrix of the products at positions
+    """
+    with np.errstate(divide="ignore"):
+        inverse_norm = np.where(diagonal > 0, 1 / np.sqrt(diagonal), 0)
+    pairs = _load_pairs(index, positions).astype(np.float64)
+    cosine = sparse.diags(inverse_norm[positions]) @ pairs @ sparse.diags(inverse_norm)
+    scores = cosine + membership[positions] @ popular
+    # Only published products are recommended
+    return (scores @ sparse.diags(published)).tocsr()
+
+
+def _top(row, count, exclude):
+    """
+        Columns and values of the count best scores of a sparse row, without column exclude
+    """
+    keep = (row.indices != exclude) & (row.data > 0)
+    columns, values = row.indices[keep], row.data[keep]
+    best = np.argsort(-values, kind="stable")[:count]
+    return columns[best], values[best]
+
+
+def store_related(index, positions, scores):
+    count = settings.RELATED_PRODUCTS_COUNT
+    product_ids = index.ids[positions].tolist()
+    related = []
+    for row, product_id in enumerate(product_ids):
+        columns, values = _top(scores.getrow(row), count, exclude=positions[row])
+        related.extend(
+            RelatedProduct(product_id=product_id, related_id=index.ids[column], rank=rank, score=value)
+            for rank, (column, value) in enumerate(zip(columns.tolist(), values.tolist()))
+        )
+    with transaction.atomic():
+        RelatedProduct.objects.filter(product_id__in=product_ids).delete()
+        RelatedProduct.objects.bulk_create(related, batch_size=5000)
+
+
+# <------------ Runs ---------------->
+
+
+def update_related_products(recompute_all=False, rebuild=False, progress=None):
+    """
+        Count the orders placed or changed since the last run and recompute the related
+        products of the products they contain and of the products that have none yet.
+        recompute_all recomputes every product, e.g. after popularity changed a lot.
+        rebuild counts every order again from scratch.
+    """
+    index = ProductIndex()
+    if rebuild:
+        with transaction.atomic():
+            ProductCoPurchase.objects.all().delete()
+            ProductCoPurchaseBasket.objects.all().delete()
+            apps.get_model("order", "Order").all_objects.update(co_purchases_counted=False)
+
+    orders, touched = count_orders(index)
+
+    if recompute_all or rebuild:
+        positions = np.arange(len(index))
+    else:
+        missing = index.positions(
+            Product.objects.filter(is_published=True, related_products__isnull=True).values_list("pk", flat=True)
+        )
+        positions = np.union1d(touched, missing).astype(np.int64)
+
+    diagonal = np.zeros(len(index))
+    own = np.array(
+        list(ProductCoPurchase.objects.filter(other_id=F("product_id")).values_list("product_id", "orders")),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    own = own[index.contains(own[:, 0])]
+    diagonal[index.positions(own[:, 0])] = own[:, 1]
+    membership, popular, published = _category_matrix(index)
+
+    for start in range(0, len(positions), PRODUCTS_CHUNK_SIZE):
+        chunk = positions[start : start + PRODUCTS_CHUNK_SIZE]
+        store_related(index, chunk, related_scores(index, chunk, diagonal, membership, popular, published))
+        if progress is not None:
+            progress(min(start + PRODUCTS_CHUNK_SIZE, len(positions)), len(positions))
+
+    RelatedProductsRun.objects.create(orders=orders, products=len(positions))
+    bump_version(RELATED)
+    return orders, len(positions)
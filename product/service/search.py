@@ -0,0 +1,53 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+
+from core.text import normalize_persian, normalized_text
+
+# Persian has no dedicated text search dictionary, "simple" only lowercases
+SEARCH_CONFIG = "simple"
+
+# Anything that is not a word character would be parsed as a tsquery operator
+TERM_SPLIT_RE = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def product_search_vector():
+    # Built from the normalized spellings, queries are normalized the same way
+    return (
+        SearchVector("search_name", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("search_specifications", weight="B", config=SEARCH_CONFIG)
+        + SearchVector(normalized_text("description"), weight="C", config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vector(queryset):
+    """
+        Recompute the stored search vector of every product in queryset with a single UPDATE
+    """
+    return queryset.update(search_vector=product_search_vector())
+
+
+def build_search_query(text):
+    """
+        Every term is matched as a prefix and all terms must match.
+        Returns None when text has no searchable term.
+    """
+    terms = [term for term in TERM_SPLIT_RE.split(normalize_persian(text)) if term]
+    if not terms:
+        return None
+    raw = " & ".join(f"{term}:*" for term in terms)
+    return SearchQuery(raw, search_type="raw", config=SEARCH_CONFIG)
+
+
+def search_products(queryset, text, vector_field="search_vector"):
+    query = build_search_query(text)
+    if query is None:
+        return queryset
+    return (
+        queryset.filter(**{vector_field: query})
+        # ts_rank returns real, cast it so the value round-trips exactly through a pagination cursor
+        .annotate(search_rank=Cast(SearchRank(F(vector_field), query), FloatField()))
+        .order_by("-search_rank", "-pk")
+    )
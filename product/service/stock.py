@@ -0,0 +1,25 @@
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from product.models import Product, ProductColor
+
+
+def total_stock_expression():
+    totals = (
+        ProductColor.objects.filter(product=OuterRef("pk"))
+        .order_by()
+        .values("product")
+        .annotate(total=Sum("stock"))
+        .values("total")
+    )
+    return Coalesce(Subquery(totals), Value(0))
+
+
+def sync_product_stock(product_ids):
+    """
+        Recompute Product.total_stock (and so is_available) from the stock of the
+        live variants, in one UPDATE that only writes the rows that changed.
+        Call it after changing ProductColor.stock with a queryset update, save() does it through signals.
+    """
+    products = Product.all_objects.filter(pk__in=set(product_ids))
+    return products.exclude(total_stock=total_stock_expression()).update(total_stock=total_stock_expression())
@@ -0,0 +1,119 @@
+"""
+    Typeahead suggestions for the search box.
+
+    Products are matched on their name, and on the name of their brand or category, with
+    pg_trgm: a word similar enough to the typed text matches, so typos and unfinished
+    words still find something. Among the most popular matches, names that start with the
+    text rank first, then the closest names, then products of a matching brand or category.
+
+    Results are kept in a per process LRU keyed on the catalog versions. Hot prefixes
+    ("گوش", "سام") cost one shared cache read and no queries until the catalog changes.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.core.files.storage import default_storage
+from django.db.models import Case, CharField, FloatField, Q, Value, When
+from django.db.models.functions import Greatest
+
+from core.text import normalize_persian
+from product.models import Brand, CategoryChildren, Product
+from product.service.cache import BRAND, CATEGORY, PRODUCT_LIST, get_versions
+
+SUGGEST_MIN_LENGTH = 2
+SUGGEST_MAX_LENGTH = 50
+# Score of a product whose brand or category matches, a prefix match of the name scores 1
+BRAND_OR_CATEGORY_SCORE = 0.5
+# Most popular matches that are ranked. Common words match a large part of the catalog,
+# this keeps the work of a request bounded whatever the number of matches.
+SUGGEST_CANDIDATES = 100
+
+
+def normalize_text(text):
+    """
+        The text as it is looked up and cached: in the canonical Persian spelling of
+        core/text.py, trimmed and single spaced
+    """
+    return " ".join(normalize_persian(text).split())[:SUGGEST_MAX_LENGTH]
+
+
+def _name_match(text, field="search_name"):
+    # A word of the name that is close to text, served by the gin_trgm_ops index of field.
+    # LIKE '%text%' is not used, texts shorter than a trigram would scan the whole index.
+    return Q(**{f"{field}__trigram_word_similar": text})
+
+
+def matching_brands_and_categories(text):
+    """
+        (brand ids, category ids) whose name matches text, in one query
+    """
+    kind = CharField()
+    brands = Brand.objects.filter(_name_match(text)).annotate(kind=Value("brand", output_field=kind))
+    categories = CategoryChildren.objects.filter(_name_match(text), is_active=True).annotate(
+        kind=Value("category", output_field=kind)
+    )
+    ids = {"brand": [], "category": []}
+    for pk, kind in brands.values_list("pk", "kind").union(categories.values_list("pk", "kind"), all=True):
+        ids[kind].append(pk)
+    return ids["brand"], ids["category"]
+
+
+def thumbnail_name(cover_image, renditions):
+    """
+        Storage name of the smallest JPEG rendition of the cover, or of the cover itself
+    """
+    names = (renditions or {}).get("sources", {}).get("jpeg")
+    if names:
+        return names[min(names, key=int)]
+    return cover_image or None
+
+
+@lru_cache(maxsize=settings.CATALOG_SUGGEST_CACHE_SIZE)
+def _suggestions(text, limit, versions):
+    # versions only makes the key, entries of older catalog versions are never hit again
+    brand_ids, category_ids = matching_brands_and_categories(text)
+    brand_or_category = Q(brand_id__in=brand_ids) | Q(category_id__in=category_ids)
+    score = Greatest(
+        TrigramWordSimilarity(text, "search_name"),
+        Case(When(search_name__startswith=text, then=Value(1.0)), default=Value(0.0)),
+        Case(When(brand_or_category, then=Value(BRAND_OR_CATEGORY_SCORE)), default=Value(0.0)),
+        output_field=FloatField(),
+    )
+    # Walks product_popularity_idx when matches are common, the trigram index when they are rare
+    candidates = (
+        Product.objects.filter(is_published=True)
+        .filter(_name_match(text) | brand_or_category)
+        .order_by("-popularity", "-pk")
+        .values("pk")[:SUGGEST_CANDIDATES]
+    )
+    rows = (
+        Product.objects.filter(pk__in=candidates, listing__is_category_active=True)
+        .annotate(score=score)
+        .order_by("-score", "-popularity", "-pk")
+        .values_list("pk", "name", "slug", "listing__cover_image", "listing__cover_renditions")[:limit]
+    )
+    suggestions = []
+    for pk, name, slug, cover_image, renditions in rows:
+        thumbnail = thumbnail_name(cover_image, renditions)
+        suggestions.append(
+            {
+                "id": pk,
+                "name": name,
+                "slug": slug,
+                "thumbnail": default_storage.url(thumbnail) if thumbnail else None,
+            }
+        )
+    return tuple(suggestions)
+
+
+def suggest_products(text, limit):
+    """
+        Up to limit {"id", "name", "slug", "thumbnail"} matching text, best first.
+        The dicts are shared by the LRU, do not modify them.
+    """
+    text = normalize_text(text)
+    if len(text) < SUGGEST_MIN_LENGTH:
+        return ()
+    versions = get_versions(PRODUCT_LIST, BRAND, CATEGORY)
+    return _suggestions(text, limit, tuple(sorted(versions.items())))
@@ -0,0 +1,256 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.renditions import renditions_updated
+from product.models import (
+    Brand,
+    Category,
+    CategoryChildren,
+    Color,
+    Gallery,
+    Product,
+    ProductColor,
+    ProductComment,
+    ProductImage,
+    ProductListing,
+)
+from product.service.cache import (
+    BRAND,
+    CATEGORY,
+    COLOR,
+    GALLERY,
+    PRODUCT_LIST,
+    PRODUCT_ROWS,
+    bump_version,
+    product_version_name,
+)
+from product.service.listing import schedule_listing_refresh
+from product.service.popularity import sync_product_ratings
+from product.service.pricing import sync_product_prices
+from product.service.search import update_search_vector
+from product.service.stock import sync_product_stock
+from user.models import User
+
+SEARCH_VECTOR_SOURCE_FIELDS = {"name", "specifications", "description"}
+PRICE_SOURCE_FIELDS = {"fixed_price", "discount_percentage"}
+COMMENT_AUTHOR_FIELDS = {"first_name", "last_name", "profile_image", "profile_image_renditions"}
+
+
+# <------------ Catalog Versions ---------------->
+# bump_version waits for the commit, so no request caches the old rows under a new version
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductColor)
+@receiver(post_delete, sender=ProductColor)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=Color)
+@receiver(post_delete, sender=Color)
+def bump_product_rows_version(sender, **kwargs):
+    bump_version(PRODUCT_LIST, PRODUCT_ROWS)
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+@receiver(post_save, sender=CategoryChildren)
+@receiver(post_delete, sender=CategoryChildren)
+def bump_product_list_version(sender, **kwargs):
+    bump_version(PRODUCT_LIST)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=CategoryChildren)
+@receiver(post_delete, sender=CategoryChildren)
+def bump_category_version(sender, **kwargs):
+    bump_version(CATEGORY)
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+def bump_brand_version(sender, **kwargs):
+    bump_version(BRAND)
+
+
+@receiver(post_save, sender=Color)
+@receiver(post_delete, sender=Color)
+def bump_color_version(sender, **kwargs):
+    bump_version(COLOR)
+
+
+@receiver(post_save, sender=Gallery)
+@receiver(post_delete, sender=Gallery)
+def bump_gallery_version(sender, **kwargs):
+    bump_version(GALLERY)
+
+
+def bump_product_versions(product_ids):
+    slugs = Product.all_objects.filter(pk__in=product_ids).values_list("slug", flat=True)
+    bump_version(*(product_version_name(slug) for slug in slugs))
+
+
+@receiver(pre_save, sender=Product)
+def remember_previous_slug(sender, instance, **kwargs):
+    instance._previous_slug = (
+        Product.all_objects.filter(pk=instance.pk).values_list("slug", flat=True).first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def bump_product_version(sender, instance, **kwargs):
+    slugs = {instance.slug, getattr(instance, "_previous_slug", None)} - {None}
+    bump_version(*(product_version_name(slug) for slug in slugs))
+
+
+@receiver(post_save, sender=ProductColor)
+@receiver(post_delete, sender=ProductColor)
+@receiver(post_save, sender=ProductComment)
+@receiver(post_delete, sender=ProductComment)
+def bump_product_version_on_related_change(sender, instance, **kwargs):
+    bump_product_versions([instance.product_id])
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def bump_product_version_on_image_change(sender, instance, **kwargs):
+    bump_product_versions(
+        ProductColor.all_objects.filter(pk=instance.product_color_id).values("product_id")
+    )
+
+
+# <------------ Search ---------------->
+
+
+@receiver(post_save, sender=Product)
+def refresh_product_search_vector(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not SEARCH_VECTOR_SOURCE_FIELDS & set(update_fields):
+        return
+    update_search_vector(Product.all_objects.filter(pk=instance.pk))
+
+
+# <------------ Prices ---------------->
+# Registered before the listing receivers, the listing is built from the stored prices
+
+
+@receiver(post_save, sender=Product)
+def sync_prices_on_product_change(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not PRICE_SOURCE_FIELDS & set(update_fields):
+        return
+    sync_product_prices([instance.pk])
+
+
+@receiver(post_save, sender=ProductColor)
+@receiver(post_delete, sender=ProductColor)
+def sync_prices_on_product_color_change(sender, instance, **kwargs):
+    sync_product_prices([instance.product_id])
+
+
+# <------------ Stock ---------------->
+# Also before the listing receivers, the listing copies the availability
+
+
+@receiver(post_save, sender=ProductColor)
+@receiver(post_delete, sender=ProductColor)
+def sync_stock_on_product_color_change(sender, instance, **kwargs):
+    sync_product_stock([instance.product_id])
+
+
+# <------------ Product Listing ---------------->
+
+
+@receiver(post_save, sender=Product)
+def refresh_listing_on_product_change(sender, instance, **kwargs):
+    schedule_listing_refresh([instance.pk])
+
+
+@receiver(post_save, sender=ProductColor)
+@receiver(post_delete, sender=ProductColor)
+def refresh_listing_on_product_color_change(sender, instance, **kwargs):
+    schedule_listing_refresh([instance.product_id])
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def refresh_listing_on_product_image_change(sender, instance, **kwargs):
+    product_ids = ProductColor.all_objects.filter(pk=instance.product_color_id).values_list("product_id", flat=True)
+    schedule_listing_refresh(product_ids)
+
+
+@receiver(post_save, sender=Color)
+def refresh_listing_on_color_change(sender, instance, **kwargs):
+    product_ids = ProductColor.objects.filter(color=instance).values_list("product_id", flat=True)
+    schedule_listing_refresh(product_ids)
+
+
+@receiver(post_save, sender=Brand)
+def refresh_listing_on_brand_change(sender, instance, **kwargs):
+    ProductListing.objects.filter(brand=instance).update(brand_name=instance.name, refreshed_at=timezone.now())
+
+
+@receiver(post_save, sender=CategoryChildren)
+def refresh_listing_on_category_change(sender, instance, **kwargs):
+    ProductListing.objects.filter(category=instance).update(
+        is_category_active=instance.is_active and not instance.is_deleted,
+        refreshed_at=timezone.now(),
+    )
+
+
+# <------------ Ratings ---------------->
+
+
+@receiver(post_save, sender=ProductComment)
+@receiver(post_delete, sender=ProductComment)
+def sync_rating_on_comment_change(sender, instance, **kwargs):
+    sync_product_ratings([instance.product_id])
+
+
+# <------------ Renditions ---------------->
+
+
+@receiver(renditions_updated, sender=ProductImage)
+def refresh_product_image_renditions(sender, pks, **kwargs):
+    product_ids = set(
+        ProductColor.all_objects.filter(images__pk__in=pks).values_list("product_id", flat=True)
+    )
+    bump_version(PRODUCT_LIST, PRODUCT_ROWS)
+    bump_product_versions(product_ids)
+    schedule_listing_refresh(product_ids)
+
+
+@receiver(renditions_updated, sender=Gallery)
+def refresh_gallery_renditions(sender, **kwargs):
+    bump_version(GALLERY)
+
+
+@receiver(renditions_updated, sender=CategoryChildren)
+def refresh_category_icon_renditions(sender, **kwargs):
+    bump_version(CATEGORY)
+
+
+@receiver(renditions_updated, sender=User)
+def refresh_profile_image_renditions(sender, pks, **kwargs):
+    bump_commented_product_versions(pks)
+
+
+# <------------ Comment Authors ---------------->
+# Names and profile images are shown with the comments of their users
+
+
+def bump_commented_product_versions(user_ids):
+    bump_product_versions(
+        set(ProductComment.all_objects.filter(created_by__in=user_ids).values_list("product_id", flat=True))
+    )
+
+
+@receiver(post_save, sender=User)
+def bump_versions_on_author_change(sender, instance, created, update_fields=None, **kwargs):
+    # A login only saves last_login
+    if created or (update_fields is not None and not COMMENT_AUTHOR_FIELDS & set(update_fields)):
+        return
+    bump_commented_product_versions([instance.pk])
@@ -1,3 +1,454 @@
-from django.test import TestCase
+import json
+from base64 import urlsafe_b64encode
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.serializers import parse_field_paths
+from product.models import (
+    Brand,
+    Category,
+    CategoryChildren,
+    Color,
+    Product,
+    ProductColor,
+    ProductComment,
+    ProductImage,
+    ProductListing,
+)
+from product.serializers import ProductListSerializer
+from product.service import menu
+from product.service.catalog_import import CatalogImporter
+from product.service.popularity import _view_key
+from product.service.cache import BRAND, PRODUCT_LIST, PRODUCT_ROWS, get_version, get_versions
+from user.models import User
+
+
+class ParseFieldPathsTests(SimpleTestCase):
+    def test_nested_paths(self):
+        self.assertEqual(
+            parse_field_paths("id, colors.price,colors.images.image,,"),
+            {"id": {}, "colors": {"price": {}, "images": {"image": {}}}},
+        )
+
+    def test_empty(self):
+        self.assertEqual(parse_field_paths(""), {})
+
+
+class DynamicFieldsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="کیف")
+        child = CategoryChildren.objects.create(category=category, name="کوله")
+        cls.brand = Brand.objects.create(name="برند")
+        color = Color.objects.create(name="مشکی", code="#000000")
+        cls.product = Product.objects.create(
+            category=child, brand=cls.brand, name="کوله پشتی", slug="backpack", fixed_price=1000
+        )
+        variant = ProductColor.objects.create(product=cls.product, color=color, stock=3)
+        # bulk_create sends no signal, there is no file to make renditions of
+        ProductImage.objects.bulk_create(
+            [ProductImage(product_color=variant, image="products/backpack.jpg", is_cover=True)]
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def serialize(self, fields=None, expand=None):
+        return ProductListSerializer(self.product, shape=(fields, expand or {})).data
+
+    def test_default_fields(self):
+        data = self.serialize()
+        self.assertEqual(list(data), ProductListSerializer.Meta.fields)
+        self.assertNotIn("brand", data)
+
+    def test_pruning(self):
+        self.assertEqual(set(self.serialize({"id": {}, "name": {}})), {"id", "name"})
+
+    def test_nested_fields(self):
+        data = self.serialize({"id": {}, "colors": {"price": {}, "color": {"code": {}}}})
+        self.assertEqual(set(data), {"id", "colors"})
+        self.assertEqual(data["colors"][0], {"color": {"code": "#000000"}, "price": 1000})
+
+    def test_expand(self):
+        self.assertEqual(self.serialize(expand={"brand": {}})["brand"], {"id": self.brand.pk, "name": "برند"})
+        self.assertEqual(set(self.serialize({"brand": {}}, {"brand": {}})), {"brand"})
+        # Requested without being expanded, an expandable field is not there
+        self.assertEqual(set(self.serialize({"id": {}, "brand": {}})), {"id"})
+
+    def test_related_lookups(self):
+        self.assertEqual(ProductListSerializer.related_lookups({"id": {}, "name": {}}), ([], []))
+        self.assertEqual(
+            ProductListSerializer.related_lookups({"colors": {"price": {}}}, {"brand": {}}), ([], ["colors"])
+        )
+        select, prefetch = ProductListSerializer.related_lookups(None, {"brand": {}})
+        self.assertEqual(select, ["brand"])
+        self.assertEqual(set(prefetch), {"colors", "colors__color", "colors__images"})
+
+    def test_unrequested_relations_are_not_queried(self):
+        # The Last-Modified query and the page
+        with self.assertNumQueries(2), CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/product/list/?fields=id,name,brand&expand=brand")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["results"],
+            [{"id": self.product.pk, "name": "کوله پشتی", "brand": {"id": self.brand.pk, "name": "برند"}}],
+        )
+        # After the Last-Modified query, which reads every table of the list
+        sql = " ".join(query["sql"] for query in queries.captured_queries[1:])
+        self.assertNotIn("product_productcolor", sql)
+        self.assertNotIn("product_productimage", sql)
+
+    def test_nested_relations_are_queried_once(self):
+        # Last-Modified, the page, then colors, their color and images once for the whole page
+        with self.assertNumQueries(5):
+            response = self.client.get("/api/product/list/?fields=id,colors.color,colors.images")
+        self.assertEqual(response.json()["results"][0]["colors"][0]["color"]["name"], "مشکی")
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = CategoryChildren.objects.create(category=Category.objects.create(name="کیف"), name="کوله")
+        self.brand = Brand.objects.create(name="برند")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product = Product.objects.create(
+                category=category, brand=self.brand, name="کوله پشتی", slug="backpack", fixed_price=1000
+            )
+
+    def test_version_moves_on_commit(self):
+        version = get_version(BRAND)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.brand.save()
+            # A request before the commit would cache the old rows under the new version
+            self.assertEqual(get_version(BRAND), version)
+        self.assertGreater(get_version(BRAND), version)
+
+    def test_uncommitted_change_keeps_version(self):
+        version = get_version(BRAND)
+        # Never committed, the callbacks are dropped with the test transaction
+        with self.captureOnCommitCallbacks():
+            self.brand.save()
+        self.assertEqual(get_version(BRAND), version)
+
+    def test_cached_response_follows_edits(self):
+        self.assertContains(self.client.get("/api/product/brands-list/"), "برند")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.brand.name = "برند تازه"
+            self.brand.save()
+        self.assertContains(self.client.get("/api/product/brands-list/"), "برند تازه")
+
+    def test_expanded_brand_follows_renames(self):
+        url = "/api/product/list/?fields=id,brand&expand=brand"
+        etag = self.client.get(url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.brand.name = "برند تازه"
+            self.brand.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, "برند تازه")
+
+    def test_hard_delete_changes_etag(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            old = Product.objects.create(
+                category=self.product.category, name="کوله قدیمی", slug="old-backpack", fixed_price=1000
+            )
+            # Newer than the deleted row, Last-Modified does not move
+            self.product.save()
+        urls = ("/api/product/list/", "/api/product/list/compact/")
+        etags = {url: self.client.get(url)["ETag"] for url in urls}
+        for url, etag in etags.items():
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            # The admin's delete action
+            Product.objects.filter(pk=old.pk).delete()
+        for url, etag in etags.items():
+            with self.subTest(url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotContains(response, "کوله قدیمی")
+
+    def test_compact_list_follows_listing_refresh(self):
+        self.assertContains(self.client.get("/api/product/list/compact/"), "کوله پشتی")
+        version = get_version(PRODUCT_LIST)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = "کوله سفری"
+            self.product.save()
+        self.assertGreater(get_version(PRODUCT_LIST), version)
+        self.assertContains(self.client.get("/api/product/list/compact/"), "کوله سفری")
+
+
+def forged_cursor(values, pk=1, reverse=False):
+    token = {"p": pk, "r": int(reverse), "v": values}
+    return urlsafe_b64encode(json.dumps(token).encode()).decode()
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = CategoryChildren.objects.create(category=Category.objects.create(name="کیف"), name="کوله")
+        cls.products = [
+            Product.objects.create(
+                category=category, name=f"کوله {index}", slug=f"backpack-{index}", fixed_price=1000 * (index % 3)
+            )
+            for index in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, url, link="next"):
+        """
+            Slugs of each page from url on, following link, and the last page
+        """
+        pages = []
+        while url:
+            data = self.client.get(url).json()
+            pages.append([product["slug"] for product in data["results"]])
+            url = data["links"][link]
+        return pages, data
+
+    def test_walks_every_product_once(self):
+        # Equal prices, the pk breaks the ties
+        expected = [
+            product.slug for product in sorted(self.products, key=lambda product: (product.fixed_price, product.pk))
+        ]
+        pages, last = self.walk("/api/product/list/?ordering=fixed_price&page_size=2")
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(sum(pages, []), expected)
+
+        pages, _ = self.walk(last["links"]["previous"], link="previous")
+        self.assertEqual(sum(reversed(pages), []), expected[:4])
+
+    def test_new_products_do_not_shift_the_pages(self):
+        first = self.client.get("/api/product/list/?page_size=2").json()
+        Product.objects.create(
+            category=self.products[0].category, name="کوله تازه", slug="new-backpack", fixed_price=1000
+        )
+        pages, _ = self.walk(first["links"]["next"])
+        seen = [product["slug"] for product in first["results"]] + sum(pages, [])
+        self.assertEqual(seen, [f"backpack-{index}" for index in reversed(range(5))])
+
+    def test_legacy_pages(self):
+        data = self.client.get("/api/product/list/?page=3&page_size=2&ordering=created_at").json()
+        self.assertEqual((data["count"], data["total_pages"]), (5, 3))
+        self.assertEqual([product["slug"] for product in data["results"]], ["backpack-4"])
+
+    def test_forged_cursor_values_are_not_found(self):
+        cases = {
+            "generated field": "ordering=is_available",
+            "annotation": "search=کوله",
+            "plain field": "ordering=fixed_price",
+        }
+        for name, query in cases.items():
+            with self.subTest(name):
+                response = self.client.get(f"/api/product/list/?{query}&cursor={forged_cursor(['not-a-value'])}")
+                self.assertEqual(response.status_code, 404)
+                response = self.client.get(f"/api/product/list/?{query}&cursor={forged_cursor([None])}")
+                self.assertEqual(response.status_code, 404)
+
+
+class ProductDetailCacheTests(TestCase):
+    url = "/api/product/detail/backpack/"
+
+    def setUp(self):
+        cache.clear()
+        self.category = CategoryChildren.objects.create(category=Category.objects.create(name="کیف"), name="کوله")
+        self.brand = Brand.objects.create(name="برند")
+        self.author = User.objects.create(username="author", phone_number="09120000000", first_name="علی")
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(
+                category=self.category, brand=self.brand, name="کوله پشتی", slug="backpack", fixed_price=1000
+            )
+            ProductComment.objects.create(product=product, text="خوب", created_by=self.author)
+
+    def assertChangedAfter(self, change, text):
+        etag = self.client.get(self.url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertContains(self.client.get(self.url), text)
+
+    def test_views_are_recorded_for_existing_products(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.client.get(self.url)
+        self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(self.client.get("/api/product/detail/unknown/").status_code, 404)
+        self.assertEqual(cache.get(_view_key("backpack")), 3)
+        self.assertIsNone(cache.get(_view_key("unknown")))
+
+    def test_comment_author_change(self):
+        def rename():
+            self.author.first_name = "رضا"
+            self.author.save()
+
+        self.assertContains(self.client.get(self.url), "علی")
+        self.assertChangedAfter(rename, "رضا")
+
+    def test_category_change(self):
+        self.url += "?expand=category"
+
+        def rename():
+            self.category.name = "چمدان"
+            self.category.save()
+
+        self.assertContains(self.client.get(self.url), "کوله")
+        self.assertChangedAfter(rename, "چمدان")
+
+
+class CategoryMenuTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="کیف")
+        cls.child = CategoryChildren.objects.create(category=cls.category, name="کوله", show_in_menu=True)
+        # A queryset update, there is no file to make renditions of
+        CategoryChildren.objects.filter(pk=cls.child.pk).update(
+            icon="icons/backpack.png",
+            icon_renditions={"width": 64, "height": 64, "sources": {"webp": {"64": "icons/backpack-64.webp"}}},
+        )
+
+    def setUp(self):
+        cache.clear()
+        menu._menu = None
+
+    def test_icon_urls_are_absolute(self):
+        for url in ("/api/product/categories-list/", "/api/product/home/"):
+            with self.subTest(url):
+                data = self.client.get(url, HTTP_HOST="shop.example.com").json()
+                children = (data["categories"] if "categories" in data else data)[0]["children"]
+                self.assertEqual(children[0]["icon"], "http://shop.example.com/media/icons/backpack.png")
+                self.assertEqual(
+                    children[0]["icon_renditions"]["sources"]["webp"]["64"],
+                    "http://shop.example.com/media/icons/backpack-64.webp",
+                )
+
+    def menu_name(self):
+        return self.client.get("/api/product/categories-list/").json()[0]["name"]
+
+    def test_menu_is_kept_while_the_version_stands(self):
+        self.assertEqual(self.menu_name(), "کیف")
+        # A queryset update bumps no version
+        Category.objects.filter(pk=self.category.pk).update(name="چمدان")
+        self.assertEqual(self.menu_name(), "کیف")
+
+    @override_settings(CATALOG_MENU_TIMEOUT=0)
+    def test_menu_is_reloaded_after_timeout(self):
+        self.assertEqual(self.menu_name(), "کیف")
+        Category.objects.filter(pk=self.category.pk).update(name="چمدان")
+        self.assertEqual(self.menu_name(), "چمدان")
+
+
+class CatalogImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = CategoryChildren.objects.create(category=Category.objects.create(name="کیف"), name="کوله")
+        cls.black = Color.objects.create(name="مشکی", code="#000000")
+        Color.objects.create(name="سفید", code="#ffffff")
+
+    def setUp(self):
+        cache.clear()
+
+    def row(self, **values):
+        return {"category": "کوله", "name": "کوله پشتی", "fixed_price": "1000", "color": "مشکی", "stock": "2", **values}
+
+    def run_import(self, rows, **options):
+        importer = CatalogImporter(**options)
+        with self.captureOnCommitCallbacks(execute=True):
+            for _stats in importer.import_rows(rows, batch_size=2):
+                pass
+        return importer
+
+    def test_upserts_products_and_variants(self):
+        self.run_import([self.row(), self.row(color="#FFFFFF", base_price="1200")])
+        importer = self.run_import([self.row(fixed_price="900", stock="5")])
+
+        self.assertEqual(importer.stats["products_updated"], 1)
+        product = Product.objects.get()
+        self.assertEqual((product.fixed_price, product.slug), (900, "کوله-پشتی"))
+        self.assertEqual(
+            dict(product.colors.values_list("color__code", "stock")), {"#000000": 5, "#ffffff": 2}
+        )
+        listing = ProductListing.objects.get()
+        self.assertEqual((listing.fixed_price, listing.total_stock), (900, 7))
+
+    def test_row_errors(self):
+        importer = self.run_import(
+            [
+                self.row(category="ناموجود"),
+                self.row(brand="ب" * 100),
+                self.row(color="بنفش"),
+                self.row(fixed_price="رایگان"),
+                self.row(name="کوله سالم"),
+            ],
+            create_brands=True,
+        )
+        self.assertEqual([line for line, _ in importer.errors], [1, 2, 3, 4])
+        self.assertEqual(list(Product.objects.values_list("name", flat=True)), ["کوله سالم"])
+        self.assertFalse(Brand.objects.exists())
+
+    def test_versions_move_after_the_commit(self):
+        versions = get_versions(PRODUCT_LIST, PRODUCT_ROWS)
+        importer = CatalogImporter()
+        with self.captureOnCommitCallbacks() as callbacks:
+            list(importer.import_rows([self.row()]))
+            self.assertEqual(get_versions(PRODUCT_LIST, PRODUCT_ROWS), versions)
+            self.assertFalse(ProductListing.objects.exists())
+        for callback in callbacks:
+            callback()
+        moved = get_versions(PRODUCT_LIST, PRODUCT_ROWS)
+        self.assertTrue(all(moved[name] > versions[name] for name in versions))
+        self.assertTrue(ProductListing.objects.exists())
+
+    def test_dry_run(self):
+        versions = get_versions(PRODUCT_LIST, PRODUCT_ROWS)
+        importer = self.run_import([self.row(brand="برند")], create_brands=True, dry_run=True)
+        self.assertEqual(importer.stats["products_created"], 1)
+        self.assertFalse(Product.all_objects.exists())
+        self.assertFalse(Brand.objects.exists())
+        self.assertEqual(get_versions(PRODUCT_LIST, PRODUCT_ROWS), versions)
+
+
+class SuggestTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Arabic kaf and yeh, as categories entered before normalization are stored
+        category = CategoryChildren.objects.create(category=Category.objects.create(name="کیف"), name="كيف دستي")
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(category=category, name="محصول الف", slug="product-a", fixed_price=1000)
+
+    def test_category_with_arabic_letters(self):
+        response = self.client.get("/api/product/suggest/", {"q": "کیف"})
+        self.assertEqual([suggestion["slug"] for suggestion in response.json()], ["product-a"])
+
+
+class HomeTests(TestCase):
+    url = "/api/product/home/"
+
+    @classmethod
+    def setUpTestData(cls):
+        category = CategoryChildren.objects.create(category=Category.objects.create(name="کیف"), name="کوله")
+        cls.brand = Brand.objects.create(name="برند")
+        for index in range(10):
+            Product.objects.create(category=category, name=f"کوله {index}", slug=f"backpack-{index}", fixed_price=1000)
+
+    def setUp(self):
+        cache.clear()
+        menu._menu = None
+
+    def test_products_are_the_first_page_of_the_list(self):
+        products = self.client.get(self.url).json()["products"]
+        self.assertEqual(products, self.client.get("/api/product/list/").json())
+        self.assertEqual(len(products["results"]), 9)
+        following = self.client.get(products["links"]["next"]).json()
+        self.assertEqual([product["slug"] for product in following["results"]], ["backpack-0"])
+
+    def test_brand_change_rebuilds_the_brands_only(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.brand.name = "برند تازه"
+            self.brand.save()
+        # Only the brands are queried again, the other fragments come from the cache
+        with self.assertNumQueries(1):
+            page = self.client.get(self.url).json()
+        self.assertEqual(page["brands"], [{"id": self.brand.pk, "name": "برند تازه"}])
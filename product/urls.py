@@ -1,5 +1,5 @@
 from django.urls import path, re_path
-from .views import BrandListView, CategoryListView, ColorListView, GalleryView, ProductsByCategoryView, ProductDetailView, ProductsListView
+from .views import BrandListView, CategoryListView, ColorListView, GalleryView, HomeView, ProductFacetsByCategoryView, ProductFacetsView, ProductListingByCategoryView, ProductListingView, ProductCommentsView, ProductsByCategoryView, ProductDetailView, ProductFeedView, ProductRelatedView, ProductSuggestView, ProductsListView
 
 urlpatterns = [
     # ------------------- Home/Index -------------------
@@ -7,9 +7,18 @@ urlpatterns = [
     path('colors-list/',ColorListView.as_view(),name = "color-list"),
     path('categories-list/',CategoryListView.as_view(),name = "categories-list"),
     path('categories/<int:id>/products/',ProductsByCategoryView.as_view(),name = "category-products-list"),
+    path('categories/<int:id>/products/compact/',ProductListingByCategoryView.as_view(),name = "category-products-compact-list"),
+    path('categories/<int:id>/products/facets/',ProductFacetsByCategoryView.as_view(),name = "category-products-facets"),
     path('list/',ProductsListView.as_view(),name = "products-list"),
-    path('gallery/',GalleryView.as_view(),name = "products-list"),
+    path('list/facets/',ProductFacetsView.as_view(),name = "products-facets"),
+    path('list/compact/',ProductListingView.as_view(),name = "products-compact-list"),
+    path('gallery/',GalleryView.as_view(),name = "gallery"),
+    path('home/',HomeView.as_view(),name = "home"),
+    path('feed/<str:feed_format>/',ProductFeedView.as_view(),name = "products-feed"),
+    path('suggest/',ProductSuggestView.as_view(),name = "products-suggest"),
     
     # ------------------- Detail -------------------
     re_path(r'^detail/(?P<slug>[^/]+)/$',ProductDetailView.as_view(),name = "product-detail"),
+    re_path(r'^detail/(?P<slug>[^/]+)/comments/$',ProductCommentsView.as_view(),name = "product-comments"),
+    re_path(r'^detail/(?P<slug>[^/]+)/related/$',ProductRelatedView.as_view(),name = "product-related"),
 ]
@@ -0,0 +1,78 @@
+import re
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+from django.utils.text import slugify
+
+SUFFIX_RE = re.compile(r"^(?P<base>.+)-(?P<suffix>[0-9]+)$")
+# Distinct base slugs matched by one query, keeps the regex a reasonable size
+ALLOCATE_CHUNK_SIZE = 500
+
+
+def slug_base(name, fallback="product"):
+    return slugify(name, allow_unicode=True) or fallback
+
+
+def _taken_suffixes(queryset, bases, field):
+    """
+        {base: {suffix, ...}} of the slugs in queryset that are a base or base-<number>.
+        The base itself is suffix 0.
+    """
+    taken = {base: set() for base in bases}
+    bases = list(taken)
+    for start in range(0, len(bases), ALLOCATE_CHUNK_SIZE):
+        chunk = bases[start : start + ALLOCATE_CHUNK_SIZE]
+        pattern = "^(%s)(-[0-9]+)?$" % "|".join(re.escape(base) for base in chunk)
+        # The prefix lookups use the varchar_pattern_ops index Django creates on PostgreSQL for a unique
+        # SlugField, the regex drops the other matches
+        prefixes = reduce(or_, (Q(**{f"{field}__startswith": base}) for base in chunk))
+        matches = queryset.filter(prefixes, **{f"{field}__regex": pattern})
+        for slug in matches.values_list(field, flat=True):
+            _mark_taken(taken, slug)
+    return taken
+
+
+def _mark_taken(taken, slug):
+    # "a-1" can be the base "a-1" itself and suffix 1 of the base "a"
+    if slug in taken:
+        taken[slug].add(0)
+    match = SUFFIX_RE.match(slug)
+    if match and match["base"] in taken:
+        taken[match["base"]].add(int(match["suffix"]))
+
+
+def allocate_slugs(queryset, names, field="slug"):
+    """
+        A unique slug for each of names, in order, with one query per ALLOCATE_CHUNK_SIZE
+        distinct names. Taken slugs get the suffix after the highest one in use,
+        e.g. "kif-3" when "kif" and "kif-2" exist. Names of the same batch never collide.
+
+        queryset must include soft deleted rows, they still hold their slug.
+    """
+    bases = [slug_base(name) for name in names]
+    taken = _taken_suffixes(queryset, set(bases), field)
+
+    slugs = []
+    for base in bases:
+        suffixes = taken[base]
+        slug = f"{base}-{max(suffixes) + 1}" if suffixes else base
+        # Also taken for the other names of the batch, "a-1" of "a" is the base of "a 1"
+        _mark_taken(taken, slug)
+        slugs.append(slug)
+    return slugs
+
+
+def assign_slugs(instances, field="slug", source="name"):
+    """
+        Fill the empty slugs of unsaved instances in one go, e.g. before bulk_create
+    """
+    missing = [instance for instance in instances if not getattr(instance, field)]
+    if not missing:
+        return instances
+
+    model = type(missing[0])
+    names = [getattr(instance, source) for instance in missing]
+    for instance, slug in zip(missing, allocate_slugs(model._base_manager.all(), names, field)):
+        setattr(instance, field, slug)
+    return instances
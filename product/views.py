@@ -1,19 +1,52 @@
 from rest_framework import generics, filters
+from rest_framework.negotiation import BaseContentNegotiation
 from rest_framework.permissions import AllowAny
-from product.models import Brand, Category, CategoryChildren, Color, Gallery, Product
-from django.db.models import Prefetch
-from product.pagination import SearchPagination
+from rest_framework.response import Response
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django_filters import utils as filter_utils
+from product.models import Brand, CategoryChildren, Color, Gallery, Product, ProductColor, ProductImage, ProductListing
+from django.shortcuts import get_object_or_404
+from core.middleware import accepted_encodings
+from core.serializers import SparseFieldsetsFilter
+from product.mixins import CatalogCacheMixin, ConditionalGetMixin
+from product.pagination import CatalogPagination, KeysetPagination
+from product.service.cache import (
+    BRAND,
+    CATEGORY,
+    COLOR,
+    GALLERY,
+    PRODUCT_LIST,
+    PRODUCT_ROWS,
+    RELATED,
+    get_version,
+    normalized_query_key,
+    product_version_name,
+)
+from product.service.comments import attach_comment_threads, root_comments
+from product.service.conditional import listing_last_modified, product_last_modified
+from product.service.feed import FEED_FORMATS, render_feed
+from product.service.home import home_page
+from product.service.popularity import record_product_view
+from product.service.suggest import suggest_products
+from product.service.facets import brand_facet, color_facet, price_facet
+from product.service.menu import category_menu, menu_queryset
 from product.serializers import (
     BrandSerializer,
     CategoryListSerializer,
+    CommentSerializer,
     ColorSerializer,
     GallerySerializer,
     ProductDetailSerializer,
     ProductListSerializer,
+    ProductListingSerializer,
+    ProductSuggestionSerializer,
 )
 from drf_spectacular.utils import OpenApiParameter, OpenApiTypes, extend_schema
 from django_filters.rest_framework import DjangoFilterBackend
-from .filters import ProductFilter
+from .filters import CatalogOrderingFilter, ProductFilter, ProductListingFilter, ProductSearchFilter
 
 
 @extend_schema(
@@ -24,19 +57,29 @@ from .filters import ProductFilter
     """,
     tags=["Home"],
 )
-class CategoryListView(generics.ListAPIView):
+class CategoryListView(ConditionalGetMixin, generics.ListAPIView):
+    """
+        Served from the menu cached in this process, see product.service.menu
+    """
     permission_classes = [AllowAny]
     serializer_class = CategoryListSerializer
 
+    def get_menu(self):
+        if not hasattr(self, "_menu"):
+            self._menu = category_menu(self.request)
+        return self._menu
+
     def get_queryset(self):
-        children_qs = CategoryChildren.objects.filter(
-            is_active=True,show_in_menu = True,is_deleted=False
-        ).order_by("order", "created_at")
-        return (
-            Category.objects.filter(is_active=True, is_deleted=False)
-            .prefetch_related(Prefetch("children", queryset=children_qs))
-            .order_by("order", "created_at")
-        )
+        return menu_queryset()
+
+    def get_last_modified(self):
+        return self.get_menu()[1]
+
+    def get_etag_entities(self):
+        return (CATEGORY,)
+
+    def list(self, request, *args, **kwargs):
+        return Response(self.get_menu()[0])
 
 
 @extend_schema(
@@ -44,38 +87,58 @@ class CategoryListView(generics.ListAPIView):
     description="""
         Returns paginated list of published products.
 
+        Pagination is cursor based (`cursor`, `page_size`) and does not return a count.
+        Send `legacy=true` or `page` to get the page-number response with `count` and `total_pages`.
+
         Supports:
-        - search (name, description, specifications)
-        - ordering (fixed_price, created_at)
-        - filters (price range, brand, color)
+        - search (name, description, specifications), ranked by relevance
+        - ordering (fixed_price, min_discounted_price, created_at, is_available),
+          e.g. `ordering=-is_available,-created_at` lists products in stock first
+        - named orderings, highest first: `popularity` (recent views and sales),
+          `rating` (average comment rating) and `best_selling`
+        - filters (price range on the selling price, brand, color; `color_match=all` keeps products with every color)
+        - in_stock=true hides products without stock
+        - `fields=id,name,colors.price` returns only these fields and `expand=brand` adds the brand;
+          relations that are not returned are not queried
     """,
     tags=["Home"],
 )
-class ProductsListView(generics.ListAPIView):
+class ProductsListView(ConditionalGetMixin, CatalogCacheMixin, generics.ListAPIView):
     permission_classes = [AllowAny]
+    cache_entities = (PRODUCT_LIST,)
+    # Brand for ?expand=brand
+    last_modified_models = (Product, ProductColor, ProductImage, Color, CategoryChildren, Brand)
     serializer_class = ProductListSerializer
-    pagination_class = SearchPagination
-    queryset = Product.objects.filter(is_published=True, is_deleted=False).prefetch_related("colors__images","colors__color").distinct()
+    pagination_class = CatalogPagination
+    # Relations are loaded by SparseFieldsetsFilter, following ?fields= and ?expand=
+    queryset = Product.objects.filter(is_published=True, is_deleted=False)
 
     filterset_class = ProductFilter
 
     filter_backends = [
         DjangoFilterBackend,
-        filters.OrderingFilter,
-        filters.SearchFilter,
-    ]
-    search_fields = [
-        "name",
-        "description",
-        "specifications",
+        ProductSearchFilter,
+        CatalogOrderingFilter,
+        SparseFieldsetsFilter,
     ]
 
     ordering_fields = [
         "fixed_price",
+        "min_discounted_price",
         "created_at",
+        "is_available",
+        "popularity",
+        "rating",
+        "rating_count",
+        "sales_count",
         # "is_favorite",#TODO
-        # "rating",#TODO
     ]
+    # Served by the partial indexes of Product
+    ordering_aliases = {
+        "popularity": ["-popularity"],
+        "rating": ["-rating", "-rating_count"],
+        "best_selling": ["-sales_count"],
+    }
 
 
 @extend_schema(
@@ -88,7 +151,7 @@ class ProductsListView(generics.ListAPIView):
         Supports:
         - search
         - ordering
-        - filters (price, brand, color)
+        - filters (price, brand, color, color_match, in_stock)
     """,
     parameters=[
         OpenApiParameter(
@@ -102,6 +165,103 @@ class ProductsListView(generics.ListAPIView):
     tags=["Product"],
 )
 class ProductsByCategoryView(ProductsListView):
+    def get_queryset(self):
+        return super().get_queryset().filter(
+            category__id=self.kwargs["id"],
+            category__is_active=True,
+            category__is_deleted=False,
+        )
+
+
+@extend_schema(
+    summary="Product Facets",
+    description="""
+        Returns brand counts, color counts and a price histogram for the current filter state,
+        for building the filter sidebar in one request.
+
+        Accepts the same search and filter params as the products list.
+        Each facet ignores its own filter, so selecting a brand still shows the counts of the other brands.
+    """,
+    responses={
+        200: {
+            "type": "object",
+            "properties": {
+                "brands": {"type": "array", "items": {"type": "object"}},
+                "colors": {"type": "array", "items": {"type": "object"}},
+                "price": {"type": "object"},
+            },
+        }
+    },
+    tags=["Home"],
+)
+class ProductFacetsView(generics.GenericAPIView):
+    permission_classes = [AllowAny]
+    pagination_class = None
+    queryset = Product.objects.filter(is_published=True, is_deleted=False)
+    filterset_class = ProductFilter
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter]
+
+    # Params ignored by each facet, a facet never narrows itself
+    facet_params = {
+        "brands": ("brand",),
+        "colors": ("color", "color_match"),
+        "price": ("min_price", "max_price"),
+    }
+    # Params that do not change the facet counts
+    cache_key_exclude = ("page", "page_size", "ordering", "cursor", "legacy", "fields", "expand")
+
+    def get(self, request, *args, **kwargs):
+        query_key = normalized_query_key(request.query_params, exclude=self.cache_key_exclude)
+        cache_key = f"catalog:facets:{get_version(PRODUCT_LIST)}:{request.path}:{query_key}"
+
+        facets = cache.get(cache_key)
+        if facets is None:
+            facets = self.get_facets()
+            cache.set(cache_key, facets, settings.CATALOG_FACET_CACHE_TIMEOUT)
+        return Response(facets)
+
+    def get_facets(self):
+        price_field = self.filterset_class.base_filters["min_price"].field_name
+        return {
+            "brands": brand_facet(self.get_facet_queryset("brands")),
+            "colors": color_facet(self.get_facet_queryset("colors")),
+            "price": price_facet(
+                self.get_facet_queryset("price"), price_field, settings.CATALOG_FACET_PRICE_BUCKETS
+            ),
+        }
+
+    def get_facet_queryset(self, facet):
+        queryset = ProductSearchFilter().filter_queryset(self.request, self.get_queryset(), self)
+
+        data = self.request.query_params.copy()
+        for param in self.facet_params[facet]:
+            data.pop(param, None)
+
+        filterset = self.filterset_class(data, queryset=queryset, request=self.request)
+        if not filterset.is_valid():
+            raise filter_utils.translate_validation(filterset.errors)
+        return filterset.qs
+
+
+@extend_schema(
+    summary="Product Facets By Category (Children)",
+    description="""
+        Facet counts of the products of a specific **category child**.
+
+        The `id` in the URL must be the **CategoryChildren ID** (not parent category).
+    """,
+    parameters=[
+        OpenApiParameter(
+            name="id",
+            type=OpenApiTypes.INT,
+            location=OpenApiParameter.PATH,
+            description="CategoryChildren ID",
+            required=True,
+        ),
+    ],
+    tags=["Product"],
+)
+class ProductFacetsByCategoryView(ProductFacetsView):
     def get_queryset(self):
         return Product.objects.filter(
             category__id=self.kwargs["id"],
@@ -109,26 +269,198 @@ class ProductsByCategoryView(ProductsListView):
             is_deleted=False,
             category__is_active=True,
             category__is_deleted=False,
-        ).prefetch_related("colors", "colors__images")
+        )
+
+
+@extend_schema(
+    summary="List Products (Compact)",
+    description="""
+        Returns paginated list of published products from the denormalized listing table.
+        Each product comes with precomputed price range, cover image, colors and total stock,
+        so a page is served with a single indexed query.
+
+        Supports the same search, ordering and filters as the products list.
+    """,
+    tags=["Home"],
+)
+class ProductListingView(ConditionalGetMixin, CatalogCacheMixin, generics.ListAPIView):
+    permission_classes = [AllowAny]
+    cache_entities = (PRODUCT_LIST,)
+    serializer_class = ProductListingSerializer
+    pagination_class = CatalogPagination
+    queryset = ProductListing.objects.order_by("-created_at")
+
+    filterset_class = ProductListingFilter
+    search_vector_field = "product__search_vector"
+
+    filter_backends = [
+        DjangoFilterBackend,
+        ProductSearchFilter,
+        filters.OrderingFilter,
+    ]
+
+    ordering_fields = [
+        "fixed_price",
+        "min_discounted_price",
+        "created_at",
+        "is_available",
+    ]
+
+    def get_last_modified(self):
+        return listing_last_modified()
+
+
+@extend_schema(
+    summary="List Products By Category (Compact)",
+    description="""
+        Compact listing of the products of a specific **category child**.
+
+        The `id` in the URL must be the **CategoryChildren ID** (not parent category).
+    """,
+    parameters=[
+        OpenApiParameter(
+            name="id",
+            type=OpenApiTypes.INT,
+            location=OpenApiParameter.PATH,
+            description="CategoryChildren ID",
+            required=True,
+        ),
+    ],
+    tags=["Product"],
+)
+class ProductListingByCategoryView(ProductListingView):
+    def get_queryset(self):
+        return ProductListing.objects.filter(
+            category_id=self.kwargs["id"], is_category_active=True
+        ).order_by("-created_at")
 
 
 @extend_schema(
     summary="Retrieve Product",
     description="""
         Returns full details of a single published product.
-        Includes brand, colors, images and comments.
+        Includes brand, colors, images and the latest comment threads.
+        The rest of the comments are served by the product comments endpoint.
+
+        `fields=id,name,colors.price` returns only these fields (the comments are skipped
+        when not listed) and `expand=category` adds the category.
     """,
+    parameters=[
+        OpenApiParameter(name="fields", type=OpenApiTypes.STR),
+        OpenApiParameter(name="expand", type=OpenApiTypes.STR),
+    ],
     tags=["Product"],
 )
-class ProductDetailView(generics.RetrieveAPIView):
+class ProductDetailView(ConditionalGetMixin, CatalogCacheMixin, generics.RetrieveAPIView):
     permission_classes = [AllowAny]
     serializer_class = ProductDetailSerializer
     lookup_field = "slug"
-    queryset = (
-        Product.objects.filter(is_published=True, is_deleted=False)
-        .prefetch_related("colors", "colors__images", "comments")
-        .select_related("brand")
-    )
+    queryset = Product.objects.filter(is_published=True, is_deleted=False)
+    filter_backends = [SparseFieldsetsFilter]
+
+    def get(self, request, *args, **kwargs):
+        response = super().get(request, *args, **kwargs)
+        # Also when the response cache or the conditional GET answered, unknown slugs raised 404
+        if response.status_code in (200, 304):
+            record_product_view(self.kwargs["slug"])
+        return response
+
+    def get_cache_entities(self):
+        # CATEGORY for ?expand=category
+        return (BRAND, CATEGORY, COLOR, product_version_name(self.kwargs["slug"]))
+
+    def get_last_modified(self):
+        return product_last_modified(self.queryset.filter(slug=self.kwargs["slug"]))
+
+
+@extend_schema(
+    summary="Search Suggestions",
+    description="""
+        Typeahead for the search box: id, name, slug and a thumbnail of the best
+        matching products for `q` (at least 2 characters).
+
+        Matches product names and the names of brands and categories, tolerating typos
+        and unfinished words. Returns `limit` suggestions, 8 by default and 20 at most.
+    """,
+    parameters=[
+        OpenApiParameter(name="q", type=OpenApiTypes.STR, required=True),
+        OpenApiParameter(name="limit", type=OpenApiTypes.INT),
+    ],
+    tags=["Product"],
+)
+class ProductSuggestView(generics.ListAPIView):
+    permission_classes = [AllowAny]
+    serializer_class = ProductSuggestionSerializer
+    pagination_class = None
+    queryset = Product.objects.none()
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.query_params.get("limit", settings.CATALOG_SUGGEST_LIMIT))
+        except ValueError:
+            limit = settings.CATALOG_SUGGEST_LIMIT
+        return min(max(limit, 1), settings.CATALOG_SUGGEST_MAX_LIMIT)
+
+    def list(self, request, *args, **kwargs):
+        suggestions = suggest_products(request.query_params.get("q", ""), self.get_limit())
+        return Response(self.get_serializer(suggestions, many=True).data)
+
+
+@extend_schema(
+    summary="Related Products",
+    description="""
+        Products often bought together with this one, completed with popular products
+        of the same category. Precomputed offline, best match first.
+    """,
+    tags=["Product"],
+)
+class ProductRelatedView(CatalogCacheMixin, generics.ListAPIView):
+    permission_classes = [AllowAny]
+    cache_entities = (PRODUCT_LIST, RELATED)
+    serializer_class = ProductListingSerializer
+    pagination_class = None
+
+    def get_queryset(self):
+        return ProductListing.objects.filter(
+            product__recommended_in__product__slug=self.kwargs["slug"], is_category_active=True
+        ).order_by("product__recommended_in__rank")
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        # Only an empty answer costs the existence check, unknown products are 404 as in the detail
+        if not response.data and not Product.objects.filter(
+            slug=self.kwargs["slug"], is_published=True, is_deleted=False
+        ).exists():
+            raise Http404
+        return response
+
+
+@extend_schema(
+    summary="List Product Comments",
+    description="""
+        Returns the comment threads of a published product, newest thread first.
+        Each thread comes with all of its replies.
+
+        Pagination is cursor based (`cursor`, `page_size`).
+    """,
+    tags=["Product"],
+)
+class ProductCommentsView(CatalogCacheMixin, generics.ListAPIView):
+    permission_classes = [AllowAny]
+    serializer_class = CommentSerializer
+    pagination_class = KeysetPagination
+
+    def get_cache_entities(self):
+        return (product_version_name(self.kwargs["slug"]),)
+
+    def get_queryset(self):
+        product = get_object_or_404(
+            Product.objects.filter(is_published=True).only("id"), slug=self.kwargs["slug"]
+        )
+        return root_comments(product)
+
+    def paginate_queryset(self, queryset):
+        return attach_comment_threads(super().paginate_queryset(queryset))
 
 
 @extend_schema(
@@ -139,8 +471,10 @@ class ProductDetailView(generics.RetrieveAPIView):
     """,
     tags=["Product"],
 )
-class BrandListView(generics.ListAPIView):
+class BrandListView(ConditionalGetMixin, CatalogCacheMixin, generics.ListAPIView):
     permission_classes = [AllowAny]
+    cache_entities = (BRAND,)
+    last_modified_models = (Brand,)
     serializer_class = BrandSerializer
     queryset = Brand.objects.filter(is_deleted = False).only('id','name')
 
@@ -153,8 +487,10 @@ class BrandListView(generics.ListAPIView):
     """,
     tags=["Product"],
 )
-class ColorListView(generics.ListAPIView):
+class ColorListView(ConditionalGetMixin, CatalogCacheMixin, generics.ListAPIView):
     permission_classes = [AllowAny]
+    cache_entities = (COLOR,)
+    last_modified_models = (Color,)
     serializer_class = ColorSerializer
     queryset = Color.objects.filter(is_deleted = False).only('id','name','code')
 
@@ -167,7 +503,97 @@ class ColorListView(generics.ListAPIView):
     tags=["Home"],
 )
 
-class GalleryView(generics.ListAPIView):
+class GalleryView(ConditionalGetMixin, CatalogCacheMixin, generics.ListAPIView):
     permission_classes = [AllowAny]
+    cache_entities = (GALLERY,)
+    last_modified_models = (Gallery,)
     serializer_class = GallerySerializer
-    queryset = Gallery.objects.filter(is_published = True,is_deleted = False).only('id','image','order')
\ No newline at end of file
+    queryset = Gallery.objects.filter(is_published = True,is_deleted = False).only('id','image','renditions','order')
+
+
+@extend_schema(
+    summary="Home Page",
+    description="""
+        Everything the home page shows in one request: `categories`, `brands`, `colors`
+        and `gallery` as their own endpoints return them, and `products`, the first page
+        of the products list. Its `links.next` continues on the products list.
+
+        Each part is cached separately and rebuilt only when its own data changes.
+    """,
+    responses=OpenApiTypes.OBJECT,
+    tags=["Home"],
+)
+class HomeView(CatalogCacheMixin, generics.RetrieveAPIView):
+    permission_classes = [AllowAny]
+    # The response as a whole, a miss is assembled from the fragments of product.service.home
+    cache_entities = (CATEGORY, BRAND, COLOR, GALLERY, PRODUCT_ROWS)
+    queryset = Product.objects.none()
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(home_page(request))
+
+class IgnoreClientContentNegotiation(BaseContentNegotiation):
+    """
+        Feed readers send all kinds of Accept headers, the format is part of the URL
+    """
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+@extend_schema(
+    summary="Product Feed",
+    description="""
+        The whole catalog as one CSV, JSONL or XML document for marketplaces and
+        price comparison sites: id, name, slug, category, brand, price, sale_price, stock, image.
+
+        The response is streamed, and gzip compressed when the client accepts it.
+        Supports `If-None-Match` / `If-Modified-Since`.
+    """,
+    parameters=[
+        OpenApiParameter(
+            name="feed_format",
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.PATH,
+            enum=list(FEED_FORMATS),
+            required=True,
+        ),
+    ],
+    responses={(200, media_type): OpenApiTypes.STR for media_type in FEED_FORMATS.values()},
+    tags=["Product"],
+)
+class ProductFeedView(ConditionalGetMixin, generics.ListAPIView):
+    permission_classes = [AllowAny]
+    content_negotiation_class = IgnoreClientContentNegotiation
+    pagination_class = None
+    queryset = ProductListing.objects.none()
+    def wants_gzip(self):
+        # "gzip;q=0" refuses gzip
+        return "gzip" in accepted_encodings(self.request.META.get("HTTP_ACCEPT_ENCODING", ""))
+
+    def get_last_modified(self):
+        return listing_last_modified()
+
+    def get_etag(self, request, last_modified):
+        # The gzip body is a different representation and needs its own ETag
+        etag = super().get_etag(request, last_modified)
+        return etag[:-1] + '-gzip"' if self.wants_gzip() else etag
+
+    def list(self, request, *args, **kwargs):
+        feed_format = self.kwargs["feed_format"]
+        if feed_format not in FEED_FORMATS:
+            raise Http404
+
+        gzip = self.wants_gzip()
+        response = StreamingHttpResponse(
+            render_feed(feed_format, request.build_absolute_uri, gzip=gzip),
+            content_type=FEED_FORMATS[feed_format],
+        )
+        response["Content-Disposition"] = f'inline; filename="products.{feed_format}"'
+        if gzip:
+            response["Content-Encoding"] = "gzip"
+        patch_vary_headers(response, ("Accept-Encoding",))
+        return response
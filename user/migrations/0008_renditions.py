@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:21
+
+import core.renditions
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0007_remove_user_count_sms_remove_user_verify_phone_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_image_renditions',
+            field=core.renditions.RenditionsField(source='profile_image', verbose_name='Profile Image Renditions'),
+        ),
+    ]
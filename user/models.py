@@ -7,6 +7,7 @@ from django.contrib.auth.models import AbstractUser
 from django.utils.translation import gettext_lazy as _
 from core.models.auditable import AuditableModel
 from core.models.soft_delete import SoftDeleteModel
+from core.renditions import RenditionsField
 from django.contrib.auth.hashers import make_password
 
 class User(AbstractUser,AuditableModel, SoftDeleteModel):
@@ -14,6 +15,7 @@ class User(AbstractUser,AuditableModel, SoftDeleteModel):
     verify_phone_number = models.BooleanField(default=False, verbose_name=_("Phone Verified"))
     birthdate = models.DateField(null=True,blank=True,verbose_name=_("Birthdate"))
     profile_image = models.ImageField(blank=True, null=True, upload_to="user/image_profile/", verbose_name=_("Profile Image"))
+    profile_image_renditions = RenditionsField(source="profile_image", verbose_name=_("Profile Image Renditions"))
     province = models.CharField(max_length=20, blank=True, null=True, verbose_name=_("Province"))
     city = models.CharField(max_length=30, blank=True, null=True, verbose_name=_("City"))
     address = models.TextField(blank=True, null=True, verbose_name=_("Address"))
@@ -1,12 +1,14 @@
 import re
 from rest_framework import serializers
 from user.models import ContactUs, User
+from core.renditions import RenditionURLsField
 
 class UserCommentsSerializer(serializers.ModelSerializer):
-    
+    profile_image_renditions = RenditionURLsField()
+
     class Meta:
         model = User
-        fields = ['get_full_name','profile_image']
+        fields = ['get_full_name','profile_image','profile_image_renditions']
     
 class LoginSerializer(serializers.Serializer):
     phone_number = serializers.CharField(max_length = 11)